@@ -1,10 +1,13 @@
 """Metador driver abstraction in order to enable different underlying implementations."""
+import os
 from enum import Enum
 from typing import Any, Optional, Type, Union, cast
 
 import h5py
+import wrapt
 
 from ..ih5.container import IH5Record
+from ..ih5.overlay import IH5Dataset
 from ..util.types import H5FileLike, OpenMode
 
 
@@ -53,6 +56,49 @@ def get_source(raw_cont: MetadorDriver, driver: MetadorDriverEnum = None) -> Any
         return c.ih5_files
 
 
+def is_open(raw_cont: MetadorDriver, driver: MetadorDriverEnum = None) -> bool:
+    """Return whether the given container object is (still) open."""
+    c = cast(Any, raw_cont)
+    driver = driver or get_driver_type(raw_cont)
+    if driver == MetadorDriverEnum.HDF5:
+        return bool(c.id.valid)
+    elif driver == MetadorDriverEnum.IH5:
+        return not c._closed
+
+
+def get_revision(
+    raw_cont: MetadorDriver, driver: MetadorDriverEnum = None
+) -> Optional[str]:
+    """Return identifier of the current state of a container opened read-only.
+
+    For IH5 records this is the UUID of the latest patch, for HDF5 files
+    it is based on the modification time and size of the file.
+
+    Returns None if the container is writable (i.e. the state can change).
+    """
+    c = cast(Any, raw_cont)
+    driver = driver or get_driver_type(raw_cont)
+    if driver == MetadorDriverEnum.HDF5:
+        if c.mode != "r":
+            return None
+        stat = os.stat(c.filename)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    elif driver == MetadorDriverEnum.IH5:
+        if c._has_writable:
+            return None
+        return str(c._ublock(-1).patch_uuid)
+
+
+def get_raw_dataset(node: Any) -> Optional[h5py.Dataset]:
+    """Return underlying h5py dataset of a (possibly wrapped) dataset node."""
+    obj = node
+    while isinstance(obj, wrapt.ObjectProxy):
+        obj = obj.__wrapped__
+    if isinstance(obj, IH5Dataset):
+        obj = obj._files[obj._cidx][obj._gpath]
+    return obj if isinstance(obj, h5py.Dataset) else None
+
+
 def to_h5filelike(
     name_or_obj: Union[MetadorDriver, Any],
     mode: OpenMode = "r",
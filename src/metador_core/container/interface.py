@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import json
+from bisect import bisect_left, insort
 from dataclasses import dataclass
 from enum import Enum, auto
+from functools import lru_cache
 from typing import (
     TYPE_CHECKING,
     Any,
     Dict,
     ItemsView,
+    Iterable,
     Iterator,
     KeysView,
     List,
@@ -23,10 +26,11 @@ from typing import (
 )
 from uuid import UUID, uuid1
 
+import numpy as np
 from typing_extensions import TypeAlias
 
 from ..plugin.types import EPName, from_ep_name, plugin_args, to_ep_name
-from ..plugins import schemas
+from ..plugins import plugingroups, schemas
 from ..schema import MetadataSchema
 from ..schema.plugins import PluginPkgMeta, PluginRef
 from ..schema.types import SemVerTuple
@@ -37,6 +41,7 @@ from .drivers import (
     MetadorDriver,
     MetadorDriverEnum,
     get_driver_type,
+    get_revision,
     get_source,
 )
 
@@ -95,18 +100,98 @@ class StoredMetadata:
         ep_name = to_ep_name(self.schema.name, self.schema.version)
         return f"{prefix}/{ep_name}={self.uuid}"
 
+    @staticmethod
+    def parse_path(path: str) -> Tuple[PluginRef, UUID]:
+        """Return schema and UUID encoded in the path of a metadata object."""
+        ep_name, uuid_str = path.split("/")[-1].split("=")
+        return (_schema_ref_for(ep_name), UUID(uuid_str))
+
     @staticmethod
     def from_node(obj: H5DatasetLike) -> StoredMetadata:
         """Instantiate info about a stored metadata node."""
-        path = obj.name
-        segs = path.lstrip("/").split("/")
-        ep_name, uuid_str = segs.pop().split("=")
-        s_name, s_vers = from_ep_name(EPName(ep_name))
-        uuid = UUID(uuid_str)
-        s_ref = schemas.PluginRef(name=s_name, version=s_vers)
+        s_ref, uuid = StoredMetadata.parse_path(obj.name)
         return StoredMetadata(uuid=uuid, schema=s_ref, node=obj)
 
 
+@dataclass
+class FsckResult:
+    """Inconsistencies between the container TOC and the stored metadata objects."""
+
+    broken: List[UUID]
+    """UUIDs of links in the TOC not pointing to an existing metadata object."""
+
+    moved: Dict[UUID, str]
+    """Broken links for which the metadata object exists at a different path."""
+
+    missing: List[str]
+    """Paths of metadata objects not listed in the TOC (with an unknown UUID)."""
+
+    collisions: List[str]
+    """Paths of metadata objects with UUIDs already used for a different object."""
+
+    orphan_schemas: List[PluginRef]
+    """Schemas listed in the TOC that are not used by any metadata object."""
+
+    orphan_packages: List[PythonDep]
+    """Packages listed in the TOC that do not provide any used schema."""
+
+    @property
+    def ok(self) -> bool:
+        """Return whether no inconsistencies were found."""
+        return not any(
+            (
+                self.broken,
+                self.moved,
+                self.missing,
+                self.collisions,
+                self.orphan_schemas,
+                self.orphan_packages,
+            )
+        )
+
+
+@dataclass
+class MetadataExport:
+    """Selected fields of metadata objects in a container, in columnar form."""
+
+    paths: List[str]
+    """Paths of the nodes the metadata objects are attached to."""
+
+    columns: Dict[str, List[Any]]
+    """Values of each requested field (None if missing), in the same order as paths."""
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def to_numpy(self) -> np.ndarray:
+        """Return a structured array with the node path and one column per field.
+
+        Columns with values of mixed or non-scalar types are stored as objects.
+        """
+        cols = {"path": self.paths, **self.columns}
+        arrs = {}
+        for name, values in cols.items():
+            arr = np.asarray(values) if values else np.asarray([], dtype=object)
+            if arr.ndim != 1 or arr.dtype.kind not in "biufUSM":
+                arr = np.empty(len(values), dtype=object)
+                arr[:] = values
+            arrs[name] = arr
+        dtype = np.dtype([(name, arr.dtype) for name, arr in arrs.items()])
+        ret = np.empty(len(self.paths), dtype=dtype)
+        for name, arr in arrs.items():
+            ret[name] = arr
+        return ret
+
+
+def _get_field(obj: Any, path: List[str]) -> Any:
+    """Return value at given key path in decoded JSON object (or None if missing)."""
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
 def _schema_ref_for(ep_name: str) -> PluginRef:
     s_name, s_ver = from_ep_name(EPName(ep_name))
     return schemas.PluginRef(name=s_name, version=s_ver)
@@ -231,15 +316,30 @@ class MetadorMeta:
         Actual node exists iff any metadata is stored for the node.
         """
 
-        self._objs: Dict[str, StoredMetadata] = {}
+        self._objs: Dict[str, StoredMetadata]
         """Information about available metadata objects."""
 
-        # load available object metadata encoded in the node names
+        if not self._mc.frozen:
+            self._objs = self._load_objs()
+            return
+
+        # frozen container -> structure cannot change, can reuse loaded infos
+        cache = self._mc._self_meta_cache
+        if (objs := cache.get(self._base_dir)) is None:
+            has_meta = self._mc._has_meta_dir(self._base_dir)
+            objs = self._load_objs() if has_meta else {}
+            cache[self._base_dir] = objs
+        self._objs = dict(objs)
+
+    def _load_objs(self) -> Dict[str, StoredMetadata]:
+        """Load available object metadata encoded in the node names."""
+        ret: Dict[str, StoredMetadata] = {}
         meta_grp = cast(H5GroupLike, self._mc.__wrapped__.get(self._base_dir, {}))
         for obj_node in meta_grp.values():
             assert isinstance(obj_node, H5DatasetLike)
             obj = StoredMetadata.from_node(obj_node)
-            self._objs[obj.schema.name] = obj
+            ret[obj.schema.name] = obj
+        return ret
 
     # ----
 
@@ -441,6 +541,12 @@ class TOCLinks:
         self._toc_path: Dict[UUID, str] = {}
         """Maps metadata object UUIDs to paths of respective pseudo-symlink in TOC."""
 
+        self._toc_target: Dict[UUID, str] = {}
+        """Cache of resolved link targets (i.e. paths of metadata objects)."""
+
+        self._targets: Optional[List[Tuple[str, UUID]]] = None
+        """Sorted (target, UUID) pairs of all links (built on first prefix query)."""
+
         # load links into memory
         if M.METADOR_LINKS_PATH in self._raw:
             link_grp = self._raw.require_group(M.METADOR_LINKS_PATH)
@@ -465,15 +571,50 @@ class TOCLinks:
 
     def resolve(self, uuid: UUID) -> str:
         """Get the path a UUID in the TOC points to."""
+        if (target := self._toc_target.get(uuid)) is not None:
+            return target
         link_path = self._toc_path[uuid]
         link_node = cast(H5DatasetLike, self._raw[link_path])
-        return link_node[()].decode("utf-8")
+        target = link_node[()].decode("utf-8")
+        self._toc_target[uuid] = target
+        return target
+
+    def _set_target(self, uuid: UUID, target: str) -> None:
+        """Set target of a link in the caches (keeping the sorted index up to date)."""
+        self._drop_target(uuid)
+        self._toc_target[uuid] = target
+        if self._targets is not None:
+            insort(self._targets, (target, uuid))
+
+    def _drop_target(self, uuid: UUID) -> None:
+        """Remove target of a link from the caches."""
+        target = self._toc_target.pop(uuid, None)
+        if self._targets is not None and target is not None:
+            del self._targets[bisect_left(self._targets, (target, uuid))]
+
+    def _target_index(self) -> List[Tuple[str, UUID]]:
+        """Return sorted (target, UUID) pairs of all links (resolved once)."""
+        if self._targets is None:
+            self._targets = sorted(
+                (self.resolve(uuid), uuid)
+                for uuid, link_path in self._toc_path.items()
+                if link_path is not None  # skip reserved, unassigned UUIDs
+            )
+        return self._targets
+
+    def _index_range(self, prefix: str) -> Tuple[int, int]:
+        """Return index range of the links with a target below the prefix."""
+        targets = self._target_index()
+        pref = prefix.rstrip("/") + "/"
+        # NOTE: "0" is the character following "/", i.e. ends the range
+        return (bisect_left(targets, (pref,)), bisect_left(targets, (pref[:-1] + "0",)))
 
     def update(self, uuid: UUID, new_target: str):
         """Update target of an existing link to point to a new location."""
         link_path = self._toc_path[uuid]
         del self._raw[link_path]
         self._raw[link_path] = new_target
+        self._set_target(uuid, new_target)
 
     def register(self, obj: StoredMetadata) -> None:
         """Create a link for a metadata object in container TOC.
@@ -484,6 +625,7 @@ class TOCLinks:
 
         toc_path = f"{self._link_path_for(obj.schema)}/{obj.uuid}"
         self._toc_path[obj.uuid] = toc_path
+        self._set_target(obj.uuid, str(obj.node.name))
         self._raw[toc_path] = str(obj.node.name)
 
     def unregister(self, uuid: UUID) -> None:
@@ -501,6 +643,7 @@ class TOCLinks:
 
         del self._raw[toc_path]
         del self._toc_path[uuid]
+        self._drop_target(uuid)
         if len(schema_group):
             return  # schema still has instances
 
@@ -518,6 +661,98 @@ class TOCLinks:
 
     # ----
 
+    def find_below(self, prefix: str) -> Dict[UUID, str]:
+        """Return links with a target located below the given path prefix.
+
+        Only the TOC is inspected, the container is not scanned. The targets of
+        all links are resolved on first use and kept in a sorted index.
+        """
+        lo, hi = self._index_range(prefix)
+        return {uuid: target for target, uuid in self._target_index()[lo:hi]}
+
+    def find_instances(self, schema_ref: PluginRef) -> Dict[UUID, str]:
+        """Return links to metadata objects of exactly the given schema.
+
+        Only the TOC is inspected, the container is not scanned.
+        """
+        link_dir = self._link_path_for(schema_ref) + "/"
+        return {
+            uuid: self.resolve(uuid)
+            for uuid, link_path in self._toc_path.items()
+            if link_path is not None and link_path.startswith(link_dir)
+        }
+
+    def relink_moved(self, src_prefix: str, dst_prefix: str) -> None:
+        """Update links to metadata objects moved from source to destination prefix.
+
+        Affected links are taken from the TOC index and updated by rewriting the
+        prefix, the container is not scanned. Objects that are not listed in the
+        TOC are not noticed (see `MetadorContainer.fsck`).
+        """
+        src_prefix, dst_prefix = src_prefix.rstrip("/"), dst_prefix.rstrip("/")
+        targets = self._target_index()
+        lo, hi = self._index_range(src_prefix)
+        moved = [(dst_prefix + t[len(src_prefix) :], u) for t, u in targets[lo:hi]]
+        del targets[lo:hi]
+        for target, uuid in moved:
+            link_path = self._toc_path[uuid]
+            del self._raw[link_path]
+            self._raw[link_path] = target
+            self._toc_target[uuid] = target
+        targets += moved
+        targets.sort()  # NOTE: cheap, as it merges two sorted runs
+
+    def relink_copied(self, src_prefix: str, dst_prefix: str) -> None:
+        """Register metadata objects copied from source to destination prefix.
+
+        Affected links are taken from the TOC index, the container is not scanned.
+        The copies of metadata objects are renamed to use fresh UUIDs
+        and the corresponding new links are added to the TOC. Copies of objects
+        that are not listed in the TOC are not noticed (see `MetadorContainer.fsck`).
+        """
+        src_prefix, dst_prefix = src_prefix.rstrip("/"), dst_prefix.rstrip("/")
+        targets = self._target_index()
+        lo, hi = self._index_range(src_prefix)
+        originals = targets[lo:hi]
+        fresh = [self.fresh_uuid() for _ in range(len(originals))]
+        copies = []
+        for new_uuid, (target, uuid) in zip(fresh, originals):
+            # the copy still has the name of the original object (with old UUID)
+            copy_path = dst_prefix + target[len(src_prefix) :]
+            link_dir, _ = self._toc_path[uuid].rsplit("/", 1)
+            ep_name = link_dir.split("/")[-1]
+            new_path = f"{copy_path.rsplit('/', 1)[0]}/{ep_name}={new_uuid}"
+            self._raw.move(copy_path, new_path)
+            # schema is already registered (used by the original object)
+            toc_path = f"{link_dir}/{new_uuid}"
+            self._toc_path[new_uuid] = toc_path
+            self._toc_target[new_uuid] = new_path
+            self._raw[toc_path] = new_path
+            copies.append((new_path, new_uuid))
+        targets += copies
+        targets.sort()  # NOTE: cheap, as it merges two sorted runs
+
+    def _resolves_to(self, uuid: UUID, path: str) -> bool:
+        """Return whether the UUID is in the TOC and its link points to given path."""
+        return self._toc_path.get(uuid) is not None and self.resolve(uuid) == path
+
+    def _objects_below(self, path: str) -> List[H5DatasetLike]:
+        """Return metadata objects below given path (by scanning the container)."""
+        objs: List[H5DatasetLike] = []
+
+        def collect_objects(_, node):
+            if not M.is_internal_path(node.name, M.METADOR_META_PREF):
+                return  # not a metador metadata path
+            if M.is_meta_base_path(node.name):
+                # top dir, not a "link dataset",
+                # e.g. /.../foo/metador_meta_ or /.../metador_meta_foo
+                return
+            objs.append(node)
+
+        if isinstance(grp := self._raw.get(path), H5GroupLike):
+            grp.visititems(collect_objects)
+        return objs
+
     def find_broken(self, repair: bool = False) -> List[UUID]:
         """Return list of UUIDs in TOC not pointing to an existing metadata object.
 
@@ -537,29 +772,16 @@ class TOCLinks:
 
     def find_missing(self, path: H5GroupLike) -> List[H5DatasetLike]:
         """Return list of metadata objects not listed in TOC."""
-        missing = []
-
-        def collect_missing(_, node):
-            if not M.is_internal_path(node.name, M.METADOR_META_PREF):
-                return  # not a metador metadata path
-            if M.is_meta_base_path(node.name):
-                # top dir, not a "link dataset",
-                # e.g. /.../foo/metador_meta_ or /.../metador_meta_foo
-                return
-
-            # now we assume we have a path to a metadata link object in the group
-            obj = StoredMetadata.from_node(node)
-            known = obj.uuid in self._toc_path
-            # check UUID collision: i.e., used in TOC, but points elsewhere
-            # (requires fixing up the name of this object / new UUID)
-            # implies that THIS object IS missing in the TOC
-            collision = known and self.resolve(obj.uuid) != node.name
-            if not known or collision:
-                missing.append(node)
-
-        # ensure its a group and collect
-        self._raw.require_group(path.name).visititems(collect_missing)
-        return missing
+        # ensure its a group
+        self._raw.require_group(path.name)
+        # a UUID used in the TOC for an object elsewhere is a collision
+        # (requires fixing up the name of this object / new UUID)
+        # which implies that THIS object IS missing in the TOC
+        return [
+            node
+            for node in self._objects_below(path.name)
+            if not self._resolves_to(StoredMetadata.from_node(node).uuid, node.name)
+        ]
 
     def repair_missing(
         self, missing: List[H5DatasetLike], update: bool = False
@@ -583,6 +805,53 @@ class TOCLinks:
                 self.register(obj)
 
 
+@dataclass(frozen=True)
+class _SchemaInfo:
+    """Information about an installed schema stored in containers using it."""
+
+    installed: PluginRef
+    """Reference of installed schema used for a requested schema reference."""
+
+    jsonschema: bytes
+    """Encoded JSON Schema."""
+
+    parents: Tuple[PluginRef, ...]
+    """Parent path of the schema."""
+
+    parents_json: bytes
+    """Encoded parent path of the schema."""
+
+
+def _schema_info_for(schema_ref: PluginRef) -> _SchemaInfo:
+    """Return JSON Schema and parent path of an installed schema (and their encoding).
+
+    As generating JSON Schemas can be expensive, the result is cached process-wide
+    and the same encoded payloads are written into all containers using the schema.
+    The cache is bounded and cleared after the plugin groups are reset.
+    """
+    global _schema_info_generation
+    if (generation := plugingroups.generation) != _schema_info_generation:
+        _schema_info.cache_clear()  # infos of the previous generation are stale
+        _schema_info_generation = generation
+    return _schema_info(schema_ref, generation)
+
+
+_schema_info_generation: int = -1
+"""Plugin group generation of the infos in the schema info cache."""
+
+
+@lru_cache(maxsize=1024)
+def _schema_info(schema_ref: PluginRef, generation: int) -> _SchemaInfo:
+    schema_cls = schemas._get_unsafe(schema_ref.name, schema_ref.version)
+    parents = tuple(schemas.parent_path(schema_ref.name, schema_ref.version))
+    return _SchemaInfo(
+        installed=schema_cls.Plugin.ref(),
+        jsonschema=schema_cls.schema_json().encode("utf-8"),
+        parents=parents,
+        parents_json=json.dumps(list(map(lambda x: x.dict(), parents))).encode("utf-8"),
+    )
+
+
 class TOCSchemas:
     """Schema management for schemas used in the container.
 
@@ -627,36 +896,41 @@ class TOCSchemas:
 
         If the schema has not been used before in the container, will store metadata about it.
         """
-        if schema_ref in self._schemas:
-            return  # nothing to do
+        self._register_many([schema_ref])
 
-        # store json schema
-        schema_cls = schemas.get(schema_ref.name, schema_ref.version)
-        jsonschema_dat = schema_cls.schema_json().encode("utf-8")
-        jsonschema_path = self._jsonschema_path_for(schema_ref)
-        self._raw[jsonschema_path] = jsonschema_dat
-
-        # store parent schema refs
-        compat_path = f"{self._schema_path_for(schema_ref)}/compat"
-        parents = schemas.parent_path(schema_ref.name, schema_ref.version)
-        parents_dat: bytes = json.dumps(list(map(lambda x: x.dict(), parents))).encode(
-            "utf-8"
-        )
+    def _register_many(self, schema_refs: Iterable[PluginRef]):
+        """Notify that the given schemas are used in the container.
 
-        self._raw[compat_path] = parents_dat
-        self._schemas.add(schema_ref)
-        self._update_parents_children(schema_ref, parents)
+        Metadata about all schemas not used before in the container and about the
+        packages providing them is prepared first and then stored in one pass.
+        """
+        new_refs = [ref for ref in dict.fromkeys(schema_refs) if ref not in self._schemas]
+        if not new_refs:
+            return  # nothing to do
 
-        # add providing package (if no stored package provides it)
-        if not self._pkgs._providers.get(schema_ref, []):
-            env_pkg_info: PluginPkgMeta = schemas.provider(schema_cls.Plugin.ref())
-            pkg_name_ver = (str(env_pkg_info.name), env_pkg_info.version)
+        infos = {ref: _schema_info_for(ref) for ref in new_refs}
+        # providing packages of schemas not provided by any stored package
+        new_pkgs: Dict[PythonDep, PluginPkgMeta] = {}
+        for schema_ref, info in infos.items():
+            if not self._pkgs._providers.get(schema_ref, []):
+                env_pkg_info: PluginPkgMeta = schemas.provider(info.installed)
+                pkg_name_ver = (str(env_pkg_info.name), env_pkg_info.version)
+                new_pkgs.setdefault(pkg_name_ver, env_pkg_info)
+
+        # store json schemas, parent schema refs and package infos
+        for schema_ref, info in infos.items():
+            self._raw[self._jsonschema_path_for(schema_ref)] = info.jsonschema
+            self._raw[f"{self._schema_path_for(schema_ref)}/compat"] = info.parents_json
+        for pkg_name_ver, env_pkg_info in new_pkgs.items():
             self._pkgs._register(pkg_name_ver, env_pkg_info)
             self._used[pkg_name_ver] = set()
 
-        # update used schemas tracker for all packages providing this schema
-        for pkg in self._pkgs._providers[schema_ref]:
-            self._used[pkg].add(schema_ref)
+        for schema_ref, info in infos.items():
+            self._schemas.add(schema_ref)
+            self._update_parents_children(schema_ref, list(info.parents))
+            # update used schemas tracker for all packages providing this schema
+            for pkg in self._pkgs._providers[schema_ref]:
+                self._used[pkg].add(schema_ref)
 
     def _unregister(self, schema_ref: PluginRef):
         """Notify that a schema is not used at any container node anymore.
@@ -939,6 +1213,11 @@ class MetadorContainerTOC:
         """Return data underlying thes container (file, set of files, etc. used with the driver)."""
         return get_source(self._raw, self.driver_type)
 
+    @property
+    def revision(self) -> Optional[str]:
+        """Return identifier of the current container state (None if it is writable)."""
+        return get_revision(self._raw, self.driver_type)
+
     # ----
 
     @property
@@ -981,16 +1260,209 @@ class MetadorContainerTOC:
         if not isinstance(start_node, H5GroupLike):
             return  # the node is not group-like, cannot be traversed down
 
-        # collect nodes below start node recursively
-        # NOTE: yielding from the collect_nodes does not work :'(
-        # so we have to actually materialize the list >.<
-        # but we expose only the generator interface anyway (better design)
-        # (maybe consider replacing visititems with a custom traversal here)
-        ret: List[MetadorNode] = []
-
-        def collect_nodes(_, node: MetadorNode):
+        # check nodes below start node recursively
+        mc = self._container
+        for _, handle in cast(Any, start_node).walk():
+            if mc.frozen:  # skip nodes without metadata (known from the TOC)
+                base_dir = M.to_meta_base_path(handle.name, not handle.is_group)
+                if not mc._has_meta_dir(base_dir):
+                    continue
+            node = handle.node()
             if (schema_name, schema_ver) in node.meta:
-                ret.append(node)
+                yield node
+
+    def _iter_objects(
+        self, schema: Union[str, Type[S]], version: Optional[SemVerTuple] = None
+    ) -> Iterator[Tuple[str, bytes]]:
+        """Yield node paths and serialized compatible metadata objects based on the TOC.
+
+        Like in `MetadorMeta.get`, an instance of the requested schema is preferred
+        over instances of compatible child schemas attached to the same node.
+        """
+        schema_name, schema_ver = plugin_args(schema, version)
+        exact = self.schemas.versions(schema_name, schema_ver)
+        compat = set().union(*(self.schemas.children(ref) for ref in exact))
+        children = sorted(compat.difference(exact), key=lambda r: (r.name, r.version))
+
+        seen: Set[str] = set()
+        for s_ref in [*exact, *children]:
+            for target in sorted(self._links.find_instances(s_ref).values()):
+                node_path = M.to_data_node_path(target.rsplit("/", 1)[0])
+                if node_path in seen:
+                    continue
+                seen.add(node_path)
+                yield (node_path, cast(H5DatasetLike, self._raw[target])[()])
+
+    def export(
+        self,
+        schema: Union[str, Type[S]],
+        version: Optional[SemVerTuple] = None,
+        *,
+        fields: List[str],
+    ) -> MetadataExport:
+        """Return selected fields of all metadata objects compatible with the given schema.
 
-        start_node.visititems(collect_nodes)
-        yield from iter(ret)
+        The objects are located using the TOC and the fields are taken from the decoded
+        JSON directly, i.e. the objects are not parsed and validated by the schema.
+
+        Nested fields can be selected by a dot-separated path (e.g. `author.name`).
+        If the schema is installed, top-level field names are translated to their
+        serialized names (e.g. `id_` to `@id`).
+        """
+        schema_name, schema_ver = plugin_args(schema, version)
+        if not schema_name:
+            msg = "A schema name, plugin reference or class must be provided!"
+            raise ValueError(msg)
+
+        schema_cls = schemas.get(schema_name, schema_ver)
+        key_paths: List[List[str]] = []
+        for field in fields:
+            segs = field.split(".")
+            if schema_cls and (fld := schema_cls.__fields__.get(segs[0])):
+                segs[0] = fld.alias
+            key_paths.append(segs)
+
+        paths: List[str] = []
+        columns: Dict[str, List[Any]] = {field: [] for field in fields}
+        for node_path, dat in self._iter_objects(schema_name, schema_ver):
+            obj = json.loads(dat)
+            paths.append(node_path)
+            for field, key_path in zip(fields, key_paths):
+                columns[field].append(_get_field(obj, key_path))
+        return MetadataExport(paths=paths, columns=columns)
+
+    # ----
+
+    def _scan_objects(self) -> Dict[str, Tuple[PluginRef, UUID]]:
+        """Return schema and UUID of all metadata objects stored in the container.
+
+        Uses a single traversal of the container based on node names only.
+        """
+        ret: Dict[str, Tuple[PluginRef, UUID]] = {}
+        toc_pref = M.METADOR_TOC_PATH.lstrip("/") + "/"
+
+        def collect_objects(name: str):
+            if name.startswith(toc_pref):
+                return  # TOC structure
+            if "/" in name:
+                parent, _ = name.rsplit("/", 1)
+            else:
+                parent = ""
+            if not M.is_meta_base_path(parent):
+                return  # not a metadata object
+            try:
+                ret[f"/{name}"] = StoredMetadata.parse_path(name)
+            except ValueError:
+                pass  # not a well-formed metadata object name, ignore
+
+        self._raw.visit(collect_objects)
+        return ret
+
+    def _fsck(self, repair: bool = False) -> FsckResult:
+        """Check (and optionally repair) consistency of TOC and metadata objects.
+
+        Both sides are collected in bulk and compared using set operations,
+        repairs are applied together in a fixed order afterwards.
+        """
+        links, toc_schemas = self._links, self._schemas
+
+        # collect both sides
+        objs = self._scan_objects()
+        targets = links.find_below("/")
+
+        # compare them
+        broken = set(targets.keys()).difference(
+            uuid for uuid, target in targets.items() if target in objs
+        )
+        moved: Dict[UUID, str] = {}
+        missing: Dict[UUID, str] = {}
+        collisions: List[str] = []
+        for path in sorted(set(objs.keys()).difference(targets.values())):
+            _, uuid = objs[path]
+            if uuid in broken and uuid not in moved:
+                moved[uuid] = path  # the linked object was moved
+            elif uuid in targets or uuid in moved or uuid in missing:
+                collisions.append(path)  # uuid is used by a different object
+            else:
+                missing[uuid] = path
+        broken.difference_update(moved.keys())
+
+        # after repair, all existing objects are linked -> their schemas are used
+        used = {s_ref for s_ref, _ in objs.values()}
+        orphan_schemas = sorted(
+            toc_schemas.keys().difference(used), key=lambda r: (r.name, r.version)
+        )
+        used_pkgs = set().union(
+            *(toc_schemas._pkgs._providers.get(ref, set()) for ref in used)
+        )
+        orphan_packages = sorted(set(toc_schemas.packages.keys()).difference(used_pkgs))
+
+        ret = FsckResult(
+            broken=sorted(broken),
+            moved=moved,
+            missing=list(missing.values()),
+            collisions=collisions,
+            orphan_schemas=orphan_schemas,
+            orphan_packages=orphan_packages,
+        )
+        if repair:
+            self._fsck_repair(ret, objs)
+        return ret
+
+    def _fsck_repair(
+        self, res: FsckResult, objs: Dict[str, Tuple[PluginRef, UUID]]
+    ) -> None:
+        """Apply repairs for the inconsistencies found by `_fsck`."""
+        links, toc_schemas, pkgs = self._links, self._schemas, self._packages
+
+        # 1. fix up links of moved objects
+        for uuid, path in res.moved.items():
+            links.update(uuid, path)
+
+        # 2. remove broken links (empty link groups are cleaned up at the end)
+        for uuid in res.broken:
+            del self._raw[links._toc_path.pop(uuid)]
+            links._drop_target(uuid)
+
+        # 3. rename colliding objects to use fresh UUIDs
+        to_register: Dict[UUID, Tuple[PluginRef, str]] = {}
+        for path in res.collisions:
+            s_ref, _ = objs[path]
+            uuid = links.fresh_uuid()
+            new_path = f"{path.rsplit('/', 1)[0]}/{_ep_name_for(s_ref)}={uuid}"
+            self._raw.move(path, new_path)
+            to_register[uuid] = (s_ref, new_path)
+        for path in res.missing:
+            s_ref, uuid = objs[path]
+            to_register[uuid] = (s_ref, path)
+
+        # 4. register missing objects (and their schemas) in the TOC
+        toc_schemas._register_many(s_ref for s_ref, _ in to_register.values())
+        for uuid, (s_ref, path) in to_register.items():
+            toc_path = f"{links._link_path_for(s_ref)}/{uuid}"
+            links._toc_path[uuid] = toc_path
+            links._set_target(uuid, path)
+            self._raw[toc_path] = path
+
+        # 5. remove unused schemas and packages
+        for s_ref in res.orphan_schemas:
+            del self._raw[toc_schemas._schema_path_for(s_ref)]
+            toc_schemas._schemas.remove(s_ref)
+            toc_schemas._update_parents_children(s_ref, None)
+            for pkg_used in toc_schemas._used.values():
+                pkg_used.discard(s_ref)
+        for pkg in res.orphan_packages:
+            pkgs._unregister(pkg)
+            toc_schemas._used.pop(pkg, None)
+
+        # 6. clean up empty groups in the TOC
+        for grp_path in (M.METADOR_LINKS_PATH, M.METADOR_SCHEMAS_PATH):
+            if grp_path not in self._raw:
+                continue
+            grp = cast(H5GroupLike, self._raw[grp_path])
+            for name in list(grp.keys()):
+                child = grp[name]
+                if isinstance(child, H5GroupLike) and not len(child):
+                    del self._raw[f"{grp_path}/{name}"]
+            if not len(grp):
+                del self._raw[grp_path]
@@ -1,6 +1,25 @@
 """Abstract Metador container provider interface."""
-from typing import Any, Dict, Generic, Optional, Protocol, Tuple, Type, TypeVar, Union
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
+from .drivers import MetadorDriverEnum, is_open
 from .wrappers import MetadorContainer, MetadorDriver
 
 T = TypeVar("T")
@@ -91,3 +110,391 @@ class SimpleContainerProvider(Generic[T], ContainerProxy[T]):
 
     def keys(self):
         return self._known.keys()
+
+
+@dataclass
+class PoolStats:
+    """Usage statistics of a `PooledContainerProvider`."""
+
+    hits: int = 0
+    """Number of requests served by an already opened container."""
+
+    misses: int = 0
+    """Number of requests that required opening a container."""
+
+    evictions: int = 0
+    """Number of containers closed to stay within the pool limits."""
+
+    expirations: int = 0
+    """Number of containers closed after being idle for too long."""
+
+
+@dataclass
+class _PoolEntry:
+    container: MetadorContainer
+    """Opened container."""
+
+    num_files: int
+    """Number of files opened for the container."""
+
+    leases: int = 0
+    """Number of currently active leases of the container."""
+
+    last_used: float = 0
+    """Time of last access to the container."""
+
+    thread: Optional[int] = None
+    """Identifier of the thread owning the container (if per-thread handles)."""
+
+
+_PoolKey = Tuple[Any, Optional[int]]
+"""Pool entry key (container identifier, thread identifier if per-thread handles)."""
+
+
+class PooledContainerProvider(Generic[T], ContainerProxy[T]):
+    """Container proxy keeping a bounded pool of opened containers.
+
+    Like `SimpleContainerProvider`, it stores the arguments needed to open
+    each known container, but the containers are opened (read-only) on demand
+    and are kept open in a pool for reuse.
+
+    The pool is bounded by the number of opened containers and the number of files
+    opened for them (an IH5 record consists of multiple files).
+    If a limit is exceeded, the least recently used containers are closed.
+    Containers not used for longer than the configured TTL are closed as well.
+    Containers removed from the pool that are still in use count toward the limits.
+    If a container must be opened, but all opened containers are in use,
+    the request waits until enough containers are returned (at most `timeout`
+    seconds, then a `RuntimeError` is raised).
+
+    Use `lease` to retrieve a container that is guaranteed to stay open until
+    the lease is returned. Containers returned by `get` are leased until the next
+    access of the pool by the same thread (i.e. they can be closed afterwards).
+    Leased containers that are removed or replaced in the provider are closed
+    when their last lease is returned.
+
+    The provider can be shared by multiple worker processes forked from the
+    same parent process (e.g. WSGI server workers or bokeh server processes).
+    Containers opened before forking are not reused in the child processes,
+    instead each process opens and pools its own containers.
+
+    If `per_thread` is set, each thread gets its own handle of a container
+    (i.e. the same container file is opened once per thread using it),
+    so that concurrent requests (e.g. of threaded WSGI workers or widget sessions)
+    do not share the state of container objects. Handles of terminated threads
+    are closed.
+
+    Container objects (e.g. the wrappers and IH5 overlay nodes) are not
+    thread-safe, so per-thread handles are confined to their thread: a handle
+    of a different thread is never closed by the pool while that thread is alive,
+    instead it is closed on the next access of the pool by its own thread.
+    Therefore, a handle must only be used by the thread that retrieved it
+    (and the container must not be retrieved with `get` by one thread and
+    used in another one). Note that access to HDF5 files through h5py is still serialized,
+    but reading of embedded files (see `widget.server.files.EmbeddedFile`)
+    is done directly from the files and thus can proceed in parallel.
+    """
+
+    _known: Dict[T, ContainerArgs]
+    """Mapping from container identifier to MetadorContainer constructor args."""
+
+    _pool: "OrderedDict[_PoolKey, _PoolEntry]"
+    """Opened containers, in order of last access (least recent first)."""
+
+    _closing: List[_PoolEntry]
+    """Containers removed from the pool that are closed when they are not used."""
+
+    _get_leases: Dict[int, _PoolEntry]
+    """Containers returned by `get`, leased until the next pool access of the thread."""
+
+    def __init__(
+        self,
+        *,
+        max_open: int = 128,
+        max_files: Optional[int] = None,
+        ttl: Optional[float] = 300,
+        per_thread: bool = False,
+        timeout: float = 30,
+    ):
+        """Create a pooled container provider.
+
+        Args:
+            max_open: Maximal number of containers kept open at the same time.
+            max_files: Maximal number of files kept open at the same time (if set).
+            ttl: Time in seconds after which an unused container is closed (if set).
+            per_thread: If set, each thread gets a separate handle of a container.
+            timeout: Time in seconds to wait for a free slot if the pool is full.
+        """
+        self._known = {}
+        self._pool = OrderedDict()
+        self._closing = []
+        self._get_leases = {}
+        self._lock = threading.RLock()
+        self._returned = threading.Condition(self._lock)
+        self._timeout = timeout
+        self._max_open = max_open
+        self._max_files = max_files
+        self._ttl = ttl
+        self._per_thread = per_thread
+        self._stats = PoolStats()
+        self._pid = os.getpid()
+
+    @property
+    def stats(self) -> PoolStats:
+        """Return a snapshot of the usage statistics of the pool."""
+        with self._lock:
+            return PoolStats(**self._stats.__dict__)
+
+    @property
+    def per_thread(self) -> bool:
+        """Return whether each thread gets a separate handle of a container."""
+        return self._per_thread
+
+    @property
+    def num_open(self) -> int:
+        """Return number of currently opened containers."""
+        return len(self._pool)
+
+    @property
+    def num_files(self) -> int:
+        """Return number of files opened by the currently opened containers."""
+        with self._lock:
+            return sum(entry.num_files for entry in self._pool.values())
+
+    def __contains__(self, key: T) -> bool:
+        return key in self._known
+
+    def get(self, key: T) -> Optional[MetadorContainer]:
+        """Get an open container file to access data and metadata, if it exists.
+
+        The container is leased until the next access of the pool by the calling
+        thread, i.e. it must not be used after retrieving another one (use `lease`
+        to keep multiple containers or to use a container for a longer time).
+
+        If the provider is `per_thread`, the container handle belongs to the
+        calling thread and should not be passed to other threads.
+        """
+        self._check_fork()
+        with self._lock:
+            if (entry := self._acquire(key)) is None:
+                return None
+            entry.leases += 1
+            self._get_leases[threading.get_ident()] = entry
+            return entry.container
+
+    @contextmanager
+    def lease(self, key: T) -> Iterator[Optional[MetadorContainer]]:
+        """Get an open container that is not closed by the pool while it is used.
+
+        Yields None if the container is not known.
+        """
+        self._check_fork()
+        with self._lock:
+            if (entry := self._acquire(key)) is not None:
+                entry.leases += 1
+        try:
+            yield entry.container if entry is not None else None
+        finally:
+            if entry is not None:
+                with self._lock:
+                    entry.leases -= 1
+                    entry.last_used = time.monotonic()
+                    self._close_deferred()
+                    self._shrink()
+                    self._returned.notify_all()
+
+    def close_idle(self) -> None:
+        """Close all opened containers that are unused for longer than the TTL."""
+        self._check_fork()
+        with self._lock:
+            self._release_get_leases()
+            self._expire(time.monotonic())
+            self._close_orphaned()
+            self._close_deferred()
+
+    def close_all(self) -> None:
+        """Close all opened containers that are not used.
+
+        Leased containers and handles of other threads are closed later
+        (see `_close_deferred`).
+        """
+        self._check_fork()
+        with self._lock:
+            self._release_get_leases()
+            for pkey in [k for k, e in self._pool.items() if not e.leases]:
+                self._close(pkey)
+            self._close_deferred()
+
+    # ----
+
+    def _check_fork(self) -> None:
+        """Reset the pool if used in a process forked from the one that filled it.
+
+        File handles inherited from the parent process must not be used or closed
+        in the child process, so the pool entries are just dropped.
+        """
+        if (pid := os.getpid()) != self._pid:
+            self._pid = pid
+            self._lock = threading.RLock()
+            self._returned = threading.Condition(self._lock)
+            self._pool = OrderedDict()
+            self._closing = []
+            self._get_leases = {}
+            self._stats = PoolStats()
+
+    def _pool_key(self, key: T) -> _PoolKey:
+        """Return key of the pool entry for a container (used by current thread)."""
+        return (key, threading.get_ident() if self._per_thread else None)
+
+    def _entries_of(self, key: T) -> List[_PoolKey]:
+        """Return keys of all pool entries of a container (i.e. of all threads)."""
+        return [pk for pk in self._pool if pk[0] == key]
+
+    def _acquire(self, key: T) -> Optional[_PoolEntry]:
+        """Return pool entry of a container (opening it, if needed)."""
+        self._release_get_leases()
+        if key not in self._known:
+            return None
+        now = time.monotonic()
+        self._expire(now)
+        self._close_deferred()
+
+        pkey = self._pool_key(key)
+        entry = self._pool.get(pkey)
+        if entry is not None and is_open(entry.container.__wrapped__):
+            self._stats.hits += 1
+            self._pool.move_to_end(pkey)
+        else:
+            # not opened yet (or was closed from outside)
+            self._pool.pop(pkey, None)
+            self._close_orphaned()
+            self._wait_for_slot()
+            self._stats.misses += 1
+            driver, source = self._known[key]
+            container = MetadorContainer(driver(source))
+            num_files = 1
+            if container.metador.driver_type == MetadorDriverEnum.IH5:
+                num_files = len(container.metador.source)
+            entry = _PoolEntry(container, num_files, thread=pkey[1])
+            self._pool[pkey] = entry
+        entry.last_used = now
+        self._shrink()
+        return entry
+
+    def _release_get_leases(self) -> None:
+        """Return leases taken by `get` in the current thread or terminated threads."""
+        current = threading.get_ident()
+        alive = {t.ident for t in threading.enumerate()}
+        for thread in list(self._get_leases):
+            if thread == current or thread not in alive:
+                entry = self._get_leases.pop(thread)
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+                self._returned.notify_all()
+
+    def _close_orphaned(self) -> None:
+        """Close unused containers opened by threads that are terminated."""
+        if not self._per_thread:
+            return
+        alive = {t.ident for t in threading.enumerate()}
+        for pkey, entry in list(self._pool.items()):
+            if pkey[1] not in alive and not entry.leases:
+                self._close(pkey)
+
+    def _expire(self, now: float) -> None:
+        """Close containers that are unused for longer than the TTL."""
+        if self._ttl is None:
+            return
+        for pkey, entry in list(self._pool.items()):
+            if not entry.leases and now - entry.last_used > self._ttl:
+                self._close(pkey)
+                self._stats.expirations += 1
+
+    def _over_limit(self, extra: int = 0) -> bool:
+        """Return whether the pool limits are exceeded (with `extra` more containers).
+
+        Containers removed from the pool that are not closed yet are counted as well.
+        """
+        entries = [*self._pool.values(), *self._closing]
+        if len(entries) + extra > self._max_open:
+            return True
+        if self._max_files is not None:
+            num_files = sum(entry.num_files for entry in entries)
+            return num_files + extra > self._max_files
+        return False
+
+    def _shrink(self, extra: int = 0) -> None:
+        """Close least recently used containers until the pool limits are satisfied.
+
+        If `extra` is set, makes room for that many containers to be opened.
+        Otherwise, the most recently used container is kept.
+        Leased containers are never closed.
+        """
+        entries = list(self._pool.items())
+        if not extra:
+            entries = entries[:-1]
+        for pkey in [k for k, e in entries if not e.leases]:
+            if not self._over_limit(extra):
+                break
+            self._close(pkey)
+            self._stats.evictions += 1
+
+    def _wait_for_slot(self) -> None:
+        """Wait until another container can be opened within the pool limits.
+
+        Raises RuntimeError if the containers are not returned in time.
+        """
+        deadline = time.monotonic() + self._timeout
+        self._shrink(extra=1)
+        while self._over_limit(extra=1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._returned.wait(remaining):
+                msg = "Container pool is full and no container was returned in time!"
+                raise RuntimeError(msg)
+            self._release_get_leases()
+            self._close_deferred()
+            self._shrink(extra=1)
+
+    def _close(self, pkey: _PoolKey) -> None:
+        """Remove container from the pool and close it (once it is not used)."""
+        self._closing.append(self._pool.pop(pkey))
+        self._close_deferred()
+
+    def _close_deferred(self) -> None:
+        """Close containers removed from the pool that are not used (anymore).
+
+        Containers that are leased or belong to a different (alive) thread
+        are kept for later.
+        """
+        current = threading.get_ident()
+        alive = {t.ident for t in threading.enumerate()}
+        closing, self._closing = self._closing, []
+        for entry in closing:
+            foreign = entry.thread not in (None, current) and entry.thread in alive
+            if entry.leases or foreign:
+                self._closing.append(entry)
+                continue
+            if is_open(entry.container.__wrapped__):
+                entry.container.close()
+            self._returned.notify_all()
+
+    # ----
+
+    def __delitem__(self, key: T):
+        with self._lock:
+            del self._known[key]
+            for pkey in self._entries_of(key):
+                self._close(pkey)  # leased containers are closed on return
+
+    def __setitem__(self, key: T, value: Union[ContainerArgs, MetadorContainer]):
+        with self._lock:
+            # NOTE: see SimpleContainerProvider
+            if container_toc := getattr(value, "metador", None):
+                self._known[key] = (container_toc.driver, container_toc.source)
+            else:
+                self._known[key] = value
+            for pkey in self._entries_of(key):
+                self._close(pkey)  # container might have changed
+
+    def keys(self):
+        return self._known.keys()
@@ -33,6 +33,9 @@ METADOR_SCHEMAS_PATH: Final[str] = f"{METADOR_TOC_PATH}/schemas"
 METADOR_LINKS_PATH: Final[str] = f"{METADOR_TOC_PATH}/links"
 """Path of group with links to schema instances in the container."""
 
+METADOR_FILE_ATTR: Final[str] = f"{METADOR_PREF}file"
+"""Attribute marking a `uint8` dataset with the bytes of an embedded file."""
+
 
 def is_internal_path(path: str, pref: str = METADOR_PREF) -> bool:
     """Return whether the path of this node is Metador-internal (metador_*).
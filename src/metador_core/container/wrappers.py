@@ -1,15 +1,41 @@
 from __future__ import annotations
 
 from itertools import takewhile
-from typing import Any, Dict, MutableMapping, Optional, Set, Type, Union
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 import h5py
 import wrapt
 
+from ..ih5.overlay import IH5Dataset, IH5Group
 from ..util.types import H5DatasetLike, H5FileLike, H5GroupLike, H5NodeLike, OpenMode
 from . import utils as M
 from .drivers import MetadorDriver, to_h5filelike
-from .interface import MetadorContainerTOC, MetadorMeta, NodeAcl, NodeAclFlags
+from .interface import (
+    FsckResult,
+    MetadorContainerTOC,
+    MetadorMeta,
+    NodeAcl,
+    NodeAclFlags,
+    StoredMetadata,
+)
+
+# concrete group and dataset classes of supported drivers
+# (isinstance checks with these are much cheaper than with the protocols)
+_GROUP_CLASSES = (h5py.Group, IH5Group)
+_DATASET_CLASSES = (h5py.Dataset, IH5Dataset)
 
 
 class UnsupportedOperationError(AttributeError):
@@ -139,8 +165,8 @@ class MetadorNode(wrapt.ObjectProxy):
         Ensures that {read,skel,local}_only status is passed down correctly.
         """
         return {
-            "local_parent": self if self.acl[NodeAcl.local_only] else None,
-            **{k.name: v for k, v in self.acl.items() if v},
+            "local_parent": self if self._self_flags[NodeAcl.local_only] else None,
+            **{k.name: v for k, v in self._self_flags.items() if v},
         }
 
     def restrict(self, **kwargs) -> MetadorNode:
@@ -172,12 +198,12 @@ class MetadorNode(wrapt.ObjectProxy):
         if M.is_internal_path(path):
             msg = f"Trying to use a Metador-internal path: '{path}'"
             raise ValueError(msg)
-        if self.acl[NodeAcl.local_only] and path[0] == "/":
+        if self._self_flags[NodeAcl.local_only] and path[0] == "/":
             msg = f"Node is marked as local_only, cannot use absolute path '{path}'!"
             raise ValueError(msg)
 
     def _guard_acl(self, flag: NodeAcl, method: str = "this method"):
-        if self.acl[flag]:
+        if self._self_flags[flag]:
             msg = f"Cannot use {method}, the node is marked as {flag.name}!"
             raise UnsupportedOperationError(msg)
 
@@ -185,7 +211,13 @@ class MetadorNode(wrapt.ObjectProxy):
 
     def _wrap_if_node(self, val):
         """Wrap value into a metador node wrapper, if it is a suitable group or dataset."""
-        if isinstance(val, H5GroupLike):
+        if isinstance(val, _GROUP_CLASSES):
+            return MetadorGroup(self._self_container, val, **self._child_node_kwargs())
+        elif isinstance(val, _DATASET_CLASSES):
+            return MetadorDataset(
+                self._self_container, val, **self._child_node_kwargs()
+            )
+        elif isinstance(val, H5GroupLike):
             return MetadorGroup(self._self_container, val, **self._child_node_kwargs())
         elif isinstance(val, H5DatasetLike):
             return MetadorDataset(
@@ -234,13 +266,13 @@ class MetadorNode(wrapt.ObjectProxy):
 
     @property
     def attrs(self):
-        if self.acl[NodeAcl.read_only] or self.acl[NodeAcl.skel_only]:
+        if self._self_flags[NodeAcl.read_only] or self._self_flags[NodeAcl.skel_only]:
             return WrappedAttributeManager(self.__wrapped__.attrs, self.acl)
         return self.__wrapped__.attrs
 
     @property
     def parent(self) -> MetadorGroup:
-        if self.acl[NodeAcl.local_only]:
+        if self._self_flags[NodeAcl.local_only]:
             # allow child nodes of local-only nodes to go up to the marked parent
             # (or it is None, if this is the local root)
             if lp := self._self_local_parent:
@@ -257,7 +289,7 @@ class MetadorNode(wrapt.ObjectProxy):
 
     @property
     def file(self) -> MetadorContainer:
-        if self.acl[NodeAcl.local_only]:
+        if self._self_flags[NodeAcl.local_only]:
             # raise exception (illegal non-local access)
             self._guard_acl(NodeAcl.local_only, "parent")
         return self._self_container
@@ -272,9 +304,9 @@ class MetadorDataset(MetadorNode):
     _self_RO_FORBIDDEN = {"resize", "make_scale", "write_direct", "flush"}
 
     def __getattr__(self, key):
-        if self.acl[NodeAcl.read_only] and key in self._self_RO_FORBIDDEN:
+        if self._self_flags[NodeAcl.read_only] and key in self._self_RO_FORBIDDEN:
             self._guard_acl(NodeAcl.read_only, key)
-        if self.acl[NodeAcl.skel_only] and key == "get":
+        if self._self_flags[NodeAcl.skel_only] and key == "get":
             self._guard_acl(NodeAcl.skel_only, key)
 
         return getattr(self.__wrapped__, key)
@@ -358,6 +390,30 @@ class MetadorGroup(MetadorNode):
 
         return self.__wrapped__.visititems(wrapped_func)  # RAW
 
+    def walk(self) -> Iterator[Tuple[str, NodeHandle]]:
+        """Iterate over all nodes below this group (depth-first, in pre-order).
+
+        Like `visititems`, but without a callback, i.e. the nodes are produced lazily
+        and the traversal can be stopped at any time. No node wrappers are created
+        during the traversal, instead a lightweight `NodeHandle` is produced per node.
+
+        Yields pairs of node path (relative to this group) and node handle.
+        """
+
+        def children(grp: H5GroupLike) -> List[H5NodeLike]:
+            # NOTE: v can be None e.g. when nodes are deleted during iteration
+            vals = (v for v in grp.values() if v is not None)
+            return [v for v in vals if not M.is_internal_path(v.name)][::-1]
+
+        prefix_len = len(self.name.rstrip("/")) + 1
+        stack: List[H5NodeLike] = children(self.__wrapped__)
+        while stack:
+            curr = stack.pop()
+            is_group = isinstance(curr, _GROUP_CLASSES) or isinstance(curr, H5GroupLike)
+            yield (curr.name[prefix_len:], NodeHandle(self, curr, is_group))
+            if is_group:
+                stack += children(cast(H5GroupLike, curr))
+
     # paths passed to visit also must be filtered, so must override this one too
     def visit(self, func):
         def wrapped_func(name, _):
@@ -419,28 +475,24 @@ class MetadorGroup(MetadorNode):
         self._guard_path(source)
         self._guard_path(dest)
 
-        src_metadir = self[source].meta._base_dir
+        src_node = self[source]
+        src_path = src_node.name  # NOTE: node object will follow the move
+        src_metadir = src_node.meta._base_dir
         # if actual data move fails, an exception will prevent the rest
         self.__wrapped__.move(source, dest)  # RAW
 
         # if we're here, no problems -> proceed with moving metadata
         dst_node = self[dest]
+        links = self._self_container.metador._links
         if isinstance(dst_node, MetadorDataset):
             dst_metadir = dst_node.meta._base_dir
             # dataset has its metadata stored in parallel -> need to take care of it
-            meta_base = dst_metadir
             if src_metadir in self.__wrapped__:  # RAW
                 self.__wrapped__.move(src_metadir, dst_metadir)  # RAW
+            links.relink_moved(src_metadir, dst_metadir)
         else:
-            # directory where to fix up metadata object TOC links
-            # when a group was moved, all metadata is contained in dest -> search it
-            meta_base = dst_node.name
-
-        # re-link metadata object TOC links
-        if meta_base_node := self.__wrapped__.get(meta_base):
-            assert isinstance(meta_base_node, H5GroupLike)
-            missing = self._self_container.metador._links.find_missing(meta_base_node)
-            self._self_container.metador._links.repair_missing(missing, update=True)
+            # when a group was moved, all metadata is contained in dest
+            links.relink_moved(src_path, dst_node.name)
 
     def copy(
         self,
@@ -492,17 +544,15 @@ class MetadorGroup(MetadorNode):
         self.__wrapped__.copy(source, dst_path, **copy_kwargs)  # RAW
         dst_node = self[dst_path]  # exists now
 
+        links = self._self_container.metador._links
         if src_is_dataset and not without_meta:
             # because metadata lives in parallel group, need to copy separately:
             src_meta: str = src_node.meta._base_dir
             dst_meta: str = dst_node.meta._base_dir  # node will not exist yet
-            self.__wrapped__.copy(src_meta, dst_meta, **copy_kwargs)  # RAW
-
-            # register in TOC:
-            dst_meta_node = self.__wrapped__[dst_meta]
-            assert isinstance(dst_meta_node, H5GroupLike)
-            missing = self._self_container.metador._links.find_missing(dst_meta_node)
-            self._self_container.metador._links.repair_missing(missing)
+            if src_meta in self.__wrapped__:  # RAW
+                self.__wrapped__.copy(src_meta, dst_meta, **copy_kwargs)  # RAW
+                # register in TOC under new uuids:
+                links.relink_copied(src_meta, dst_meta)
 
         if not src_is_dataset:
             if without_meta:
@@ -511,8 +561,7 @@ class MetadorGroup(MetadorNode):
                 dst_node._destroy_meta(_unlink=False)
             else:
                 # register copied metadata objects under new uuids
-                missing = self._self_container.metador._links.find_missing(dst_node)
-                self._self_container.metador._links.repair_missing(missing)
+                links.relink_copied(src_node.name, dst_node.name)
 
     def __getattr__(self, key):
         if hasattr(self.__wrapped__, key):
@@ -522,6 +571,42 @@ class MetadorGroup(MetadorNode):
             raise AttributeError(msg)
 
 
+class NodeHandle:
+    """Lightweight handle of a node, produced by `MetadorGroup.walk`.
+
+    Unlike `MetadorNode`, it is not a proxy and only knows the path and kind of
+    the node. Use `node()` to get the node wrapper (with the same restrictions as
+    the group the traversal was started from).
+    """
+
+    __slots__ = ("name", "is_group", "_group", "_raw")
+
+    name: str
+    """Absolute path of the node in the container."""
+
+    is_group: bool
+    """Whether the node is a group (otherwise it is a dataset)."""
+
+    def __init__(self, group: MetadorGroup, raw: H5NodeLike, is_group: bool):
+        self.name = raw.name
+        self.is_group = is_group
+        self._group = group
+        self._raw = raw
+
+    def node(self) -> MetadorNode:
+        """Return the wrapped node."""
+        return self._group._wrap_if_node(self._raw)
+
+    @property
+    def meta(self) -> MetadorMeta:
+        """Access the interface to metadata attached to this node."""
+        return self.node().meta
+
+    def __repr__(self) -> str:
+        kind = "group" if self.is_group else "dataset"
+        return f"<{type(self).__name__} {kind} '{self.name}'>"
+
+
 # ----
 
 
@@ -545,11 +630,28 @@ class MetadorContainer(MetadorGroup):
 
     _self_toc: MetadorContainerTOC
 
+    _self_frozen: bool
+    """Whether the container is frozen (i.e. read-only and assumed to be unchanging)."""
+
+    _self_meta_dirs: Optional[Set[str]]
+    """Paths of existing metadata groups (only used in frozen mode)."""
+
+    _self_meta_cache: Dict[str, Dict[str, StoredMetadata]]
+    """Loaded information about metadata objects per metadata group (in frozen mode)."""
+
+    _self_cache_lock: Lock
+    """Lock for lazily computed caches (the container can be shared by threads)."""
+
     @property
     def metador(self) -> MetadorContainerTOC:
         """Access interface to Metador metadata object index."""
         return self._self_toc
 
+    @property
+    def frozen(self) -> bool:
+        """Return whether the container is frozen."""
+        return self._self_frozen
+
     def __init__(
         self,
         name_or_obj: Union[MetadorDriver, Any],
@@ -557,6 +659,7 @@ class MetadorContainer(MetadorGroup):
         *,
         # NOTE: driver takes class instead of enum to also allow subclasses
         driver: Optional[Type[MetadorDriver]] = None,
+        frozen: bool = False,
     ):
         """Initialize a MetadorContainer instance from file(s) or a supported object.
 
@@ -564,42 +667,55 @@ class MetadorContainer(MetadorGroup):
 
         If a data source such as a path is passed, will instantiate the object first,
         using the default H5File driver or the passed `driver` keyword argument.
+
+        If `frozen` is set, the container must be opened in read-only mode and all
+        nodes are marked as `read_only`. As the container cannot change, information
+        about the attached metadata is derived from the TOC and cached, which makes
+        traversals and queries considerably faster in read-only analysis workloads.
         """
+        raw = to_h5filelike(name_or_obj, mode, driver=driver)
+        if frozen and raw.mode != "r":
+            if raw is not name_or_obj:
+                raw.close()  # we opened it, so we must close it
+            msg = "Only containers opened in read-only mode can be frozen!"
+            raise ValueError(msg)
+
         # wrap the h5file-like object (will set self.__wrapped__)
-        super().__init__(self, to_h5filelike(name_or_obj, mode, driver=driver))
+        super().__init__(self, raw)
+        self._self_frozen = frozen
+        self._self_meta_dirs = None
+        self._self_meta_cache = {}
+        self._self_cache_lock = Lock()
+        if frozen:
+            self.restrict(read_only=True)
         # initialize metador-specific stuff
         self._self_toc = MetadorContainerTOC(self)
 
-    # not clear if we want these in the public interface. keep this private for now:
-
-    # def _find_orphan_meta(self) -> List[str]:
-    #     """Return list of paths to metadata that has no corresponding user node anymore."""
-    #     ret: List[str] = []
-
-    #     def collect_orphans(name: str):
-    #         if M.is_meta_base_path(name):
-    #             if M.to_data_node_path(name) not in self:
-    #                 ret.append(name)
-
-    #     self.__wrapped__.visit(collect_orphans)
-    #     return ret
+    def _has_meta_dir(self, path: str) -> bool:
+        """Return whether a metadata group exists at given path (frozen mode only).
 
-    # def _repair(self, remove_orphans: bool = False):
-    #     """Repair container structure on best-effort basis.
-
-    #     This will ensure that the TOC points to existing metadata objects
-    #     and that all metadata objects are listed in the TOC.
-
-    #     If remove_orphans is set, will erase metadata not belonging to an existing node.
-
-    #     Notice that missing schema plugin dependency metadata cannot be restored.
-    #     """
-    #     if remove_orphans:
-    #         for path in self._find_orphan_meta():
-    #             del self.__wrapped__[path]
-    #     self.toc._links.find_broken(repair=True)
-    #     missing = self.toc._links._find_missing("/")
-    #     self.toc._links.repair_missing(missing)
+        Uses the TOC to avoid lookups of metadata groups of nodes without metadata.
+        """
+        if self._self_meta_dirs is None:
+            with self._self_cache_lock:
+                if self._self_meta_dirs is None:
+                    targets = self._self_toc._links.find_below("/").values()
+                    self._self_meta_dirs = {t.rsplit("/", 1)[0] for t in targets}
+        return path in self._self_meta_dirs
+
+    def fsck(self, repair: bool = False) -> FsckResult:
+        """Check consistency of the metadata index (TOC) and stored metadata objects.
+
+        Reports broken and missing TOC links, UUID collisions
+        and schemas or packages listed in the TOC that are not used anymore.
+
+        If `repair` is set, will fix all found inconsistencies on best-effort basis.
+        Notice that objects of schemas that are neither listed in the container
+        nor installed in the environment cannot be registered (raises KeyError).
+        """
+        if repair:
+            self._guard_acl(NodeAcl.read_only, "fsck")
+        return self._self_toc._fsck(repair=repair)
 
     # ---- pass through HDF5 group methods to a wrapped root group instance ----
 
@@ -1,9 +1,8 @@
-import magic
 from PIL import Image
 
 from ..harvester import FileHarvester
 from ..plugins import schemas
-from ..util.hashsums import hashsum
+from ..util.hashsums import cached_scan
 
 FileMeta = schemas["core.file"]
 ImageFileMeta = schemas["core.imagefile"]
@@ -15,6 +14,9 @@ class FileMetaHarvester(FileHarvester):
     """Default harvester for basic common.file metadata.
 
     Harvests file name, file size, mimetype and hashsum of the file.
+
+    The file is read only once (and not at all, if it was scanned recently,
+    e.g. when computing the hashsums of a directory to be packed).
     """
 
     class Plugin:
@@ -25,11 +27,12 @@ class FileMetaHarvester(FileHarvester):
     def run(self):
         path = self.args.filepath
 
-        sz = path.stat().st_size
-        hs = hashsum(open(path, "rb"), "sha256")
-        mt = magic.from_file(path, mime=True)
+        scan = cached_scan(path, "sha256")
         return self.schema(
-            filename=path.name, contentSize=sz, sha256=hs, encodingFormat=mt
+            filename=path.name,
+            contentSize=scan.stat.size,
+            sha256=scan.hashsum,
+            encodingFormat=scan.mimetype,
         )
 
 
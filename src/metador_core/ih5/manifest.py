@@ -253,6 +253,8 @@ class IH5MFRecord(IH5Record):
         cls,
         record: Union[Path, str],
         manifest_file: Path,
+        *,
+        data: Optional[Dict[str, Any]] = None,
     ) -> IH5MFRecord:
         """Create a stub base container for patching an existing but unavailable record.
 
@@ -264,6 +266,13 @@ class IH5MFRecord(IH5Record):
         whose metadata the stub is based on.
 
         The returned container is read-only and only serves as base for patches.
+        Its manifest inherits the extensions of the passed manifest.
+
+        Args:
+            record: Path of the stub container to be created
+            manifest_file: Manifest of the latest patch of the original record
+            data: Values to fill into some datasets of the stub (by absolute path),
+                for datasets that must be readable in order to write a patch
         """
         manifest = IH5Manifest.parse_file(manifest_file)
 
@@ -283,9 +292,10 @@ class IH5MFRecord(IH5Record):
 
         # create and finalize the stub (override userblock and create skeleton structure)
         ds = IH5MFRecord._create(Path(record))
-        init_stub_base(ds, user_block, skeleton)  # prepares structure and user block
+        # prepares structure and user block
+        init_stub_base(ds, user_block, skeleton, data)
         # commit_patch() completes stub + fixes the hashsum
-        ds.commit_patch(__is_stub__=True)
+        ds.commit_patch(__is_stub__=True, manifest_exts=manifest.manifest_exts)
         assert not ds._has_writable
 
         return ds
@@ -45,8 +45,11 @@ def _is_del_mark(val) -> bool:
 
 def _node_is_del_mark(node) -> bool:
     """Return whether node is marking a deleted group/dataset/attribute value."""
-    val = node[()] if isinstance(node, h5py.Dataset) else node
-    return _is_del_mark(val)
+    if isinstance(node, h5py.Dataset):
+        if node.shape != () or node.dtype.kind != "V":
+            return False  # not an opaque scalar, no need to read the value
+        return _is_del_mark(node[()])
+    return _is_del_mark(node)
 
 
 # attribute key marking group substitution (instead of pass-through default for groups)
@@ -587,7 +590,8 @@ class IH5Group(IH5InnerNode):
         self._guard_key(path)
         self._guard_value(data)
 
-        if unknown_kwargs := set(kwargs.keys()) - {"compression", "compression_opts"}:
+        allowed_kwargs = {"chunks", "compression", "compression_opts", "shuffle"}
+        if unknown_kwargs := set(kwargs.keys()) - allowed_kwargs:
             raise ValueError(f"Unkown kwargs: {unknown_kwargs}")
 
         path = self._abs_path(path)
@@ -6,7 +6,7 @@ ignoring the actual data content (attribute values and datasets).
 This can be used to implement manifest file and support "patching in thin air",
 i.e. without having the actual container.
 """
-from typing import Dict, Literal, Union
+from typing import Any, Dict, Literal, Mapping, Optional, Union
 
 import h5py
 from pydantic import BaseModel
@@ -80,27 +80,42 @@ class IH5Skeleton(BaseModel):
 # in order to make this generic over subtypes (IH5Record, IH5MFRecord)!
 
 
-def init_stub_skeleton(ds: IH5Record, skel: IH5Skeleton):
-    """Fill a passed fresh container with stub structure based on a skeleton."""
+def init_stub_skeleton(
+    ds: IH5Record, skel: IH5Skeleton, data: Optional[Mapping[str, Any]] = None
+):
+    """Fill a passed fresh container with stub structure based on a skeleton.
+
+    If `data` is passed, the datasets at the given paths are filled with
+    the given values instead of empty dummy values.
+    """
     if len(ds) or len(ds.attrs):
         raise ValueError("Container not empty, cannot initialize stub structure here!")
+    data = data or {}
+    for k in data.keys():
+        if k not in skel.__root__ or skel.__root__[k].node_type != H5Type.dataset:
+            raise ValueError(f"Cannot fill stub data, no dataset in skeleton: {k}")
 
     for k, v in skel.__root__.items():
         if v.node_type == H5Type.group:
             if k not in ds:
                 ds.create_group(k)
         elif v.node_type == H5Type.dataset:
-            ds[k] = h5py.Empty(None)
+            ds[k] = data.get(k, h5py.Empty(None))
 
         for a in v.attrs.keys():
             ds[k].attrs[a] = h5py.Empty(None)
 
 
-def init_stub_base(target: IH5Record, src_ub: IH5UserBlock, src_skel: IH5Skeleton):
+def init_stub_base(
+    target: IH5Record,
+    src_ub: IH5UserBlock,
+    src_skel: IH5Skeleton,
+    data: Optional[Mapping[str, Any]] = None,
+):
     """Prepare a stub base container, given empty target, source user block and skeleton.
 
     Patches on top of this container will work with the original container.
     """
-    init_stub_skeleton(target, src_skel)
+    init_stub_skeleton(target, src_skel, data)
     # mark as base container
     target._set_ublock(-1, src_ub.copy(update={"prev_patch": None}))
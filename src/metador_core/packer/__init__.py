@@ -1,22 +1,26 @@
 """Definition of HDF5 packer plugin interface."""
 from __future__ import annotations
 
+import shutil
 from abc import ABC, abstractmethod
 from io import UnsupportedOperation
 from pathlib import Path
-from typing import Callable, Tuple, Type
+from tempfile import TemporaryDirectory
+from typing import Callable, Optional, Tuple, Type
 
 import wrapt
 from overrides import EnforceOverrides, overrides
 
 from ..container import MetadorContainer
-from ..ih5.manifest import IH5MFRecord
+from ..ih5.manifest import IH5Manifest, IH5MFRecord
 from ..plugin import interface as pg
 from ..plugins import plugingroups
 from ..schema.core import MetadataSchema
-from ..schema.plugins import PluginPkgMeta
-from ..util.diff import DirDiff
-from ..util.hashsums import DirHashsums, dir_hashsums
+from ..schema.plugins import PluginPkgMeta, PluginRef
+from ..util.diff import DiffNode, DirDiff
+from ..util.hashsums import DirHashsums, HashCache, dir_hashsums
+from .plan import UpdatePlan, plan_update
+from .stub import ManifestTOC, create_stub
 from .types import DirValidationErrors
 
 
@@ -99,6 +103,9 @@ class Packer(ABC, EnforceOverrides):
 
     Plugin: PackerPlugin
 
+    PATH_MAPPING: bool = False
+    """Whether the packer declares its path mapping (see `container_path`)."""
+
     @classmethod
     @abstractmethod
     def check_dir(cls, data_dir: Path) -> DirValidationErrors:
@@ -175,6 +182,28 @@ class Packer(ABC, EnforceOverrides):
         # default fallback implementation using update
         return cls.update(mc, data_dir, DirDiff.compare({}, dir_hashsums(data_dir)))
 
+    @classmethod
+    def container_path(cls, path: Path, obj_type: DiffNode.ObjType) -> Optional[str]:
+        """Return the container path that an entity in the source directory maps to.
+
+        This method is optional and is only used to plan updates without running
+        them (see `PGPacker.plan_update`), if `PATH_MAPPING` is set. Otherwise,
+        planning assumes that the whole directory is repacked.
+        By default, each entity maps to the same path in the container.
+
+        It MUST be consistent with `update`, i.e. an update changes (only) the
+        container paths of the changed source directory entities.
+
+        Args:
+            path: Path of the entity (relative to the source directory)
+            obj_type: Type of the entity (directory, file or symlink)
+
+        Returns:
+            Path in the container that is created, deleted or rewritten if the
+            entity changes, or None if it is not packed into its own node.
+        """
+        return str(path)
+
 
 class PackerInfo(MetadataSchema):
     """Schema for info about the packer that was used to create a container."""
@@ -183,7 +212,7 @@ class PackerInfo(MetadataSchema):
         name = "core.packerinfo"
         version = (0, 1, 0)
 
-    packer: PGPacker.PluginRef
+    packer: PluginRef
     """Packer plugin used to pack the container."""
 
     pkg: PluginPkgMeta
@@ -252,7 +281,9 @@ class PGPacker(pg.PluginGroup[Packer]):
 
     # ----
 
-    def _prepare(self, pname: str, srcdir: Path) -> Tuple[Type[Packer], DirHashsums]:
+    def _prepare(
+        self, pname: str, srcdir: Path, hash_cache: Optional[Path] = None
+    ) -> Tuple[Type[Packer], DirHashsums]:
         """Return packer class and hashsums of given directory.
 
         Raises an exception if packer is not found or `packer.check_dir` fails.
@@ -260,10 +291,19 @@ class PGPacker(pg.PluginGroup[Packer]):
         packer = self[pname]
         if errs := packer.check_dir(srcdir):
             raise errs
-        return (packer, dir_hashsums(srcdir))
+        if hash_cache is None:
+            return (packer, dir_hashsums(srcdir))
+        with HashCache(hash_cache) as cache:
+            return (packer, dir_hashsums(srcdir, cache=cache))
 
     def pack(
-        self, packer_name: str, data_dir: Path, target: Path, h5like_cls: Callable
+        self,
+        packer_name: str,
+        data_dir: Path,
+        target: Path,
+        h5like_cls: Callable,
+        *,
+        hash_cache: Optional[Path] = None,
     ):
         """Pack a directory into a container using an installed packer.
 
@@ -284,42 +324,184 @@ class PGPacker(pg.PluginGroup[Packer]):
             data_dir: data source directory
             target: target path for resulting container
             h5like_cls: class to use for creating the container
+            hash_cache: file for a `HashCache` of the source files (outside `data_dir`)
         """
-        packer, hashsums = self._prepare(packer_name, data_dir)
+        packer, hashsums = self._prepare(packer_name, data_dir, hash_cache)
         # use skel_only to enforce stub-compatibility of packer
         container = MetadorContainer(h5like_cls(target, "x")).restrict(skel_only=True)
         packer.pack(Unclosable(container), data_dir)
         self._finalize(packer_name, hashsums, container)
 
-    def update(self, packer_name: str, data_dir: Path, target: Path, h5like_cls):
+    def plan_update(
+        self,
+        packer_name: str,
+        data_dir: Path,
+        manifest_file: Path,
+        *,
+        hash_cache: Optional[Path] = None,
+    ) -> UpdatePlan:
+        """Plan an update of a container without running it (dry run).
+
+        The changes are computed based only on the manifest (see `IH5MFRecord`)
+        of the container, which must have been packed with a compatible packer.
+        The container itself is not needed.
+
+        Args:
+            packer_name: installed packer plugin name
+            data_dir: data source directory
+            manifest_file: manifest file of the latest container patch
+            hash_cache: file for a `HashCache` of the source files (outside `data_dir`)
+        """
+        manifest = IH5Manifest.parse_file(manifest_file)
+        packer, _, diff = self._prepare_mf(packer_name, data_dir, manifest, hash_cache)
+        return plan_update(packer, data_dir, diff, manifest.skeleton.__root__.keys())
+
+    def _prepare_mf(
+        self,
+        pname: str,
+        srcdir: Path,
+        manifest: IH5Manifest,
+        hash_cache: Optional[Path] = None,
+    ) -> Tuple[Type[Packer], DirHashsums, DirDiff]:
+        """Like `_prepare`, but also return diff since the container was packed.
+
+        Raises an exception if the manifest has no compatible packer info.
+        """
+        if (pinfo_dict := manifest.manifest_exts.get(self.name)) is None:
+            raise ValueError(f"Manifest does not have {self.name} extension!")
+        pinfo = PackerInfo.parse_obj(pinfo_dict)
+        self._check_compatible(pname, pinfo)
+
+        packer, hashsums = self._prepare(pname, srcdir, hash_cache)
+        return (packer, hashsums, DirDiff.compare(pinfo.source_dir, hashsums))
+
+    def _check_compatible(self, packer_name: str, pinfo: Optional[PackerInfo]):
+        if not pinfo:
+            msg = f"Container does not have {self._PACKER_INFO_NAME} metadata!"
+            raise ValueError(msg)
+        curr_ref = self.resolve(packer_name)
+        if not curr_ref.supports(pinfo.packer):
+            msg = f"{curr_ref} (installed) does not support {pinfo.packer} (container)!"
+            raise ValueError(msg)
+
+    def update(
+        self,
+        packer_name: str,
+        data_dir: Path,
+        target: Path,
+        h5like_cls,
+        *,
+        hash_cache: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+    ):
         """Update a container from its source directory using an installed packer.
 
         Like `pack`, but the `target` must be a container which can be opened
         with the `h5like_cls` and was packed by a compatible packer.
 
+        If the same `hash_cache` is used for packing and updating, only files
+        changed in the meantime are hashed to detect the changes.
+
+        If `max_bytes` is set, the update is rejected (before anything is written)
+        if it is expected to write more bytes (see `plan_update`). This is not
+        checked for packers that implement `update` without declaring their path
+        mapping, as the number of written bytes cannot be estimated for them.
+
         In case an exception happens during packing, notice that no cleanup is done
         and if the container has been written to, the changes persist.
 
         The user is responsible for removing inconsistent files that were created
         and ensuring that the previous state can be restored, e.g. from a backup.
         """
-        packer, hashsums = self._prepare(packer_name, data_dir)
+        packer, hashsums = self._prepare(packer_name, data_dir, hash_cache)
         # use skel_only to enforce stub-compatibility of packer
         container = MetadorContainer(h5like_cls(target, "r+")).restrict(skel_only=True)
 
         # check compatibility
         pinfo = container.meta.get(self._PACKER_INFO_NAME)
-        if not pinfo:
-            msg = f"Container does not have {self._PACKER_INFO_NAME} metadata!"
-        curr_ref = self.resolve(packer_name)
-        if not curr_ref.supports(pinfo.packer):
-            msg = f"{curr_ref} (installed) does not support {pinfo.packer} (container)!"
-            raise ValueError(msg)
+        self._check_compatible(packer_name, pinfo)
 
         diff = DirDiff.compare(pinfo.source_dir, hashsums)
+        if max_bytes is not None:
+            try:
+                plan = plan_update(packer, data_dir, diff)
+                self._check_max_bytes(packer, plan, max_bytes)
+            except ValueError:
+                container.close()
+                raise
         packer.update(Unclosable(container), data_dir, diff)
         self._finalize(packer_name, hashsums, container)
 
+    def update_from_manifest(
+        self,
+        packer_name: str,
+        data_dir: Path,
+        manifest_file: Path,
+        target_dir: Path,
+        *,
+        record_name: Optional[str] = None,
+        hash_cache: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Tuple[Path, Path]:
+        """Create a patch for a container, based only on its latest manifest.
+
+        Like `update`, but the container is not needed. Instead, a stub is created
+        based on the manifest, which must have been written by a compatible packer
+        (i.e. the latest patch of the container was created with `pack` or `update`
+        and `IH5MFRecord`). Then only the new patch and its manifest are written
+        into `target_dir`, so they can be added to the container files (wherever
+        they are located). The stub is created in a temporary directory.
+
+        Args:
+            packer_name: installed packer plugin name
+            data_dir: data source directory
+            manifest_file: manifest file of the latest container patch
+            target_dir: existing directory where the patch and manifest are written
+            record_name: name of the record (default: inferred from `manifest_file`)
+            hash_cache: file for a `HashCache` of the source files (outside `data_dir`)
+            max_bytes: reject update if it is expected to write more bytes
+
+        Returns:
+            Paths of the new patch file and its manifest file.
+        """
+        manifest = IH5Manifest.parse_file(manifest_file)
+        packer, hashsums, diff = self._prepare_mf(
+            packer_name, data_dir, manifest, hash_cache
+        )
+        if max_bytes is not None:
+            skeleton = manifest.skeleton.__root__.keys()
+            plan = plan_update(packer, data_dir, diff, skeleton)
+            self._check_max_bytes(packer, plan, max_bytes)
+
+        name = record_name or IH5MFRecord._infer_name(manifest_file)
+        with TemporaryDirectory() as tmp_dir:
+            stub = create_stub(Path(tmp_dir) / name, manifest_file)
+            stub.create_patch()
+            patch_file = stub.ih5_files[-1]
+            patch_mf = IH5MFRecord._manifest_filepath(patch_file)
+
+            try:
+                # use skel_only to enforce stub-compatibility of packer
+                container = MetadorContainer(stub).restrict(skel_only=True)
+                packer.update(Unclosable(container), data_dir, diff)
+                self._finalize(packer_name, hashsums, container)
+            except BaseException:
+                stub.close(commit=False)
+                raise
+
+            ret = (target_dir / patch_file.name, target_dir / patch_mf.name)
+            shutil.move(str(patch_file), ret[0])
+            shutil.move(str(patch_mf), ret[1])
+        return ret
+
+    @staticmethod
+    def _check_max_bytes(packer: Type[Packer], plan: UpdatePlan, max_bytes: int):
+        if plan.full_repack and pg.util.implements_method(packer, Packer.update):
+            return  # packer does its own updates, the plan is no useful estimate
+        if plan.bytes_written > max_bytes:
+            msg = f"Update would write ~{plan.bytes_written} bytes (> {max_bytes})!"
+            raise ValueError(msg)
+
     def _finalize(self, pname: str, hsums: DirHashsums, cont: MetadorContainer):
         """Set or update packer info in container and close it."""
         if self._PACKER_INFO_NAME in cont.meta:
@@ -329,11 +511,15 @@ class PGPacker(pg.PluginGroup[Packer]):
         pinfo.source_dir = hsums
         cont.meta[self._PACKER_INFO_NAME] = pinfo
 
-        if isinstance(cont, IH5MFRecord):
+        raw = cont.__wrapped__
+        if isinstance(raw, IH5MFRecord):
             # when using IH5MFRecord,
             # we want the packerinfo in the manifest, so tooling can decide
             # if a container can be updated without having it available.
-            # (default manifest already has enough info for creating stubs)
-            cont.manifest.manifest_exts[self.name] = pinfo.dict()
+            # (the TOC copy is needed to create stubs usable with MetadorContainer)
+            exts = {} if raw._manifest is None else dict(raw.manifest.manifest_exts)
+            exts[self.name] = pinfo.dict()
+            ManifestTOC.for_record(raw).update(exts)
+            raw.commit_patch(manifest_exts=exts)
 
         cont.close()
@@ -9,20 +9,52 @@ To develop your own packer plugin, implement a class deriving from
 is registered as a packer plugin called `example`.)
 """
 
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 import pandas
 from overrides import overrides
 
 from ..util.diff import DiffNode, DirDiff
 from . import MetadorContainer, Packer
-from .utils import DirValidationErrors, check_metadata_file, pack_file
+from .parallel import PackQueue
+from .storage import StoragePolicy, StorageStats
+from .utils import (
+    DirValidationErrors,
+    PreparedFile,
+    check_metadata_file,
+    pack_file,
+    prepare_file,
+)
 
 BibMeta = Any
 TableMeta = Any
 
 
+def _read_table(path: Path, policy: StoragePolicy):
+    """Parse a CSV file (runs in a worker process)."""
+    return policy.normalize_table(pandas.read_csv(path))
+
+
+def _write_table(
+    policy: StoragePolicy, mc: MetadorContainer, key: str, sidecar: str, data
+):
+    policy.create_dataset(mc, key, data=data)
+    mc[key].meta["common_table"] = TableMeta.for_file(sidecar)
+
+
+def _write_file(
+    policy: StoragePolicy,
+    mc: MetadorContainer,
+    key: str,
+    path: Path,
+    prep: PreparedFile,
+):
+    pack_file(mc, path, target=key, prepared=prep, policy=policy)
+
+
 class GenericPacker(Packer):
     """The generic packer is demonstrating how a packer can be implemented.
 
@@ -36,6 +68,12 @@ class GenericPacker(Packer):
 
     All symlinks inside the directory are completely ignored.
 
+    Files are read and parsed in parallel (see `PackQueue`), but the container
+    is always modified in the same order, independent of the number of workers.
+
+    Tables and files are stored according to a `StoragePolicy` (chunking,
+    compression and compact types), its statistics are printed after each update.
+
     This packer does very verbose logging for didactic purposes.
     Other packers may log their actions as they deem appropriate.
     """
@@ -46,6 +84,17 @@ class GenericPacker(Packer):
 
     META_SUFFIX: str = "_meta.yaml"
 
+    PATH_MAPPING = True
+
+    WORKERS: Optional[int] = None
+    """Number of processes preparing files (default: number of CPUs)."""
+
+    STORAGE: StoragePolicy = StoragePolicy()
+    """Storage policy for packed tables and files.
+
+    Each update uses a copy of it with separate statistics.
+    """
+
     @classmethod
     def sidecar_for(cls, path: Union[Path, str]) -> str:
         """Sidecar file name for given path."""
@@ -64,21 +113,40 @@ class GenericPacker(Packer):
         )
         return errs
 
+    @classmethod
+    @overrides
+    def container_path(cls, path: Path, obj_type: DiffNode.ObjType) -> Optional[str]:
+        if obj_type == DiffNode.ObjType.symlink or path.name.endswith(cls.META_SUFFIX):
+            return None  # ignored or stored as metadata of another node
+        return str(path)  # each file maps 1-to-1 to a container path
+
     @classmethod
     @overrides
     def update(cls, mc: MetadorContainer, data_dir: Path, diff: DirDiff):
         print("--------")
         print("called update")
 
-        for path, dnode in diff.annotate(data_dir).items():
+        policy = replace(cls.STORAGE, stats=StorageStats())
+        with PackQueue(cls.WORKERS) as q:
+            cls._queue_update(q, mc, data_dir, diff, policy)
+        print("STORAGE:", policy.stats)
+
+    @classmethod
+    def _queue_update(
+        cls,
+        q: PackQueue,
+        mc: MetadorContainer,
+        data_dir: Path,
+        diff: DirDiff,
+        policy: StoragePolicy,
+    ):
+        """Submit all steps needed to update the container to the queue."""
+        # unchanged paths need no work, so we can skip them (without walking data_dir)
+        for path, dnode in diff.iter_annotate(data_dir, skip_unchanged=True):
             # the status indicates whether the file was added, removed or modified
             status = diff.status(dnode)
             print(status.value, path)
 
-            if dnode is None:  # unchanged paths in the directory have no diff node
-                print("IGNORE:", path, "(unchanged)")
-                continue  # nothing to do
-
             if path.is_symlink():  # we ignore symlinks in the data directory
                 print("IGNORE:", path, "(symlink)")
                 continue
@@ -95,7 +163,7 @@ class GenericPacker(Packer):
                 # also remove in container, if it was not a symlink (which we ignored)
                 if dnode.prev_type != DiffNode.ObjType.symlink:
                     print("DELETE:", key)
-                    del mc[key]
+                    q.write(mc.__delitem__, key)
                 continue
 
             if status == DiffNode.Status.modified:  # changed
@@ -105,39 +173,41 @@ class GenericPacker(Packer):
                 # otherwise it was replaced either file -> dir or dir -> file, so
                 # remove entity, proceeding with loop body to add new entity version
                 print("DELETE:", key)
-                del mc[key]
+                q.write(mc.__delitem__, key)
 
             # now we (re-)add new or modified entities:
             if path.is_dir():
                 print("CREATE:", path, "->", key, "(dir)")
 
-                mc.create_group(key)
+                q.write(mc.create_group, key)
 
             elif path.is_file():
                 if path.name.endswith(cls.META_SUFFIX):
                     if key == cls.META_SUFFIX:
                         # update root meta
                         print("CREATE:", path, "->", key, "(biblio metadata)")
-                        mc.meta["common_biblio"] = BibMeta.parse_file(path)
+                        bib = BibMeta.parse_file(path)
+                        q.write(mc.meta.__setitem__, "common_biblio", bib)
                 else:
                     if path.name.lower().endswith(".csv"):
                         # embed CSV as numpy array with table metadata
                         print("CREATE:", path, "->", key, "(table)")
 
-                        mc[key] = pandas.read_csv(path).to_numpy()  # type: ignore
-                        mc[key].meta["common_table"] = TableMeta.for_file(
-                            cls.sidecar_for(path)
-                        )
+                        sidecar = cls.sidecar_for(path)
+                        write = partial(_write_table, policy, mc, key, sidecar)
+                        q.submit(_read_table, path, policy, write=write)
 
                     elif path.name.lower().endswith((".jpg", ".jpeg", ".png")):
                         # embed image file with image-specific metadata
                         print("CREATE:", path, "->", key, "(image)")
-                        pack_file(mc, path, target=key)
+                        write = partial(_write_file, policy, mc, key, path)
+                        q.submit(prepare_file, path, write=write)
                         # mc[key].meta["common_image"] = image_meta_for(path)
 
                     else:
                         # treat as opaque blob and add file metadata
                         print("CREATE:", path, "->", key, "(file)")
-                        pack_file(mc, path, target=key)
+                        write = partial(_write_file, policy, mc, key, path)
+                        q.submit(prepare_file, path, write=write)
 
                     # mc[key].meta["common_file"] = file_meta_for(path)
@@ -0,0 +1,164 @@
+"""Parallel preparation of data for packers.
+
+Packers usually process many independent files, and most of the work
+(parsing, harvesting metadata, hashing) does not need the container.
+A `PackQueue` runs such preparation steps in a process pool, while all
+changes to the container are done by a single writer thread
+in the order the steps were submitted.
+
+Because the container is modified in exactly the same order with exactly the
+same data, the result does not depend on the number of workers.
+Notice that HDF5 also stores modification times of objects, so files written
+at different times are only byte-identical if this is disabled
+(e.g. `create_dataset(..., track_times=False)` in h5py).
+
+Example:
+    ```python
+    with PackQueue(workers=4) as q:
+        for path in files:
+            q.submit(prepare_file, path, write=partial(write_file, mc, path))
+        q.write(mc.create_group, "empty")
+    ```
+"""
+from __future__ import annotations
+
+import os
+import queue
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from threading import BoundedSemaphore, Thread
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_Job = Tuple[Future, Optional[Callable[[Any], Any]]]
+
+
+def _done(value: Any) -> Future:
+    fut: Future = Future()
+    fut.set_result(value)
+    return fut
+
+
+class PackQueue:
+    """Work queue with parallel preparation and ordered, serial writing.
+
+    Preparation functions and their arguments must be picklable
+    (i.e. defined on module level) and their results are sent back to the
+    writer, so they should not be larger than necessary.
+    Write functions are called with the result of the preparation
+    in the order of submission and may access the container.
+
+    While the queue is open, the container must only be accessed through it.
+    If a step fails, the remaining writes are skipped and the first exception
+    is raised when the queue is closed (or on the next submission).
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        *,
+        executor: Optional[Executor] = None,
+        max_pending: Optional[int] = None,
+    ):
+        """Create a work queue.
+
+        Args:
+            workers: Number of worker processes (default: number of CPUs).
+                If 0, all steps are run directly in the calling thread.
+            executor: Executor to use instead of a new process pool
+            max_pending: Max. number of submitted steps that are not written yet
+                (limits the memory used by prepared results, default: 2 per worker)
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self._sync = executor is None and workers == 0
+
+        self._executor = executor
+        self._own_executor = False
+        if executor is None and not self._sync:
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            self._own_executor = True
+
+        self._pending = BoundedSemaphore(max_pending or 2 * max(workers, 1))
+        self._jobs: queue.Queue[Optional[_Job]] = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._writer: Optional[Thread] = None
+        if not self._sync:
+            self._writer = Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self._error is None:
+            self._error = exc  # skip the remaining writes
+        self.close(raise_error=exc is None)
+
+    # ----
+
+    def _write_loop(self) -> None:
+        while (job := self._jobs.get()) is not None:
+            fut, write = job
+            try:
+                if self._error is None:
+                    res = fut.result()
+                    if write is not None:
+                        write(res)
+                else:
+                    fut.cancel()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._pending.release()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(
+        self,
+        prepare: Callable[..., T],
+        *args: Any,
+        write: Optional[Callable[[T], Any]] = None,
+    ) -> None:
+        """Run `prepare(*args)` in a worker and then `write` with its result."""
+        self._check()
+        if self._sync:
+            res = prepare(*args)
+            if write is not None:
+                write(res)
+            return
+        self._pending.acquire()
+        assert self._executor is not None
+        try:
+            fut = self._executor.submit(prepare, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        self._jobs.put((fut, write))
+
+    def write(self, func: Callable[..., Any], *args: Any) -> None:
+        """Run `func(*args)` in the writer (after all previously submitted steps)."""
+        self._check()
+        if self._sync:
+            func(*args)
+            return
+        self._pending.acquire()
+        self._jobs.put((_done(args), lambda a: func(*a)))
+
+    def close(self, raise_error: bool = True) -> None:
+        """Wait until all steps are completed and shut down the workers.
+
+        Raises the first exception of a failed step, if any.
+        """
+        if self._writer is not None:
+            self._jobs.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if raise_error:
+            self._check()
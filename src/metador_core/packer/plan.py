@@ -0,0 +1,175 @@
+"""Dry-run planning of container updates done by packers.
+
+Based on a `DirDiff` of the source directory, the path mapping declared
+by a packer (see `Packer.container_path`) and optionally the skeleton
+of the container (e.g. from an `IH5Manifest`), an `UpdatePlan` lists the
+container paths that an update will create, delete or rewrite,
+with an estimate of the number of bytes to be written.
+
+No container (and no data in it) is opened to compute a plan.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Optional, Set, Type
+
+from ..container.utils import is_internal_path
+from ..util.diff import DiffNode, DirDiff, dir_paths
+
+if TYPE_CHECKING:
+    from . import Packer
+
+
+class PlannedAction(str, Enum):
+    """Change of a container path planned for an update."""
+
+    create = "+"
+    delete = "-"
+    rewrite = "~"
+
+
+class PlannedChange(NamedTuple):
+    """Planned change of a container path."""
+
+    action: PlannedAction
+    path: str
+    """Affected (absolute) path in the container."""
+
+    source: Optional[Path]
+    """Path in the source directory causing the change (relative to it)."""
+
+    bytes: int
+    """Estimated number of bytes written for this change."""
+
+
+@dataclass
+class UpdatePlan:
+    """Container changes that are expected for an update (see `plan_update`)."""
+
+    changes: List[PlannedChange] = field(default_factory=list)
+    """Planned changes, in the order they will be done."""
+
+    full_repack: bool = False
+    """True if the packer declares no path mapping (everything is assumed repacked)."""
+
+    def _with(self, action: PlannedAction) -> List[PlannedChange]:
+        return [c for c in self.changes if c.action == action]
+
+    @property
+    def creates(self) -> List[PlannedChange]:
+        return self._with(PlannedAction.create)
+
+    @property
+    def deletes(self) -> List[PlannedChange]:
+        return self._with(PlannedAction.delete)
+
+    @property
+    def rewrites(self) -> List[PlannedChange]:
+        return self._with(PlannedAction.rewrite)
+
+    @property
+    def paths(self) -> Set[str]:
+        """Return all container paths touched by the update."""
+        return {c.path for c in self.changes}
+
+    @property
+    def bytes_written(self) -> int:
+        """Return estimated total number of bytes written by the update."""
+        return sum(c.bytes for c in self.changes)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.changes
+
+
+def _abs_path(path: str) -> str:
+    """Normalize container path to be absolute (like in `IH5Skeleton`)."""
+    path = path.strip("/")
+    return f"/{path}" if path not in {"", "."} else "/"
+
+
+def _size(data_dir: Path, path: Path, obj_type: Optional[DiffNode.ObjType]) -> int:
+    if obj_type != DiffNode.ObjType.file:
+        return 0
+    return (data_dir / path).stat().st_size
+
+
+def plan_update(
+    packer: Type[Packer],
+    data_dir: Path,
+    diff: DirDiff,
+    skeleton: Optional[Iterable[str]] = None,
+) -> UpdatePlan:
+    """Compute the changes a packer will do to a container for an update.
+
+    Args:
+        packer: Packer class that will do the update
+        data_dir: Current source directory
+        diff: Changes in `data_dir` since the container was packed
+        skeleton: Container paths that currently exist (e.g. from `IH5Skeleton`)
+
+    Returns:
+        Plan with estimated changes. Sizes of written data are estimated
+        by the sizes of the source files. If the packer does not declare its
+        path mapping, the plan is a full repack of the directory.
+    """
+    existing = None
+    if skeleton is not None:
+        existing = {_abs_path(p) for p in skeleton if not is_internal_path(p)}
+    plan = UpdatePlan()
+    if diff.is_empty:
+        return plan
+
+    def exists(cpath: str) -> bool:
+        return existing is None or cpath in existing
+
+    def cpath_of(path: Path, obj_type) -> Optional[str]:
+        if obj_type is None:
+            return None
+        if (cpath := packer.container_path(path, obj_type)) is None:
+            return None
+        return _abs_path(cpath)
+
+    if not packer.PATH_MAPPING:
+        return _plan_repack(data_dir, existing)
+
+    for _, dnode in diff.iter_annotate(data_dir, skip_unchanged=True):
+        path, status = dnode.path, dnode.status()
+        prev_t, curr_t = dnode.prev_type, dnode.curr_type
+        if curr_t is not None and (data_dir / path).is_symlink():
+            # symlinks to files are hashed like files, but packers can tell them apart
+            prev_t = DiffNode.ObjType.symlink if prev_t == curr_t else prev_t
+            curr_t = DiffNode.ObjType.symlink
+        is_dir = prev_t == curr_t == DiffNode.ObjType.directory
+        if status == DiffNode.Status.modified and is_dir:
+            continue  # directory still exists, only its contents change
+
+        prev_cp, curr_cp = cpath_of(path, prev_t), cpath_of(path, curr_t)
+        if prev_cp is not None and prev_cp != curr_cp and exists(prev_cp):
+            change = (PlannedAction.delete, prev_cp, path, 0)
+            plan.changes.append(PlannedChange(*change))
+        if curr_cp is not None:
+            replaces = prev_cp == curr_cp or (existing is not None and exists(curr_cp))
+            action = PlannedAction.rewrite if replaces else PlannedAction.create
+            size = _size(data_dir, path, curr_t)
+            plan.changes.append(PlannedChange(action, curr_cp, path, size))
+    return plan
+
+
+def _plan_repack(data_dir: Path, existing: Optional[Set[str]]) -> UpdatePlan:
+    """Plan for packers without path mapping (container is cleared and repacked).
+
+    Container paths are assumed to mirror the paths in the source directory.
+    """
+    plan = UpdatePlan(full_repack=True)
+    for cpath in sorted(existing or ()):
+        if cpath != "/" and cpath.count("/") == 1:  # top-level nodes
+            plan.changes.append(PlannedChange(PlannedAction.delete, cpath, None, 0))
+    for path in dir_paths(data_dir):
+        is_file = (data_dir / path).is_file() and not (data_dir / path).is_symlink()
+        size = _size(data_dir, path, DiffNode.ObjType.file if is_file else None)
+        change = (PlannedAction.create, _abs_path(str(path)), path, size)
+        plan.changes.append(PlannedChange(*change))
+    return plan
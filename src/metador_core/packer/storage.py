@@ -0,0 +1,300 @@
+"""Storage policy for datasets created by packers.
+
+A `StoragePolicy` decides how data is laid out and filtered in a container,
+based on the size and type of each dataset:
+
+* small datasets and data that is already compressed (e.g. JPEG images, ZIP files)
+  or does not compress well on trial (e.g. random or encrypted bytes)
+  are stored contiguously without any filters (compressing them costs time
+  and saves nothing),
+* larger datasets are split into chunks of about `chunk_bytes` along the first axis
+  and compressed with `gzip`, or with the much faster `lzf` if they are very large,
+* multi-byte numeric data is shuffled before compression (bytes of the same
+  significance are grouped, which usually improves the compression ratio),
+* numeric tables are stored with the smallest lossless integer type
+  (see `StoragePolicy.normalize_table`).
+
+If the `hdf5plugin` package is installed, a non-portable policy uses the faster
+Blosc (with LZ4) and LZ4 filters instead. Notice that containers using these
+filters can only be read where `hdf5plugin` is installed as well.
+
+All datasets created through a policy are tracked in its `StorageStats`,
+to report the space saved and the time spent on writing the data.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional, Tuple
+
+import h5py
+import numpy
+import pandas
+
+from ..container.drivers import get_raw_dataset
+
+try:
+    import hdf5plugin
+except ImportError:  # pragma: no cover
+    hdf5plugin = None
+
+COMPRESSED_MIMETYPES = {
+    "application/gzip",
+    "application/zip",
+    "application/zstd",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-rar",
+    "application/x-xz",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+}
+"""MIME types of files that are not compressed further (in addition to audio/video)."""
+
+
+def is_compressed(mimetype: Optional[str]) -> bool:
+    """Return whether files of the given MIME type are already compressed."""
+    if mimetype is None:
+        return False
+    return mimetype in COMPRESSED_MIMETYPES or mimetype.startswith(("audio/", "video/"))
+
+
+def storage_size(node: Any) -> Optional[int]:
+    """Return number of bytes allocated in the file for a dataset (if known)."""
+    if (ds := get_raw_dataset(node)) is None:
+        return None
+    return ds.id.get_storage_size()
+
+
+@dataclass
+class StorageStats:
+    """Summary of datasets written with a `StoragePolicy`.
+
+    The counters are updated under a lock, so a policy can be shared by threads.
+    """
+
+    datasets: int = 0
+    """Number of created datasets."""
+
+    filtered: int = 0
+    """Number of datasets stored with compression."""
+
+    raw_bytes: int = 0
+    """Size of the written data (uncompressed)."""
+
+    stored_bytes: int = 0
+    """Size of the written data in the container."""
+
+    seconds: float = 0.0
+    """Time spent on creating and writing the datasets."""
+
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    @property
+    def saved_bytes(self) -> int:
+        """Return number of bytes saved by compression."""
+        return self.raw_bytes - self.stored_bytes
+
+    @property
+    def ratio(self) -> float:
+        """Return compression ratio (uncompressed / stored size)."""
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 1.0
+
+    def add(self, node: Any, raw_bytes: int, seconds: float, filtered: bool):
+        """Record a dataset written with the policy."""
+        # NOTE: unfiltered data is assumed to need no extra space, as the storage
+        # size does not include variable-length data and is not meaningful for it
+        stored = storage_size(node) if filtered else None
+        with self._lock:
+            self.datasets += 1
+            self.filtered += int(filtered)
+            self.raw_bytes += raw_bytes
+            self.stored_bytes += raw_bytes if stored is None else stored
+            self.seconds += seconds
+
+    def __getstate__(self):
+        # NOTE: policies are sent to worker processes, but locks can't be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Reset all counters."""
+        with self._lock:
+            for f in fields(self):
+                if f.init:
+                    setattr(self, f.name, f.default)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.datasets} datasets ({self.filtered} compressed): "
+            f"{self.raw_bytes} -> {self.stored_bytes} bytes "
+            f"(saved {self.saved_bytes} bytes, ratio {self.ratio:.2f}) "
+            f"in {self.seconds:.3f}s"
+        )
+
+
+def _nbytes(shape: Optional[Tuple[int, ...]], dtype: numpy.dtype) -> int:
+    return 0 if shape is None else math.prod(shape) * dtype.itemsize
+
+
+@dataclass
+class StoragePolicy:
+    """Rules for chunking, compression and types of datasets (see module docs)."""
+
+    min_size: int = 2**16
+    """Datasets smaller than this (in bytes) are not compressed."""
+
+    chunk_bytes: int = 2**20
+    """Target size of a chunk (in bytes)."""
+
+    fast_min_size: int = 2**26
+    """Datasets of at least this size are compressed with a fast compressor."""
+
+    level: int = 4
+    """Compression level of `gzip` (between 0 and 9)."""
+
+    sample_size: int = 2**16
+    """Number of bytes compressed on trial to check whether bytes are compressible."""
+
+    min_ratio: float = 1.1
+    """Bytes are only compressed if a sample compresses by at least this factor."""
+
+    portable: bool = True
+    """If False and `hdf5plugin` is installed, Blosc and LZ4 filters are used."""
+
+    stats: StorageStats = field(default_factory=StorageStats, compare=False)
+    """Summary of all datasets written with this policy."""
+
+    def chunks(self, shape: Tuple[int, ...], dtype: Any) -> Tuple[int, ...]:
+        """Return chunk shape for a (non-empty) dataset.
+
+        Chunks are split along the first axis and contain about `chunk_bytes`.
+        """
+        row_bytes = max(1, _nbytes(shape[1:], numpy.dtype(dtype)))
+        rows = max(1, self.chunk_bytes // row_bytes)
+        return (min(rows, shape[0]), *shape[1:])
+
+    def compressible(self, sample: bytes) -> bool:
+        """Return whether the data (starting with the given bytes) is compressible."""
+        head = sample[: self.sample_size]
+        return len(head) >= self.min_ratio * len(zlib.compress(head, 1))
+
+    def _filters(self, dtype: numpy.dtype, nbytes: int) -> Dict[str, Any]:
+        shuffle = dtype.itemsize > 1
+        if not self.portable and hdf5plugin is not None:
+            if shuffle:
+                blosc_shuffle = hdf5plugin.Blosc.SHUFFLE
+                return dict(hdf5plugin.Blosc(cname="lz4", shuffle=blosc_shuffle))
+            return dict(hdf5plugin.LZ4())
+        if nbytes >= self.fast_min_size:
+            return dict(compression="lzf", shuffle=shuffle)
+        return dict(compression="gzip", compression_opts=self.level, shuffle=shuffle)
+
+    def dataset_kwargs(
+        self,
+        shape: Optional[Tuple[int, ...]],
+        dtype: Any,
+        *,
+        mimetype: Optional[str] = None,
+        sample: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        """Return keyword arguments for `create_dataset` with given shape and type.
+
+        Returns an empty dict if the dataset should be stored without filters.
+
+        Args:
+            shape: Shape of the dataset
+            dtype: Type of the dataset
+            mimetype: MIME type of the data (for files embedded as bytes)
+            sample: First bytes of the data (for files embedded as bytes)
+        """
+        dtype = numpy.dtype(dtype)
+        nbytes = _nbytes(shape, dtype)
+        if not shape or nbytes < max(self.min_size, 1) or is_compressed(mimetype):
+            return {}
+        if dtype.hasobject or h5py.check_vlen_dtype(dtype) is not None:
+            return {}  # only pointers to variable-length data would be compressed
+        if sample is not None and not self.compressible(sample):
+            return {}
+        return dict(chunks=self.chunks(shape, dtype), **self._filters(dtype, nbytes))
+
+    def create_dataset(
+        self,
+        node: Any,
+        path: str,
+        *,
+        data: Any = None,
+        shape: Optional[Tuple[int, ...]] = None,
+        dtype: Any = None,
+        mimetype: Optional[str] = None,
+        sample: Optional[bytes] = None,
+        **kwargs,
+    ):
+        """Create a dataset in a group according to the policy.
+
+        Explicitly passed keyword arguments for `create_dataset` take precedence.
+        """
+        if isinstance(data, h5py.Empty):
+            shape, dtype = None, data.dtype
+        elif data is not None:
+            arr = numpy.asarray(data)
+            shape, dtype = arr.shape, arr.dtype
+        policy_kwargs = self.dataset_kwargs(
+            shape, dtype, mimetype=mimetype, sample=sample
+        )
+        kwargs = {**policy_kwargs, **kwargs}
+
+        start = time.perf_counter()
+        ret = node.create_dataset(path, shape=shape, dtype=dtype, data=data, **kwargs)
+        seconds = time.perf_counter() - start
+        nbytes = _nbytes(shape, numpy.dtype(dtype))
+        self.stats.add(ret, nbytes, seconds, "compression" in kwargs)
+        return ret
+
+    def normalize_table(self, df: pandas.DataFrame) -> numpy.ndarray:
+        """Convert a table into an array that can be stored efficiently.
+
+        Integer columns are stored with the smallest type that holds their values.
+        Tables with only integer or only float columns result in a 2-dimensional
+        array of a common numeric type. Other tables (e.g. mixing integer and
+        float columns, which could lose precision in a common type) result in a
+        structured array with one field per column, where non-numeric columns
+        are stored as strings.
+        """
+        cols: Dict[str, Any] = {}
+        for name, col in df.items():
+            if pandas.api.types.is_bool_dtype(col):
+                cols[str(name)] = col.to_numpy()
+            elif pandas.api.types.is_integer_dtype(col):
+                cols[str(name)] = pandas.to_numeric(col, downcast="integer").to_numpy()
+            elif pandas.api.types.is_float_dtype(col):
+                cols[str(name)] = col.to_numpy()
+            else:
+                vals = col.astype(str).where(col.notna(), "")
+                cols[str(name)] = vals.to_numpy(dtype=object)
+
+        dtypes = {n: c.dtype for n, c in cols.items()}
+        kinds = {t.kind for t in dtypes.values()}
+        if dtypes and (kinds <= {"i", "u"} or kinds == {"f"}):
+            # NOTE: e.g. uint64 and int64 have no common integer type
+            if numpy.result_type(*dtypes.values()).kind in kinds:
+                return numpy.stack(list(cols.values()), axis=-1)
+
+        str_type = h5py.string_dtype()
+        dtype = [(n, t if t != object else str_type) for n, t in dtypes.items()]
+        ret = numpy.empty(len(df), dtype=dtype)
+        for name, col in cols.items():
+            ret[name] = col
+        return ret
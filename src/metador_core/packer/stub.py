@@ -0,0 +1,120 @@
+"""Stubs for updating containers based only on their IH5 manifest.
+
+A stub created from a manifest (see `IH5MFRecord.create_stub`) has the structure
+of the original record, but no data. Packers do not need the data, but a
+`MetadorContainer` must be able to read its TOC (version, UUID, used schemas
+and links to metadata objects) in order to write a patch. Therefore `PGPacker`
+stores a copy of the TOC in the manifest, which is restored in the stub.
+
+The stored JSON Schemas of used schemas are not copied, as they are only needed
+to inspect the metadata (and would considerably increase the manifest size).
+The links to metadata objects are not copied either, as they can be reconstructed
+from the paths of the metadata objects in the skeleton (so the size of the copy
+does not grow with the number of metadata objects in the container).
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from ..container.utils import (
+    METADOR_LINKS_PATH,
+    METADOR_META_PREF,
+    METADOR_TOC_PATH,
+    is_internal_path,
+)
+from ..ih5.manifest import IH5Manifest, IH5MFRecord
+from ..util.types import H5DatasetLike
+
+_JSONSCHEMA_SUFFIX = "/jsonschema.json"
+"""Suffix of TOC paths of stored JSON Schemas (see `TOCSchemas`)."""
+
+
+class ManifestTOC(BaseModel):
+    """IH5 manifest extension with a copy of the Metador TOC of the container."""
+
+    patch_uuid: UUID
+    """UUID of the patch the TOC was copied from (to detect outdated copies)."""
+
+    data: Dict[str, str]
+    """Values of datasets in the TOC needed by stubs (by absolute path).
+
+    Does not include the links to metadata objects (see `toc_links`).
+    """
+
+    @classmethod
+    def ext_name(cls) -> str:
+        """Name of manifest extension section for the TOC."""
+        return "packer_toc"
+
+    @classmethod
+    def for_record(cls, rec: IH5MFRecord) -> ManifestTOC:
+        """Copy TOC of a (raw) record with an uncommitted patch."""
+        data: Dict[str, str] = {}
+
+        def add(_, node):
+            if isinstance(node, H5DatasetLike) and not node.name.endswith(
+                _JSONSCHEMA_SUFFIX
+            ):
+                val = node[()]
+                data[node.name] = val.decode("utf-8") if isinstance(val, bytes) else val
+
+        for name, node in rec[METADOR_TOC_PATH].items():
+            if node.name == METADOR_LINKS_PATH:
+                continue  # reconstructed from the skeleton (see `toc_links`)
+            if isinstance(node, H5DatasetLike):
+                add(name, node)
+            else:
+                node.visititems(add)
+        return cls(patch_uuid=rec.ih5_meta[-1].patch_uuid, data=data)
+
+    @classmethod
+    def get(cls, manifest: IH5Manifest) -> Optional[ManifestTOC]:
+        """Parse TOC from manifest, if it is available and up to date."""
+        if (obj := manifest.manifest_exts.get(cls.ext_name())) is None:
+            return None
+        toc = cls.parse_obj(obj)
+        # if the record was patched without updating the TOC copy, it is unusable
+        return toc if toc.patch_uuid == manifest.user_block.patch_uuid else None
+
+    def update(self, exts: Dict[str, object]):
+        """Create or overwrite TOC in given manifest extensions."""
+        exts[self.ext_name()] = self.dict()
+
+
+def toc_links(paths: Iterable[str]) -> Dict[str, str]:
+    """Return values of the TOC links, given all paths of a container skeleton.
+
+    The path of a metadata object ends with `<schema>=<uuid>` and it is linked
+    from the TOC path `<METADOR_LINKS_PATH>/<schema>/<uuid>`.
+    Only links that exist in the skeleton are returned.
+    """
+    paths = set(paths)
+    ret: Dict[str, str] = {}
+    for path in paths:
+        name = path.split("/")[-1]
+        if "=" not in name or not is_internal_path(path, METADOR_META_PREF):
+            continue
+        ep_name, uuid = name.split("=")
+        if (link := f"{METADOR_LINKS_PATH}/{ep_name}/{uuid}") in paths:
+            ret[link] = path
+    return ret
+
+
+def create_stub(record: Union[Path, str], manifest_file: Path) -> IH5MFRecord:
+    """Create a stub for a Metador container from its manifest.
+
+    The manifest must be written by `PGPacker`, i.e. the latest patch must have
+    been created by a packer (otherwise the TOC in the stub could be outdated).
+
+    Returns a stub like `IH5MFRecord.create_stub`, but with a readable TOC.
+    """
+    manifest = IH5Manifest.parse_file(manifest_file)
+    if (toc := ManifestTOC.get(manifest)) is None:
+        msg = f"{manifest_file}: Manifest has no up-to-date copy of the container TOC!"
+        raise ValueError(msg)
+    data = {**toc_links(manifest.skeleton.__root__.keys()), **toc.data}
+    return IH5MFRecord.create_stub(record, manifest_file, data=data)
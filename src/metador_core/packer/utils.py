@@ -2,19 +2,23 @@
 
 from __future__ import annotations
 
+import time
 import urllib.parse
+from dataclasses import replace
 from json.decoder import JSONDecodeError
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
 
 import h5py
 import numpy
 from pydantic import ValidationError
 
 from ..container import MetadorContainer, MetadorDataset, MetadorGroup
-from ..harvester import harvest
-from ..plugins import harvesters, schemas
+from ..container.utils import METADOR_FILE_ATTR
+from ..plugins import schemas
 from ..schema import MetadataSchema
+from ..util.hashsums import MAGIC_HEAD_SIZE, FileScan, _mimetype, file_scans, scan_file
+from .storage import StoragePolicy
 from .types import DirValidationErrors
 
 
@@ -52,6 +56,49 @@ def check_metadata_file(path: Path, **kwargs):
 
 FileMeta = schemas.get("core.file", (0, 1, 0))
 
+STREAM_MIN_SIZE: int = 2**26
+"""Files of at least this size are embedded in streaming mode by default."""
+
+STREAM_BLOCK_SIZE: int = 2**20
+"""Number of bytes copied at once when embedding a file."""
+
+DEFAULT_STORAGE: StoragePolicy = StoragePolicy()
+"""Storage policy used by `pack_file` if no policy is passed.
+
+It is shared by all callers, its statistics are safe to update from multiple threads.
+"""
+
+
+class PreparedFile(NamedTuple):
+    """Contents of a file that was read with `prepare_file`."""
+
+    data: bytes
+    scan: FileScan
+
+
+def _read_file(file_path: Path, size: int) -> Tuple[bytes, FileScan]:
+    buf = bytearray(size)
+
+    def write(pos: int, block: memoryview):
+        buf[pos : pos + len(block)] = block
+
+    scan = scan_file(file_path, "sha256", sink=write, block_size=STREAM_BLOCK_SIZE)
+    if scan.stat.size != size:
+        raise ValueError(f"File '{file_path}' changed while reading it!")
+    return bytes(buf), scan
+
+
+def prepare_file(file_path: Path) -> Optional[PreparedFile]:
+    """Read a file to be embedded with `pack_file` (e.g. in a `PackQueue` worker).
+
+    Returns None for large files, which are embedded in streaming mode
+    and hence must be read directly by `pack_file`.
+    """
+    size = file_path.stat().st_size
+    if size >= STREAM_MIN_SIZE:
+        return None
+    return PreparedFile(*_read_file(file_path, size))
+
 
 def pack_file(
     node: Union[MetadorContainer, MetadorGroup],
@@ -59,16 +106,39 @@ def pack_file(
     *,
     target: Optional[str] = None,
     metadata: Optional[MetadataSchema] = None,
+    stream: Optional[bool] = None,
+    compression: Optional[str] = None,
+    compression_opts: Optional[Any] = None,
+    prepared: Optional[PreparedFile] = None,
+    policy: Optional[StoragePolicy] = None,
 ) -> MetadorDataset:
     """Embed a file, adding minimal generic metadata to it.
 
     Will also ensure that the attached metadata has RO-Crate compatible @id set correctly.
 
+    Small files are stored as a single opaque value. In streaming mode, the file
+    is copied block by block into a 1-dimensional `uint8` dataset instead, so it is
+    never loaded into memory completely. Such datasets are marked with the
+    `METADOR_FILE_ATTR` attribute.
+
+    In both cases the file is read only once: hashsum and MIME type of the
+    default metadata are computed from the same blocks that are embedded
+    (see `metador_core.util.hashsums.scan_file`).
+
+    Unless a `compression` is given, the storage `policy` decides whether the file
+    is compressed, based on its size and MIME type. Compressed files are stored
+    like in streaming mode (as chunked and filtered `uint8` datasets).
+
     Args:
         node: Container where to embed the file contents
         file_path: Path of an existing file to be embedded
         target: Fresh path in container where to place the file
         metadata: If provided, will attach this instead of harvesting defaults.
+        stream: Whether to use streaming mode (default: for files >= `STREAM_MIN_SIZE`)
+        compression: If provided, the file is stored compressed (implies streaming)
+        compression_opts: Options for the compression filter
+        prepared: Result of `prepare_file` for the file (so it is not read again)
+        policy: Storage policy to use (default: `DEFAULT_STORAGE`)
 
     Returns:
         Dataset of new embedded file.
@@ -85,23 +155,83 @@ def pack_file(
     if not file_path.is_file():
         raise ValueError(f"Path '{file_path}' does not look like an existing file!")
 
-    if not metadata:
-        # no metadata given -> harvest minimal information about a file
-        hv_file = harvesters["core.file.generic"]
-        metadata = harvest(FileMeta, [hv_file(filepath=file_path)])
-    else:
-        metadata = metadata.copy()  # defensive copying!
-
-    # check metadata
-    if not isinstance(metadata, FileMeta):
-        msg = f"Provided metadata is not compatible with '{FileMeta.Plugin.name}'!"
-        raise ValueError(msg)
-    if not schemas.is_plugin(type(metadata)):
-        msg = f"Given metadata is a {type(metadata)}, which is not a schema plugin!"
-        raise ValueError(msg)
+    size = file_path.stat().st_size
+    if stream is None:
+        stream = compression is not None or size >= STREAM_MIN_SIZE
+    stream = stream and size > 0  # empty files are always stored as empty value
 
-    data = _h5_wrap_bytes(file_path.read_bytes())
-    ret = node.create_dataset(target, data=data)
+    if metadata:
+        metadata = metadata.copy()  # defensive copying!
+        if not isinstance(metadata, FileMeta):
+            msg = f"Provided metadata is not compatible with '{FileMeta.Plugin.name}'!"
+            raise ValueError(msg)
+        if not schemas.is_plugin(type(metadata)):
+            msg = f"Given metadata is a {type(metadata)}, which is not a schema plugin!"
+            raise ValueError(msg)
+
+    policy = policy or DEFAULT_STORAGE
+    kwargs: Dict[str, Any] = {}
+    if compression is not None:
+        kwargs = dict(compression=compression, compression_opts=compression_opts)
+        kwargs["chunks"] = (min(size, STREAM_BLOCK_SIZE),)
+
+    if not stream:
+        data, scan = prepared or _read_file(file_path, size)
+        if scan.stat.size != size:
+            raise ValueError(f"File '{file_path}' changed after reading it!")
+        head = data[: policy.sample_size]
+        if kwargs := policy.dataset_kwargs(
+            (size,), numpy.uint8, mimetype=scan.mimetype, sample=head
+        ):
+            arr = numpy.frombuffer(data, dtype=numpy.uint8)
+            ret = policy.create_dataset(node, target, data=arr, **kwargs)
+            ret.attrs[METADOR_FILE_ATTR] = True
+        else:
+            ret = policy.create_dataset(node, target, data=_h5_wrap_bytes(data))
+    else:
+        start = time.perf_counter()
+        ret: Optional[MetadorDataset] = None
+        mimetype: Optional[str] = None
+        head = bytearray()  # first blocks, buffered until the dataset is created
+
+        def write(pos: int, block: memoryview):
+            nonlocal ret, kwargs, mimetype
+            if ret is None:
+                # policy and MIME type are based on the head of the file
+                head.extend(block)
+                if len(head) < min(size, MAGIC_HEAD_SIZE):
+                    return
+                sample = bytes(head[:MAGIC_HEAD_SIZE])
+                mimetype = _mimetype(file_path, sample)
+                if compression is None:
+                    kwargs = policy.dataset_kwargs(
+                        (size,), numpy.uint8, mimetype=mimetype, sample=sample
+                    )
+                ret = node.create_dataset(
+                    target, shape=(size,), dtype=numpy.uint8, **kwargs
+                )
+                ret.attrs[METADOR_FILE_ATTR] = True
+                pos, block = 0, memoryview(head)
+            ret[pos : pos + len(block)] = numpy.frombuffer(block, dtype=numpy.uint8)
+
+        scan = scan_file(
+            file_path, "sha256", mime=False, sink=write, block_size=STREAM_BLOCK_SIZE
+        )
+        if scan.stat.size != size:
+            raise ValueError(f"File '{file_path}' changed while embedding it!")
+        scan = replace(scan, mimetype=mimetype)
+        file_scans.put(file_path, scan)
+        seconds = time.perf_counter() - start
+        policy.stats.add(ret, size, seconds, "compression" in kwargs)
+
+    if metadata is None:
+        # same information as harvested by the `core.file.generic` harvester
+        metadata = FileMeta(
+            filename=file_path.name,
+            contentSize=size,
+            sha256=scan.hashsum,
+            encodingFormat=scan.mimetype,
+        )
 
     # set file metadata @id to be relative to dataset root just like RO Crate wants
     metadata.id_ = urllib.parse.quote(f".{ret.name}")
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from abc import ABCMeta
+from threading import RLock
 from typing import (
     Any,
     ClassVar,
@@ -318,14 +319,27 @@ class PluginGroup(Generic[T], metaclass=PluginGroupMeta):
     def _ensure_is_loaded(self, ref: AnyPluginRef):
         """Load plugin from entrypoint, if it is not loaded yet."""
         assert ref.group == self.name
-        if ref in self._LOADED_PLUGINS:
+        if ref in self._LOADED_PLUGINS and ref not in _loading:
             return  # already loaded, all good
 
-        ep_name = util.to_ep_name(ref.name, ref.version)
-        ret = self._ENTRY_POINTS[ep_name].load()
-        self._LOADED_PLUGINS[ref] = ret
-
-        self._load_plugin(ep_name, ret)
+        # NOTE: plugins are registered before they are fully initialized
+        # (to allow for cyclic dependencies), so concurrent loading must be
+        # prevented (e.g. when plugins are loaded lazily by a threaded server)
+        with _load_lock:
+            if ref in self._LOADED_PLUGINS:
+                # loaded by a different thread in the meantime,
+                # or is currently being loaded by this thread
+                return
+
+            _loading.add(ref)
+            try:
+                ep_name = util.to_ep_name(ref.name, ref.version)
+                ret = self._ENTRY_POINTS[ep_name].load()
+                self._LOADED_PLUGINS[ref] = ret
+
+                self._load_plugin(ep_name, ret)
+            finally:
+                _loading.discard(ref)
 
     def _explicit_plugin_deps(self, plugin) -> Set[AnyPluginRef]:
         """Return all plugin dependencies that must be taken into account."""
@@ -413,6 +427,12 @@ class PluginGroup(Generic[T], metaclass=PluginGroupMeta):
 
 # ----
 
+_load_lock = RLock()
+"""Lock to prevent concurrent loading of plugins (shared by all plugin groups)."""
+
+_loading: Set[AnyPluginRef] = set()
+"""Plugins that are currently being loaded (i.e. not fully initialized yet)."""
+
 _plugin_groups: Dict[str, PluginGroup] = {}
 """Instances of initialized plugin groups."""
 
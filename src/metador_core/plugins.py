@@ -25,9 +25,21 @@ class PGPluginGroup(wrapt.ObjectProxy):
 
     _self_groups: Dict[AnyPluginRef, PluginGroup]
 
+    _self_generation: int = 0
+    """Number of times the plugin groups were reset."""
+
     def __reset__(self):
         self._self_groups.clear()
         self.__init__()
+        self._self_generation += 1
+
+    @property
+    def generation(self) -> int:
+        """Return counter that changes whenever the plugin groups are reset.
+
+        Can be used to invalidate caches of values derived from the loaded plugins.
+        """
+        return self._self_generation
 
     def __init__(self):
         # initialize the meta-plugingroup
@@ -74,6 +74,10 @@ class PluginRef(MetadataSchema):
             return False
         return True
 
+    def plugin_string(self) -> str:
+        """Return plugin string of the referenced plugin (same as `Plugin.plugin_string`)."""
+        return f"metador.{self.group}.{self.name}.{to_semver_str(self.version)}"
+
     @classmethod
     def _subclass_for(cls, group: NonEmptyStr):
         """Create a subclass of PluginRef with group field pre-set."""
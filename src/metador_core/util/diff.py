@@ -1,18 +1,38 @@
 from __future__ import annotations
 
 import itertools
+import os
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from .hashsums import DirHashsums
 
 
-def dir_paths(base_dir: Path):
-    """Recursively list all paths in given directory, relative to itself."""
-    return map(lambda p: p.relative_to(base_dir), sorted(base_dir.rglob("*")))
+def _sorted_entries(path: Union[str, Path]) -> List[os.DirEntry]:
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda e: e.name)
+
+
+def dir_paths(base_dir: Path) -> Iterator[Path]:
+    """Recursively list all paths in given directory, relative to itself.
+
+    Paths are listed in sorted order while walking the directory
+    (i.e. only the entries of the directories on the current path are kept).
+    Symlinks to directories are listed, but not followed.
+    """
+    stack = [(Path(""), iter(_sorted_entries(base_dir)))]
+    while stack:
+        parent, entries = stack[-1]
+        if (entry := next(entries, None)) is None:
+            stack.pop()
+            continue
+        path = parent / entry.name
+        yield path
+        if entry.is_dir(follow_symlinks=False):
+            stack.append((path, iter(_sorted_entries(entry.path))))
 
 
 class DiffNode(BaseModel):
@@ -51,6 +71,33 @@ class DiffNode(BaseModel):
     added: Dict[Path, DiffNode] = {}
     """New files and subdirectories."""
 
+    # nodes returned by a DirDiff are views of one of its entries
+    # (their children are looked up on first access, see `__getattr__`)
+    _diff: Optional[DirDiff] = PrivateAttr(None)
+    _idx: int = PrivateAttr(0)
+
+    def __getattr__(self, name: str):
+        if (status := _CHILDREN_STATUS.get(name)) is None or self._diff is None:
+            raise AttributeError(f"{type(self).__name__!r} has no attribute {name!r}")
+        children = {
+            node.path: node
+            for node in map(self._diff._node, self._diff._children.get(self._idx, ()))
+            if self._diff._status[node._idx] == status
+        }
+        self.__dict__[name] = children
+        return children
+
+    def _iter(self, *args, **kwargs):
+        # look up all children before they are serialized, compared or copied
+        for name in _CHILDREN_STATUS:
+            getattr(self, name)
+        return super()._iter(*args, **kwargs)
+
+    def copy(self, **kwargs) -> DiffNode:
+        ret = super().copy(**kwargs)
+        ret._diff = None  # children of the copy are stored (and possibly updated)
+        return ret
+
     def _type(self, entity) -> Optional[DiffNode.ObjType]:
         if isinstance(entity, dict):
             return DiffNode.ObjType.directory
@@ -82,6 +129,8 @@ class DiffNode(BaseModel):
         removed children, modified children, itself, then added children.
         Within the same category the children are sorted in alphabetical order.
         """
+        if self._diff is not None:
+            return list(map(self._diff._node, self._diff._dep_order(self._idx)))
         ret = []
         buckets = [self.removed, self.modified, None, self.added]
         for b in buckets:
@@ -116,63 +165,49 @@ class DiffNode(BaseModel):
         Returns None if no difference is found, otherwise a DiffNode tree
         containing only the additions, removals and changes.
         """
-        ret = cls(path=path, prev=prev, curr=curr)
-        if not isinstance(prev, dict) and not isinstance(curr, dict):
-            if prev == curr:
-                return None  # same (non-)file -> no diff
-            else:
-                return ret  # indicates that a change happened
-
-        if (prev is None or isinstance(prev, str)) and isinstance(curr, dict):
-            # file -> dir: everything inside "added"
-            for k, v in curr.items():
-                kpath = ret.path / k
-                d = cls.compare(None, v, kpath)
-                assert d is not None
-                ret.added[kpath] = d
-            return ret
-
-        if isinstance(prev, dict) and (curr is None or isinstance(curr, str)):
-            # dir -> file: everything inside "removed"
-            for k, v in prev.items():
-                kpath = ret.path / k
-                d = cls.compare(v, None, kpath)
-                assert d is not None
-                ret.removed[kpath] = d
-            return ret
-
-        assert isinstance(prev, dict) and isinstance(curr, dict)
-        # two directories -> compare
-        prev_keys = set(prev.keys())
-        curr_keys = set(curr.keys())
-
-        added = curr_keys - prev_keys
-        removed = prev_keys - curr_keys
-        intersection = (prev_keys | curr_keys) - added - removed
-
-        for k in added:  # added in curr
-            kpath = ret.path / k
-            d = cls.compare(None, curr[k], kpath)
-            assert d is not None
-            ret.added[kpath] = d
-        for k in removed:  # removed in curr
-            kpath = ret.path / k
-            d = cls.compare(prev[k], None, kpath)
-            assert d is not None
-            ret.removed[kpath] = d
-        for k in intersection:  # changed in curr
-            kpath = ret.path / k
-            diff = cls.compare(prev[k], curr[k], kpath)
-            if diff is not None:  # add child if there is a difference
-                ret.modified[kpath] = diff
-
-        # all children same -> directories same
-        same_dir = not ret.added and not ret.removed and not ret.modified
-        if same_dir:
-            return None
-
-        # return dir node with the changes
-        return ret
+        diff = DirDiff._compare(prev, curr, path)
+        return None if diff.is_empty else diff._node(0)
+
+
+_CHILDREN_STATUS = {
+    "removed": DiffNode.Status.removed.value,
+    "modified": DiffNode.Status.modified.value,
+    "added": DiffNode.Status.added.value,
+}
+"""Status code of the children listed in each children field of a `DiffNode`."""
+
+_Flat = Iterator[Tuple[Tuple[str, ...], Any]]
+
+
+def _flatten(tree: Union[None, str, DirHashsums]) -> _Flat:
+    """Iterate over all entries of a hashsum tree in sorted order.
+
+    Yields tuples of path segments and the entity at that path.
+    Children are listed right after their parent directory, sorted by name.
+    """
+    if tree is None:
+        return
+    stack = [((), tree)]
+    while stack:
+        key, val = stack.pop()
+        yield key, val
+        if isinstance(val, dict):
+            stack.extend((key + (k,), val[k]) for k in sorted(val, reverse=True))
+
+
+def _merge(prev: _Flat, curr: _Flat) -> Iterator[Tuple[Tuple[str, ...], Any, Any]]:
+    """Merge two sorted flattened trees, yielding path with previous/current entity."""
+    p, c = next(prev, None), next(curr, None)
+    while p is not None or c is not None:
+        if c is None or (p is not None and p[0] < c[0]):
+            yield p[0], p[1], None
+            p = next(prev, None)
+        elif p is None or c[0] < p[0]:
+            yield c[0], None, c[1]
+            c = next(curr, None)
+        else:
+            yield p[0], p[1], c[1]
+            p, c = next(prev, None), next(curr, None)
 
 
 class DirDiff:
@@ -185,13 +220,28 @@ class DirDiff:
     Typically, you will want to capture `dir_hashsums` of the same `dir`
     at two points in time and will be interested in the dict
     `DirDiff.compare(prev, curr).annotate(dir)`.
+
+    Internally, the changed entries are stored in flat lists sorted by path
+    (computed by merging both flattened hashsum trees), with an index mapping
+    paths to entries. `DiffNode` objects are only created when requested.
     """
 
-    _diff_root: Optional[DiffNode]
+    # Changed entries, sorted by path (parents before their children):
+    _paths: List[str]
+    _prev: List[Any]
+    _curr: List[Any]
+    _status: str
+    """Status code (see `DiffNode.Status`) of each entry."""
+    _index: Dict[str, int]
+    """Maps path to index of the entry."""
+    _children: Dict[int, List[int]]
+    """Maps index of a directory entry to indices of its changed children."""
+    _order: List[int]
+    """Indices of entries in the order used by `annotate`."""
 
     @property
     def is_empty(self):
-        return self._diff_root is None
+        return not self._paths
 
     @classmethod
     def compare(cls, prev: DirHashsums, curr: DirHashsums) -> DirDiff:
@@ -200,27 +250,93 @@ class DirDiff:
         To be meaningful, `prev` and `curr` should be trees obtained from the
         same directory at two points in time.
         """
+        return cls._compare(prev, curr, Path(""))
+
+    @classmethod
+    def _compare(cls, prev: Any, curr: Any, root: Path) -> DirDiff:
         ret = cls.__new__(cls)
-        ret._diff_root = DiffNode.compare(prev, curr, Path(""))
+        ret._paths, ret._prev, ret._curr = [], [], []
+        ret._children = {}
+        status: List[str] = []
+
+        # directories in both trees on the path to the current entry,
+        # with the index of the corresponding entry (if it is already added)
+        stack: List[Tuple[Tuple[str, ...], Any, Any, Optional[int]]] = []
+
+        def add(key, prev_val, curr_val, code: str) -> int:
+            # add all ancestors (an entry was changed -> the directories, too)
+            parent = None
+            for i, (dkey, dprev, dcurr, idx) in enumerate(stack):
+                if idx is None:
+                    idx = add_entry(dkey, dprev, dcurr, "~", parent)
+                    stack[i] = (dkey, dprev, dcurr, idx)
+                parent = idx
+            return add_entry(key, prev_val, curr_val, code, parent)
+
+        def add_entry(key, prev_val, curr_val, code: str, parent: Optional[int]):
+            idx = len(ret._paths)
+            ret._paths.append(str(Path(root, *key)))
+            ret._prev.append(prev_val)
+            ret._curr.append(curr_val)
+            status.append(code)
+            if parent is not None:
+                ret._children.setdefault(parent, []).append(idx)
+            return idx
+
+        for key, pv, cv in _merge(_flatten(prev), _flatten(curr)):
+            while stack and key[: len(stack[-1][0])] != stack[-1][0]:
+                stack.pop()  # left the subtree of this directory
+
+            idx = None
+            if pv is None:
+                idx = add(key, pv, cv, "+")
+            elif cv is None:
+                idx = add(key, pv, cv, "-")
+            elif isinstance(pv, dict) != isinstance(cv, dict) or (
+                not isinstance(pv, dict) and pv != cv
+            ):
+                idx = add(key, pv, cv, "~")
+            if isinstance(pv, dict) or isinstance(cv, dict):
+                stack.append((key, pv, cv, idx))  # (possibly unchanged) directory
+
+        ret._status = "".join(status)
+        ret._index = {path: i for i, path in enumerate(ret._paths)}
+        ret._order = list(ret._dep_order(0)) if ret._paths else []
         return ret
 
+    def _dep_order(self, idx: int) -> Iterator[int]:
+        """Iterate over entries in subtree of an entry in dependency order.
+
+        For each entry, first removed children, then modified children,
+        the entry itself, and finally added children are listed.
+        """
+        stack = [(idx, False)]
+        while stack:
+            i, expanded = stack.pop()
+            if expanded:
+                yield i
+                continue
+            kids = self._children.get(i, [])
+            st = self._status
+            stack.extend((c, False) for c in reversed(kids) if st[c] == "+")
+            stack.append((i, True))
+            stack.extend((c, False) for c in reversed(kids) if st[c] == "~")
+            stack.extend((c, False) for c in reversed(kids) if st[c] == "-")
+
+    def _node(self, idx: int) -> DiffNode:
+        node = DiffNode.construct(
+            path=Path(self._paths[idx]), prev=self._prev[idx], curr=self._curr[idx]
+        )
+        node._diff, node._idx = self, idx
+        for name in _CHILDREN_STATUS:  # children are looked up on first access
+            del node.__dict__[name]
+        return node
+
     def get(self, path: Path) -> Optional[DiffNode]:
         path = Path(path)  # if it was a str
         assert not path.is_absolute()
-        if self._diff_root is None:
-            return None
-        curr: DiffNode = self._diff_root
-        prefixes = [path] + list(path.parents)
-        prefixes.pop()  # drop '.'
-        while prefixes:
-            path = prefixes.pop()
-            node: Optional[DiffNode] = next(
-                (x for x in curr.children() if x.path == path), None
-            )
-            if node is None:
-                return None
-            curr = node
-        return curr
+        idx = self._index.get(str(path))
+        return None if idx is None else self._node(idx)
 
     def status(self, node: Optional[DiffNode]) -> DiffNode.Status:
         """Return the type of change that happened to a diff node.
@@ -248,19 +364,31 @@ class DirDiff:
         of directories and ensures that children can be deleted before their parents
         and parents can be created before their children.
         """
-        if self._diff_root is None:
-            return {}
-
-        nodes = self._diff_root.nodes()  # nodes of all paths in the diff
+        return dict(self.iter_annotate(base_dir))
+
+    def iter_annotate(
+        self, base_dir: Path, *, skip_unchanged: bool = False
+    ) -> Iterator[Tuple[Path, Optional[DiffNode]]]:
+        """Iterate over path and DiffNode pairs based on passed directory.
+
+        Yields the same items in the same order as `annotate`, but the
+        directory is walked lazily while iterating, so it is suitable
+        for very large directories. All changed paths come first,
+        followed by all unchanged paths in `base_dir`.
+
+        Args:
+            base_dir: Directory the diff was computed for
+            skip_unchanged: If True, only the paths in the diff are listed
+                (i.e. the directory is not walked at all)
+        """
+        if not self._paths:
+            return
 
-        path_nodes = {node.path: node for node in nodes}
-        # paths in base_dir, but not in the diff
-        missing = sorted(set(dir_paths(base_dir)) - set(path_nodes.keys()))
+        for i in self._order:
+            yield base_dir / self._paths[i], self._node(i)
+        if skip_unchanged:
+            return
 
-        # construct result, keeping correct order and prepending base_dir
-        ret: Dict[Path, Optional[DiffNode]] = {
-            base_dir / str(k): v for k, v in path_nodes.items()
-        }
-        for path in missing:
-            ret[base_dir / str(path)] = None
-        return ret
+        for path in dir_paths(base_dir):
+            if str(path) not in self._index:
+                yield base_dir / path, None
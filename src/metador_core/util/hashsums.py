@@ -2,9 +2,29 @@ from __future__ import annotations
 
 import hashlib
 import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
 from io import BytesIO
 from pathlib import Path
-from typing import Any, BinaryIO, Dict, Optional, Union
+from threading import Lock
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import magic
 
 _hash_alg = {
     # "md5": hashlib.md5,
@@ -14,6 +34,17 @@ _hash_alg = {
 }
 """Supported hashsum algorithms."""
 
+HASH_CHUNK_SIZE: int = 2**20
+"""Size of chunks read from files when computing hashsums."""
+
+MAGIC_HEAD_SIZE: int = 2**20
+"""Number of bytes at the start of a file used to detect the MIME type.
+
+This is less than libmagic would inspect by default (`MAGIC_PARAM_BYTES_MAX`,
+7 MiB since libmagic 5.44), but bounds the memory needed per scanned file.
+The MIME types of common file formats are determined by their first bytes.
+"""
+
 
 def hashsum(data: Union[bytes, BinaryIO], alg: str):
     """Compute hashsum from given binary file stream using selected algorithm."""
@@ -24,11 +55,15 @@ def hashsum(data: Union[bytes, BinaryIO], alg: str):
     except KeyError:
         raise ValueError(f"Unsupported hashsum: {alg}")
 
-    while True:
-        chunk = data.read(h.block_size)
-        if not chunk:
-            break
-        h.update(chunk)
+    if hasattr(data, "readinto"):
+        # read large chunks into a reused buffer (hashlib releases the GIL for them)
+        buf = bytearray(HASH_CHUNK_SIZE)
+        view = memoryview(buf)
+        while n := data.readinto(buf):
+            h.update(view[:n])
+    else:
+        while chunk := data.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
 
     return h.hexdigest()
 
@@ -69,7 +104,294 @@ def rel_symlink(base: Path, dir: Path) -> Optional[Path]:
         return None  # link points outside of base directory
 
 
-def dir_hashsums(dir: Path, alg: str = DEF_HASH_ALG) -> DirHashsums:
+@dataclass
+class HashProgress:
+    """Progress of a running `dir_hashsums` computation."""
+
+    files_done: int
+    """Number of files hashed so far."""
+
+    files_total: int
+    """Number of files to hash."""
+
+    bytes_done: int
+    """Number of bytes hashed so far."""
+
+    bytes_total: int
+    """Number of bytes to hash."""
+
+    seconds: float
+    """Time elapsed since hashing started."""
+
+    @property
+    def throughput(self) -> float:
+        """Return hashed bytes per second."""
+        return self.bytes_done / self.seconds if self.seconds else 0.0
+
+
+class FileStat(NamedTuple):
+    """File properties used to detect changed files."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+class HashCache:
+    """Persistent cache of file hashsums, stored in an SQLite database.
+
+    Entries are identified by the hashed directory, relative file path and hashsum
+    algorithm, and are reused as long as size, modification time and inode
+    of the file did not change. Pass it to `dir_hashsums` to only re-hash
+    changed files.
+
+    The database file must not be located inside of a hashed directory.
+    """
+
+    RACY_NS: int = 2 * 10**9
+    """Files modified less than this many nanoseconds ago are not cached.
+
+    Modifications right after hashing might not change the modification time
+    (due to its limited resolution), so such hashsums cannot be trusted later.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._db = sqlite3.connect(str(path))
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS hashsums (
+                root TEXT, relpath TEXT, alg TEXT,
+                size INTEGER, mtime_ns INTEGER, inode INTEGER, hashsum TEXT,
+                PRIMARY KEY (root, relpath, alg)
+            )"""
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def lookup(self, root: Path, alg: str) -> Dict[str, Tuple[FileStat, str]]:
+        """Return cached file stats and hashsums of files in a directory."""
+        rows = self._db.execute(
+            "SELECT relpath, size, mtime_ns, inode, hashsum FROM hashsums"
+            " WHERE root = ? AND alg = ?",
+            (str(root.resolve()), alg),
+        )
+        return {r[0]: (FileStat(*r[1:4]), r[4]) for r in rows}
+
+    def update(
+        self,
+        root: Path,
+        alg: str,
+        changed: Dict[str, Tuple[FileStat, str]],
+        removed: Iterable[str] = (),
+    ) -> None:
+        """Store new hashsums of files and remove entries of deleted files."""
+        root_str = str(root.resolve())
+        now = time.time_ns()
+        with self._db:  # single transaction
+            self._db.executemany(
+                "DELETE FROM hashsums WHERE root = ? AND relpath = ? AND alg = ?",
+                ((root_str, relpath, alg) for relpath in removed),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO hashsums VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (root_str, relpath, alg, *stat, hsum)
+                    for relpath, (stat, hsum) in changed.items()
+                    if now - stat.mtime_ns >= self.RACY_NS
+                ),
+            )
+
+
+FileSink = Callable[[int, memoryview], None]
+"""Function called with offset and contents of each block read by `scan_file`.
+
+The block is only valid during the call (the buffer is reused), so it must be copied.
+"""
+
+
+@dataclass(frozen=True)
+class FileScan:
+    """Properties of a file obtained by reading it once with `scan_file`."""
+
+    stat: FileStat
+    """File properties at the time of the scan."""
+
+    alg: str
+    """Hashsum algorithm."""
+
+    hashsum: str
+    """Hashsum of the file contents (without algorithm prefix)."""
+
+    mimetype: Optional[str]
+    """MIME type of the file (sniffed from the first `MAGIC_HEAD_SIZE` bytes).
+
+    None if the MIME type was not detected (see `scan_file`).
+    """
+
+    @property
+    def qualified_hashsum(self) -> str:
+        return f"{self.alg}:{self.hashsum}"
+
+
+def _file_stat(st: os.stat_result) -> FileStat:
+    return FileStat(st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def _mimetype(path: Path, head: bytes) -> str:
+    """Return MIME type of a file, based on its first bytes."""
+    # NOTE: for empty files, libmagic returns a different type for a path than for
+    # a buffer, use the same as `magic.from_file` (i.e. as before)
+    mime = magic.from_buffer(head, mime=True) if head else None
+    return mime or magic.from_file(str(path), mime=True)
+
+
+def scan_file(
+    path: Path,
+    alg: str = DEF_HASH_ALG,
+    *,
+    mime: bool = True,
+    sink: Optional[FileSink] = None,
+    block_size: int = HASH_CHUNK_SIZE,
+) -> FileScan:
+    """Read a file once, computing hashsum and MIME type from the same buffers.
+
+    The result is stored in `file_scans`, so it can be reused (e.g. by harvesters).
+
+    Args:
+        path: File to scan
+        alg: Hashsum algorithm to use
+        mime: Whether to detect the MIME type (otherwise, it is None)
+        sink: If provided, is called with each block of the file (e.g. to copy it)
+        block_size: Number of bytes read at once
+    """
+    try:
+        h = _hash_alg[alg]()
+    except KeyError:
+        raise ValueError(f"Unsupported hashsum: {alg}")
+
+    head = bytearray()
+    head_size = MAGIC_HEAD_SIZE if mime else 0
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    pos = 0
+    with open(path, "rb") as f:
+        stat = _file_stat(os.fstat(f.fileno()))
+        while n := f.readinto(buf):
+            block = view[:n]
+            if len(head) < head_size:
+                head += block[: head_size - len(head)]
+            h.update(block)
+            if sink is not None:
+                sink(pos, block)
+            pos += n
+    if pos != stat.size:
+        raise ValueError(f"File '{path}' changed while reading it!")
+
+    mimetype = _mimetype(path, bytes(head)) if mime else None
+    ret = FileScan(stat, alg, h.hexdigest(), mimetype)
+    file_scans.put(path, ret)
+    return ret
+
+
+class ScanCache:
+    """Bounded in-memory cache of recent `FileScan` results.
+
+    A cached scan is returned only if the file did not change since
+    (same rules as for `HashCache`).
+
+    Only the most recent `max_entries` scans are kept, so for larger directories
+    the scans done by `dir_hashsums` are not available for reuse anymore
+    (increase the limit of `file_scans` if that is needed).
+    """
+
+    def __init__(self, max_entries: int = 2**16):
+        self._data: OrderedDict[Tuple[str, str], FileScan] = OrderedDict()
+        self._lock = Lock()
+        self.max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def put(self, path: Path, scan: FileScan) -> None:
+        """Store scan result of a file."""
+        if time.time_ns() - scan.stat.mtime_ns < HashCache.RACY_NS:
+            return  # cannot tell later whether the file was modified
+        key = (os.path.abspath(path), scan.alg)
+        with self._lock:
+            self._data[key] = scan
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(
+        self, path: Path, alg: str = DEF_HASH_ALG, *, stat: Optional[FileStat] = None
+    ) -> Optional[FileScan]:
+        """Return scan result of an unchanged file, if available.
+
+        If the current `stat` of the file is already known, it can be passed.
+        """
+        key = (os.path.abspath(path), alg)
+        with self._lock:
+            scan = self._data.get(key)
+        if scan is None:
+            return None
+        if stat is None:
+            try:
+                stat = _file_stat(os.stat(path))
+            except OSError:
+                return None
+        return scan if scan.stat == stat else None
+
+
+file_scans = ScanCache()
+"""Scan results of recently read files (used by `scan_file` and `cached_scan`)."""
+
+
+def cached_scan(path: Path, alg: str = DEF_HASH_ALG) -> FileScan:
+    """Return (possibly cached) scan result of a file, including the MIME type.
+
+    If a cached scan has no MIME type, only the start of the file is read.
+    """
+    if (scan := file_scans.get(path, alg)) is None:
+        return scan_file(path, alg)
+    if scan.mimetype is None:
+        with open(path, "rb") as f:
+            head = f.read(MAGIC_HEAD_SIZE)
+        scan = replace(scan, mimetype=_mimetype(path, head))
+        file_scans.put(path, scan)
+    return scan
+
+
+class _FileInfo(NamedTuple):
+    """File to be hashed by `dir_hashsums`."""
+
+    relpath: str
+    path: Path
+    stat: FileStat
+    parent: Dict[str, Any]
+    """Dict of the parent directory in the `DirHashsums` being built."""
+
+
+def dir_hashsums(
+    dir: Path,
+    alg: str = DEF_HASH_ALG,
+    *,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[Callable[[HashProgress], None]] = None,
+    cache: Optional[HashCache] = None,
+) -> DirHashsums:
     """Return hashsums of all files.
 
     Resulting paths are relative to the provided `dir`.
@@ -78,8 +400,28 @@ def dir_hashsums(dir: Path, alg: str = DEF_HASH_ALG) -> DirHashsums:
     instead of computing a checksum.
 
     Out-of-directory symlinks are not allowed.
+
+    The directory is scanned first, then the files are hashed in parallel
+    (in order of their inode numbers, which usually follows the on-disk layout).
+    If a `HashCache` is passed, only files that changed since the last time
+    are hashed (progress is reported only for those). Files recently read
+    with `scan_file` are not read again, and the scan results of hashed files
+    are kept in `file_scans` (e.g. for harvesting them later, see `ScanCache`
+    for its limit). The MIME types of the files are not detected.
+
+    Args:
+        dir: Directory to compute hashsums for
+        alg: Hashsum algorithm to use
+        workers: Number of threads hashing files (default: number of CPUs)
+        executor: Executor to use instead of a new thread pool (e.g. a process pool)
+        progress: Function called with a `HashProgress` after each hashed file
+        cache: Persistent cache of hashsums of unchanged files
     """
+    if cache is not None and dir.resolve() in cache.path.resolve().parents:
+        raise ValueError(f"Hash cache must not be located inside '{dir}'!")
+
     ret: Dict[str, Any] = {}
+    files: List[_FileInfo] = []
     for path in dir.rglob("*"):
         is_file, is_sym = path.is_file(), path.is_symlink()
         relpath = path.relative_to(dir)
@@ -92,7 +434,7 @@ def dir_hashsums(dir: Path, alg: str = DEF_HASH_ALG) -> DirHashsums:
             relpath = relpath.parent  # directory dicts to create = up to parent
 
         if is_file:
-            val = file_hashsum(path, alg)  # value = hashsum
+            stat = path.stat()
         elif is_sym:
             sym_trg = rel_symlink(dir, path)
             if sym_trg is None:
@@ -110,9 +452,70 @@ def dir_hashsums(dir: Path, alg: str = DEF_HASH_ALG) -> DirHashsums:
         # store file hashsum or symlink target
         if is_file or is_sym:
             assert fname is not None
-            curr[fname] = val
+            curr[fname] = val  # for files, placeholder (keeps order of entries)
+        if is_file:
+            fstat = _file_stat(stat)
+            files.append(_FileInfo(str(path.relative_to(dir)), path, fstat, curr))
 
+    cached = cache.lookup(dir, alg) if cache is not None else {}
+    to_hash: List[_FileInfo] = []
+    for f in files:
+        if (entry := cached.get(f.relpath)) and entry[0] == f.stat:
+            f.parent[f.path.name] = entry[1]
+        elif scan := file_scans.get(f.path, alg, stat=f.stat):
+            f.parent[f.path.name] = scan.qualified_hashsum
+        else:
+            to_hash.append(f)
+
+    to_hash.sort(key=lambda f: f.stat.inode)
+    _hash_files(to_hash, alg, workers=workers, executor=executor, progress=progress)
+
+    if cache is not None:
+        changed = {f.relpath: (f.stat, f.parent[f.path.name]) for f in to_hash}
+        removed = cached.keys() - {f.relpath for f in files}
+        cache.update(dir, alg, changed, removed)
     return ret
 
 
+def _hash_files(
+    files: List[_FileInfo],
+    alg: str,
+    *,
+    workers: Optional[int],
+    executor: Optional[Executor],
+    progress: Optional[Callable[[HashProgress], None]],
+) -> None:
+    """Scan files and store the hashsums in the parent directory dicts."""
+    if alg not in _hash_alg:
+        raise ValueError(f"Unsupported hashsum: {alg}")
+
+    start = time.perf_counter()
+    files_done, bytes_done = 0, 0
+    bytes_total = sum(f.stat.size for f in files)
+    paths = [f.path for f in files]
+    algs = [alg] * len(files)
+    scan = partial(scan_file, mime=False)  # MIME type is not needed here
+
+    def results():
+        if executor is not None:
+            for path, res in zip(paths, executor.map(scan, paths, algs)):
+                file_scans.put(path, res)  # might have been scanned in other process
+                yield res
+        elif workers == 1 or len(files) <= 1:
+            yield from map(scan, paths, algs)
+        else:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                yield from pool.map(scan, paths, algs)
+
+    for f, res in zip(files, results()):
+        f.parent[f.path.name] = res.qualified_hashsum
+        files_done += 1
+        bytes_done += f.stat.size
+        if progress is not None:
+            seconds = time.perf_counter() - start
+            progress(
+                HashProgress(files_done, len(files), bytes_done, bytes_total, seconds)
+            )
+
+
 # ----
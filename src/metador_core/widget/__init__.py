@@ -26,6 +26,7 @@ from ..schema import MetadataSchema
 from ..schema.plugins import PluginRef
 from ..schema.types import SemVerTuple
 from .server import WidgetServer
+from .server.files import read_embedded_file
 
 
 class Widget(ABC):
@@ -133,7 +134,7 @@ class Widget(ABC):
             raise ValueError(
                 f"Passed node {node.name} does not look like a dataset node!"
             )
-        return node[()].tolist()
+        return read_embedded_file(node)
 
     def file_url(self, node: Optional[MetadorNode] = None) -> str:
         """Return URL resolving to the data at given node.
@@ -4,10 +4,9 @@ These basically integrate many default widgets provided by panel/bokeh into Meta
 """
 
 import json
-from io import StringIO
-from typing import List, Set, Type
+import math
+from typing import List, Optional, Set, Type
 
-import pandas as pd
 import panel as pn
 from overrides import overrides
 from panel.viewable import Viewable
@@ -16,6 +15,7 @@ from metador_core.schema import MetadataSchema
 
 from ..plugins import schemas
 from . import Widget
+from .server.previews import supports_preview
 
 FileMeta = schemas.get("core.file", (0, 1, 0))
 ImageFileMeta = schemas.get("core.imagefile", (0, 1, 0))
@@ -37,10 +37,23 @@ class FileWidget(Widget):
     FILE_EXTS: Set[str] = set()
     """If non-empty, filename must have an extension from this set."""
 
+    PREVIEW_SIZE: int = 512
+    """Default size of preview images (if the widget size is not set)."""
+
     @property
     def title(self) -> str:
         return self._meta.name or self._meta.filename or self._node.name
 
+    def preview_url(self, size: Optional[int] = None) -> Optional[str]:
+        """Return URL of a preview image of the file, if one can be created.
+
+        If no size is passed, uses the widget size (or `PREVIEW_SIZE` if not set).
+        """
+        if not self._meta.sha256 or not supports_preview(self._meta.encodingFormat):
+            return None
+        size = size or max(self._w or 0, self._h or 0) or self.PREVIEW_SIZE
+        return self._server.preview_url_for(self._container_id, self._node, size)
+
     @classmethod
     @overrides
     def supports_meta(cls, obj: MetadataSchema) -> bool:
@@ -67,21 +80,35 @@ class CSVWidget(FileWidget):
     MIME_TYPES = {"text/csv", "text/tab-separated-values"}
     FILE_EXTS = {".csv", ".tsv"}
 
+    PAGE_SIZE: int = 100
+    """Number of rows shown at once (only the shown rows are loaded)."""
+
     @overrides
     def show(self) -> Viewable:
-        df = pd.read_csv(
-            StringIO(self.file_data().decode("utf-8")),
-            sep=None,  # auto-infer csv/tsv
-            engine="python",  # mute warning
-            # smart date processing
-            parse_dates=True,
-            dayfirst=True,
-            cache_dates=True,
-        )
-        return pn.widgets.DataFrame(
-            df,
+        # NOTE: imported here to load pandas only when a table is shown
+        from .server.data import read_table_page, table_index
+
+        idx = table_index(self._node)  # reused for all pages (not cached if writable)
+        num_rows = idx.num_rows
+        table = pn.widgets.DataFrame(
+            read_table_page(self._node, 0, self.PAGE_SIZE, index=idx),
             disabled=True,
         )
+        if num_rows <= self.PAGE_SIZE:
+            return table
+
+        num_pages = math.ceil(num_rows / self.PAGE_SIZE)
+        page = pn.widgets.IntInput(name="Page", value=1, start=1, end=num_pages)
+
+        def load_page(event):
+            start = (event.new - 1) * self.PAGE_SIZE
+            table.value = read_table_page(self._node, start, self.PAGE_SIZE, index=idx)
+
+        page.param.watch(load_page, "value")
+        return pn.Column(
+            table,
+            pn.Row(page, pn.pane.Markdown(f"of {num_pages} ({num_rows} rows)")),
+        )
         # return pn.widgets.Tabulator(
         #     df,
         #     disabled=True,
@@ -228,6 +255,18 @@ class PDFWidget(FileWidget):
 
     @overrides
     def show(self) -> Viewable:
+        if preview := self.preview_url():
+            # show first page, load the document only when requested
+            return pn.pane.HTML(
+                f"""
+                    <a href="{self.file_url()}" target="_blank">
+                        <img src="{preview}" alt="{self.title}"
+                         style="max-width: 100%; max-height: 100%;">
+                    </a>
+                """,
+                width=self._w,
+                height=self._h,
+            )
         return pn.pane.PDF(self.file_url(), width=self._w, height=self._h)
 
 
@@ -243,11 +282,22 @@ class ImageWidget(FileWidget):
         "image/gif": pn.pane.GIF,
         "image/svg+xml": pn.pane.SVG,
     }
+    THUMBNAIL_TYPES = {"image/jpeg", "image/png"}
+    """Image types that are served downscaled to the displayed size."""
+
+    def image_url(self) -> str:
+        """Return URL of the image, downscaled to the widget size (if possible)."""
+        size = max(self._w or 0, self._h or 0)
+        if not size or self._meta.encodingFormat not in self.THUMBNAIL_TYPES:
+            return self.file_url()
+        if preview := self.preview_url(size):
+            return preview
+        return self._server.image_url_for(self._container_id, self._node, size=size)
 
     @overrides
     def show(self) -> Viewable:
         return self.PANEL_WIDGET[self._meta.encodingFormat](
-            self.file_url(),
+            self.image_url(),
             width=self._w,
             height=self._h,
             alt_text="Sorry. Something went wrong while loading the resource",
@@ -284,9 +334,12 @@ class VideoWidget(FileWidget):
 
     @overrides
     def show(self) -> Viewable:
+        # with a poster frame, the video is only loaded when it is played
+        poster = self.preview_url()
+        poster_attrs = f'poster="{poster}" preload="none"' if poster else ""
         return pn.pane.HTML(
             f"""
-                <video width={self._w} height={self._h} controls style="object-position: center; object-fit:cover;">
+                <video width={self._w} height={self._h} {poster_attrs} controls style="object-position: center; object-fit:cover;">
                 <source src={self.file_url()} type={self._meta.encodingFormat}>
                 </video>
             """,
@@ -6,16 +6,19 @@ To **show** a container dashboard: create a `Dashboard` instance.
 """
 from __future__ import annotations
 
+from collections import OrderedDict
 from functools import partial
 from itertools import groupby
-from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
 
 import panel as pn
 from panel.viewable import Viewable
 from phantom.interval import Inclusive
 
 from ..container import MetadorContainer, MetadorNode
-from ..plugins import schemas, widgets
+from ..plugins import plugingroups, schemas, widgets
 from ..schema import MetadataSchema
 from ..schema.plugins import PluginRef
 from ..schema.types import NonEmptyStr, SemVerTuple
@@ -272,41 +275,74 @@ def get_grp_label(idx):
     )
 
 
-def add_widgets(w_grp, ui_grp, *, server=None, container_id: Optional[str] = None):
-    """Instantiate and add widget to the flexibly wrapping row that handles the entire group."""
+def make_widget_tile(
+    node: MetadorNode,
+    wmeta: WidgetConf,
+    *,
+    server=None,
+    container_id: Optional[str] = None,
+) -> Viewable:
+    """Instantiate widget for a node and return a tile for the dashboard."""
     w_width, w_height = 500, 500  # max size of a widget tile, arbitrarily set
+    w_cls = widgets.get(wmeta.widget_name, wmeta.widget_version)
+    label = pn.pane.Str(f"{node.name}:")
+
+    # instantiating the appropriate widget
+    w_obj = w_cls(
+        node,
+        wmeta.schema_name,
+        wmeta.schema_version,
+        server=server,
+        container_id=container_id,
+        # reset max widget of a widget tile,  only if it is for a pdf, text or video file
+        max_width=700
+        if "pdf" in wmeta.widget_name
+        or "text" in wmeta.widget_name
+        or "video" in wmeta.widget_name
+        else w_width,
+        # reset max height of a widget tile, only if it is for a text file
+        max_height=700 if "text" in wmeta.widget_name else w_height,
+    )
+
+    return pn.Column(
+        label,
+        w_obj.show(),
+        sizing_mode="scale_both",
+        scroll=False
+        if "image" in wmeta.widget_name or "pdf" in wmeta.widget_name
+        else True,
+    )
+
+
+def add_widgets(
+    w_grp,
+    ui_grp,
+    *,
+    server=None,
+    container_id: Optional[str] = None,
+    loaders: Optional[List[Callable[[], None]]] = None,
+):
+    """Instantiate and add widget to the flexibly wrapping row that handles the entire group.
+
+    If a list of `loaders` is passed, the widgets are not instantiated, instead
+    placeholders are added and functions to load the actual widgets are collected.
+    """
     for node, wmeta in w_grp:
-        w_cls = widgets.get(wmeta.widget_name, wmeta.widget_version)
-        label = pn.pane.Str(f"{node.name}:")
-
-        # instantiating the appropriate widget
-        w_obj = w_cls(
-            node,
-            wmeta.schema_name,
-            wmeta.schema_version,
-            server=server,
-            container_id=container_id,
-            # reset max widget of a widget tile,  only if it is for a pdf, text or video file
-            max_width=700
-            if "pdf" in wmeta.widget_name
-            or "text" in wmeta.widget_name
-            or "video" in wmeta.widget_name
-            else w_width,
-            # reset max height of a widget tile, only if it is for a text file
-            max_height=700 if "text" in wmeta.widget_name else w_height,
+        make_tile = partial(
+            make_widget_tile, node, wmeta, server=server, container_id=container_id
         )
+        if loaders is None:
+            # adding the new widget to the given row
+            ui_grp.append(make_tile())
+            continue
 
-        # adding the new widget to the given row
-        ui_grp.append(
-            pn.Column(
-                label,
-                w_obj.show(),
-                sizing_mode="scale_both",
-                scroll=False
-                if "image" in wmeta.widget_name or "pdf" in wmeta.widget_name
-                else True,
-            )
-        )
+        tile = pn.Column(pn.pane.Str(f"{node.name}: loading ..."))
+
+        def load(tile=tile, make_tile=make_tile):
+            tile.objects = [make_tile()]
+
+        ui_grp.append(tile)
+        loaders.append(load)
     return ui_grp
 
 
@@ -317,6 +353,7 @@ def get_grp_row(
     divider=False,
     server=None,
     container_id: Optional[str] = None,
+    loaders: Optional[List[Callable[[], None]]] = None,
 ):
     """Create a flexible and wrapping row for all widgets within a single group."""
     return pn.FlexBox(
@@ -332,6 +369,7 @@ def get_grp_row(
             ),
             server=server,
             container_id=container_id,
+            loaders=loaders,
         ),
         pn.layout.Divider(margin=(100, 0, 20, 0)) if divider else None,
         flex_direction="column",
@@ -342,6 +380,52 @@ def get_grp_row(
     )
 
 
+DashboardLayout = Tuple[
+    Dict[int, List[Tuple[str, WidgetConf]]], List[Tuple[str, WidgetConf]]
+]
+"""Resolved dashboard layout (like `sorted_widgets`, but with node paths instead of nodes)."""
+
+LAYOUT_CACHE_SIZE: int = 256
+"""Maximal number of container dashboard layouts that are cached."""
+
+_layout_cache: OrderedDict[Tuple[UUID, str, int], DashboardLayout] = OrderedDict()
+_layout_cache_lock = Lock()
+
+
+def _copy_layout(layout: DashboardLayout) -> DashboardLayout:
+    """Return copy of a dashboard layout (the widget configurations are copied)."""
+
+    def copy_row(row: List[Tuple[str, WidgetConf]]) -> List[Tuple[str, WidgetConf]]:
+        return [(path, wmeta.copy()) for path, wmeta in row]
+
+    grps, ungrp = layout
+    return {k: copy_row(v) for k, v in grps.items()}, copy_row(ungrp)
+
+
+def _get_layout(container: MetadorContainer) -> DashboardLayout:
+    """Return resolved dashboard layout of a container.
+
+    Layouts of read-only containers are cached, keyed by the container UUID and
+    revision (i.e. latest patch), so resolving schemas and widgets happens once.
+    Cached layouts are copied, so callers can modify the returned layout.
+    """
+    if (rev := container.metador.revision) is None:  # container can change, do not cache
+        return Dashboard._resolve_layout(container)
+
+    key = (container.metador.container_uuid, rev, plugingroups.generation)
+    with _layout_cache_lock:
+        if (layout := _layout_cache.get(key)) is not None:
+            _layout_cache.move_to_end(key)
+            return _copy_layout(layout)
+
+    layout = Dashboard._resolve_layout(container)
+    with _layout_cache_lock:
+        _layout_cache[key] = layout
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return _copy_layout(layout)
+
+
 class Dashboard:
     """The dashboard presents a view of all marked nodes in a container.
 
@@ -360,6 +444,7 @@ class Dashboard:
         *,
         server: WidgetServer = None,
         container_id: Optional[str] = None,
+        lazy: bool = False,
     ):
         """Return instance of a dashboard.
 
@@ -367,24 +452,44 @@ class Dashboard:
             container: Actual Metador container that is open and readable
             server: `WidgetServer` to use for the widgets (default: standalone server / Jupyter mode)
             container_id: Container id usable with the server to get this container (default: container UUID)
+            lazy: If true, show groups in tabs and load widgets only when the tab is opened
         """
         self._container: MetadorContainer = container
         self._server = server
         self._container_id: str = container_id
+        self._lazy = lazy
 
         # figure out what schemas to show and what widgets to use and collect
+        # (the resolved layout is cached for unchanged read-only containers)
+        grps, ungrp = _get_layout(self._container)
+
+        def to_nwps(row: List[Tuple[str, WidgetConf]]) -> NodeWidgetRow:
+            ret: NodeWidgetRow = []
+            for path, wmeta in row:
+                node = self._container[path]
+                ret.append((node.restrict(read_only=True, local_only=True), wmeta))
+            return ret
+
+        self._groups = {k: to_nwps(v) for k, v in grps.items()}
+        self._ungrouped = to_nwps(ungrp)
+
+    @staticmethod
+    def _resolve_layout(container: MetadorContainer) -> DashboardLayout:
+        """Resolve widgets for all nodes marked for the dashboard, sorted into groups."""
         ws: List[NodeWidgetPair] = []
-        for node in self._container.metador.query(DashboardConf):
+        for node in container.metador.query(DashboardConf):
             dbmeta = node.meta.get(DashboardConf)
-            restr_node = node.restrict(read_only=True, local_only=True)
             for wmeta in dbmeta.widgets:
-                ws.append((restr_node, self._resolve_node(node, wmeta)))
+                ws.append((node, Dashboard._resolve_node(node, wmeta)))
+
+        def to_paths(row: NodeWidgetRow) -> List[Tuple[str, WidgetConf]]:
+            return [(node.name, wmeta) for node, wmeta in row]
 
         grps, ungrp = sorted_widgets(ws)
-        self._groups = grps
-        self._ungrouped = ungrp
+        return {k: to_paths(v) for k, v in grps.items()}, to_paths(ungrp)
 
-    def _resolve_node(self, node: MetadorNode, wmeta: WidgetConf) -> WidgetConf:
+    @staticmethod
+    def _resolve_node(node: MetadorNode, wmeta: WidgetConf) -> WidgetConf:
         """Check and resolve widget dashboard metadata for a node."""
         wmeta = wmeta.copy()  # use copy, abandon original
 
@@ -402,6 +507,9 @@ class Dashboard:
 
     def show(self) -> Viewable:
         """Instantiate widgets for container and return resulting dashboard."""
+        if self._lazy:
+            return self._show_lazy()
+
         # Outermost element: The Dashboard is a column of widget groups
         db = pn.FlexBox(
             flex_direction="column",
@@ -434,3 +542,44 @@ class Dashboard:
                 )
             )
         return db
+
+    def _show_lazy(self) -> Viewable:
+        """Return dashboard with widget groups in tabs, loading widgets on demand.
+
+        Initially all widgets are placeholders. The widgets of the opened tab are
+        loaded after the page has been served, other tabs are loaded when opened.
+        Each widget is loaded in a separate callback on the event loop of the session,
+        so the widgets of a tab show up one after another.
+        """
+        db = pn.Tabs(dynamic=True, sizing_mode="scale_both")
+        rows: List[Tuple[Optional[int], NodeWidgetRow]] = list(
+            enumerate(self._groups.values())
+        )
+        if self._ungrouped:
+            rows.append((None, self._ungrouped))
+
+        tab_loaders: List[List[Callable[[], None]]] = []
+        for idx, widget_group in rows:
+            loaders: List[Callable[[], None]] = []
+            row = get_grp_row(
+                idx=idx,
+                widget_group=widget_group,
+                server=self._server,
+                container_id=self._container_id,
+                loaders=loaders,
+            )
+            db.append((get_grp_label(idx).object, row))
+            tab_loaders.append(loaders)
+
+        def load_tab(idx: int, deferred: bool = False):
+            loaders, tab_loaders[idx] = tab_loaders[idx], []  # load only once
+            for load in loaders:
+                if deferred:
+                    pn.state.onload(load)
+                else:
+                    pn.state.execute(load, schedule=True)
+
+        if tab_loaders:
+            load_tab(db.active, deferred=True)
+        db.param.watch(lambda event: load_tab(event.new), "active")
+        return db
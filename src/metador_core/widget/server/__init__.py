@@ -1,25 +1,68 @@
 """The Metador widget server."""
 from __future__ import annotations
 
-import io
-from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Union
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import lru_cache, partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-import numpy as np
 import panel as pn
 from bokeh.application import Application
 from bokeh.application.handlers.function import FunctionHandler
 from bokeh.document import Document
 from bokeh.embed import server_document
 from bokeh.server.server import Server
-from flask import Blueprint, request, send_file
+from bokeh.util.serialization import make_id
+from flask import Blueprint, Flask, Response, request, send_file
 from tornado.ioloop import IOLoop
 from werkzeug.exceptions import BadRequest, NotFound
+from werkzeug.wsgi import ClosingIterator
 
 from metador_core.container import ContainerProxy, MetadorContainer, MetadorNode
 
+from .files import EmbeddedFile
+from .previews import PreviewCache, preview_size
+
 if TYPE_CHECKING:
     from panel.viewable import Viewable
 
+_ELEMENT_ID = "__metador_element_id__"
+"""Placeholder for the element id in memoized bokeh autoload script tags."""
+
+
+_SCRIPT_ID = re.compile(r'<script id="([^"]+)">')
+"""Pattern matching the element id in a bokeh autoload script tag."""
+
+
+@lru_cache(maxsize=4096)
+def _script_template(url: str, args: Tuple[Tuple[str, str], ...]) -> str:
+    """Return autoload script tag for a bokeh app, with a placeholder element id.
+
+    The tag is created by `bokeh.embed.server_document` once per app and arguments.
+    Its element id is `_ELEMENT_ID`, which must be replaced by a fresh id per use.
+    """
+    tag = server_document(url, arguments=dict(args))
+    elem_id = _SCRIPT_ID.match(tag).group(1)  # type: ignore
+    return tag.replace(f'id="{elem_id}"', f'id="{_ELEMENT_ID}"').replace(
+        f"element={elem_id}&", f"element={_ELEMENT_ID}&"
+    )
+
 
 class WidgetServer:
     """Server backing the instances of Metador widgets (and dashboard).
@@ -32,6 +75,12 @@ class WidgetServer:
     https://docs.bokeh.org/en/latest/docs/user_guide/server.html#embedding-bokeh-server-as-a-library
     """
 
+    MAX_TABLE_ROWS: int = 10_000
+    """Maximum number of rows of a table page returned by the API."""
+
+    PREVIEW_MAX_AGE: int = 365 * 24 * 3600
+    """Seconds that clients may cache previews (they never change)."""
+
     @classmethod
     def _get_widget_arg(cls, args: Dict[str, List[bytes]], name: str) -> Optional[str]:
         """Extract argument from bokeh server request argument dict."""
@@ -73,27 +122,37 @@ class WidgetServer:
             raise NotFound(f"Bokeh {viewable_type} not found: '{name}'")
         return known[name]
 
-    def _get_container_node(
+    @contextmanager
+    def _container_node(
         self, container_id: str, container_path: Optional[str] = None
-    ) -> Optional[Union[MetadorContainer, MetadorNode]]:
+    ) -> Iterator[Union[MetadorContainer, MetadorNode]]:
         """Retrieve desired container (and target path, if provided).
 
         If `path` is provided in the query parameters,
-        will return the container node, otherwise returns the full container.
+        will yield the container node, otherwise yields the full container.
+
+        If the container proxy supports leases (e.g. `PooledContainerProvider`),
+        the container is leased, i.e. it stays open until the context is left.
 
         Raises NotFound exception if container or path in container do not exist.
         """
-        try:
-            container = self._containers.get(container_id)
-        except KeyError as e:
-            raise NotFound(f"Container not found: '{container_id}'") from e
-
-        if container_path is None:
-            return container
-        if node := container.get(container_path):
-            return node.restrict(read_only=True, local_only=True)
-
-        raise NotFound(f"Path not found in container: {container_path}")
+        if (lease := getattr(self._containers, "lease", None)) is not None:
+            ctx = lease(container_id)
+        else:
+            try:
+                ctx = nullcontext(self._containers.get(container_id))
+            except KeyError:
+                ctx = nullcontext(None)
+
+        with ctx as container:
+            if container is None:
+                raise NotFound(f"Container not found: '{container_id}'")
+            if container_path is None:
+                yield container
+            elif node := container.get(container_path):
+                yield node.restrict(read_only=True, local_only=True)
+            else:
+                raise NotFound(f"Path not found in container: {container_path}")
 
     # ----
 
@@ -104,6 +163,10 @@ class WidgetServer:
         bokeh_endpoint: Optional[str] = None,
         flask_endpoint: Optional[str] = None,
         populate: bool = True,
+        io_workers: Optional[int] = None,
+        max_age: int = 60,
+        lazy_dashboard: bool = False,
+        previews: Optional[PreviewCache] = None,
     ):
         """Widget server to serve widget- and dashboard-like bokeh entities.
 
@@ -112,8 +175,26 @@ class WidgetServer:
             bokeh_endpoint: Endpoint where the bokeh server will run (`WidgetServer.run()`)
             flask_endpoint: Endpoint where Widget API is mounted (`WidgetServer.get_flask_blueprint()`)
             populate: If true (default), load and serve all installed widgets and generic dashboard
+            io_workers: If set, blocking container reads of API requests are done
+                in a thread pool of this size (bounding the concurrent h5py I/O).
+                Not supported with per-thread container handles (see
+                `PooledContainerProvider`), as they must not leave their thread.
+            max_age: Seconds that clients may cache responses of `index` and `script`
+            lazy_dashboard: If true, the generic dashboard loads widgets on demand
+            previews: Cache for file previews (if not set, uses a temporary directory)
         """
+        if io_workers is not None and getattr(containers, "per_thread", False):
+            msg = "io_workers can not be used with per-thread container handles!"
+            raise ValueError(msg)
+
         self._containers = containers
+        self._io_workers = io_workers
+        self._io_pool: Optional[Executor] = None
+        self._io_pid: int = -1
+        self._max_age = max_age
+        self._lazy_dashboard = lazy_dashboard
+        self._previews = previews
+        self._index_cache: Optional[Tuple[int, bytes, str]] = None
         self._bokeh_apps: Dict[str, Application] = {}
         self._reg_widgets: Dict[str, str] = {}
         self._reg_dashboards: Dict[str, str] = {}
@@ -127,16 +208,24 @@ class WidgetServer:
             self.register_installed()
 
     def register_installed(self) -> None:
-        """Register installed widgets and the generic dashboard."""
+        """Register installed widgets and the generic dashboard.
+
+        The widget plugins are not loaded here (only their names are collected
+        from the entry points), each widget is loaded on its first request.
+        """
         # NOTE: do imports here, otherwise circular imports.
         from metador_core.plugins import widgets
 
-        from ..dashboard import Dashboard
+        def load_dashboard():
+            from ..dashboard import Dashboard
 
-        self.register_dashboard("generic", self.make_bokeh_app(Dashboard))
-        for wclass in widgets.values():
+            return partial(Dashboard, lazy=self._lazy_dashboard)
+
+        self.register_dashboard("generic", self.make_lazy_bokeh_app(load_dashboard))
+        for w_ref in widgets.keys():
             self.register_widget(
-                wclass.Plugin.plugin_string(), self.make_bokeh_app(wclass)
+                w_ref.plugin_string(),
+                self.make_lazy_bokeh_app(partial(widgets.__getitem__, w_ref)),
             )
 
     def register_widget(self, name: str, bokeh_app: Application) -> None:
@@ -144,14 +233,26 @@ class WidgetServer:
         mapped_name = f"w-{name}"
         self._bokeh_apps[f"/{mapped_name}"] = bokeh_app
         self._reg_widgets[name] = mapped_name
+        self._index_cache = None
 
     def register_dashboard(self, name: str, bokeh_app: Application) -> None:
         """Register a new dashboard application."""
         mapped_name = f"d-{name}"
         self._bokeh_apps[f"/{mapped_name}"] = bokeh_app
         self._reg_dashboards[name] = mapped_name
+        self._index_cache = None
+
+    def make_bokeh_app(self, viewable_class: Type[Viewable]) -> Application:
+        """Return bokeh app for a widget or dashboard class."""
+        return self.make_lazy_bokeh_app(lambda: viewable_class)
+
+    def make_lazy_bokeh_app(self, load: Callable[[], Type[Viewable]]) -> Application:
+        """Return bokeh app for a widget or dashboard class that is loaded on demand.
+
+        The passed function is called on the first request to get the class.
+        """
+        loaded: List[Type[Viewable]] = []
 
-    def make_bokeh_app(self, viewable_class: Viewable) -> Application:
         def handler(doc: Document) -> None:
             """Return bokeh app for Metador widget.
 
@@ -161,14 +262,22 @@ class WidgetServer:
 
             The app will understand take `id` and optionally a `path` as query params.
             These are parsed and used to look up the correct container (node).
+            The container is used until the session is destroyed.
             """
             w_args = self._get_widget_args(doc)
-            if c_obj := self._get_container_node(**w_args):
+            with ExitStack() as stack:
+                c_obj = stack.enter_context(self._container_node(**w_args))
+                if not loaded:
+                    loaded.append(load())
+                viewable_class = loaded[0]
                 # if we retrieved container / node, instantiate a widget and show it
                 widget = viewable_class(
                     c_obj, server=self, container_id=w_args["container_id"]
                 ).show()
                 doc.add_root(widget.get_root(doc))
+                # keep the container until the session ends
+                release = stack.pop_all().close
+                doc.on_session_destroyed(lambda _: release())
 
         return Application(FunctionHandler(handler, trap_exceptions=True))
 
@@ -192,8 +301,39 @@ class WidgetServer:
         """Set URI where the bokeh server is running."""
         self._bokeh_endpoint = uri.rstrip("/")
 
-    def run(self, **kwargs):
-        """Run bokeh server with the registered apps (will block the current process)."""
+    def _get_io_pool(self) -> Optional[Executor]:
+        """Return thread pool for blocking I/O (if configured).
+
+        The pool is created lazily for each process (threads do not survive forking).
+        """
+        if self._io_workers is None:
+            return None
+        if self._io_pool is None or self._io_pid != os.getpid():
+            self._io_pid = os.getpid()
+            self._io_pool = ThreadPoolExecutor(
+                max_workers=self._io_workers, thread_name_prefix="metador-io"
+            )
+        return self._io_pool
+
+    def _get_previews(self) -> PreviewCache:
+        """Return preview cache (temporary default cache is created on first use)."""
+        if self._previews is None:
+            self._previews = PreviewCache()
+        return self._previews
+
+    def _run_io(self, func: Callable[..., Any], *args) -> Any:
+        """Run a blocking container access (in the I/O thread pool, if configured)."""
+        if (pool := self._get_io_pool()) is None:
+            return func(*args)
+        return pool.submit(func, *args).result()
+
+    def run(self, *, num_procs: int = 1, **kwargs):
+        """Run bokeh server with the registered apps (will block the current process).
+
+        If `num_procs` is greater than 1, the server forks into multiple processes
+        sharing the same port (each process serving the registered apps).
+        Remaining keyword arguments are passed to the bokeh `Server`.
+        """
         # kwargs["io_loop"] = kwargs.get("io_loop") or IOLoop()
         # server = pn.io.server.get_server(self._bokeh_apps, **kwargs)
 
@@ -202,8 +342,14 @@ class WidgetServer:
         # This seems to work ok:
         pn.config.inline = True
 
-        kwargs["loop"] = kwargs.get("io_loop") or IOLoop()
-        server = Server(self._bokeh_apps, **kwargs)
+        if num_procs == 1:
+            kwargs["io_loop"] = kwargs.get("io_loop") or IOLoop()
+        elif "io_loop" in kwargs:
+            raise ValueError("Cannot pass io_loop when running multiple processes!")
+        elif close_all := getattr(self._containers, "close_all", None):
+            close_all()  # do not inherit opened containers into the processes
+
+        server = Server(self._bokeh_apps, num_procs=num_procs, **kwargs)
 
         server.start()
         server.io_loop.start()
@@ -220,15 +366,54 @@ class WidgetServer:
             raise RuntimeError("missing flask endpoint!")
         return f"{self._flask_endpoint}/file/{container_id}{node.name}"
 
-    # ----
-    # Functions making up the WidgetServer API
+    def table_url_for(self, container_id: str, node: MetadorNode) -> str:
+        """Return URL for paged access to a CSV/TSV file at Metador Container node.
 
-    def index(self):
-        """Return information about current Metador environment.
+        Pages are selected with the `start`, `rows` and `columns` query parameters.
+        """
+        if not self._flask_endpoint:
+            raise RuntimeError("missing flask endpoint!")
+        return f"{self._flask_endpoint}/table/{container_id}{node.name}"
 
-        Response includes an overview of metador-related Python packages,
-        Metador plugins, and the known widgets (nodes) and dashboards (containers).
+    def image_url_for(
+        self,
+        container_id: str,
+        node: MetadorNode,
+        *,
+        size: Optional[int] = None,
+        tile: Optional[Tuple[int, int, int]] = None,
+    ) -> str:
+        """Return URL for a downscaled image file at Metador Container node.
+
+        If `size` is given, the URL resolves to a thumbnail fitting into a square
+        of that size, if `tile` is given (as `(level, x, y)`), it resolves to a tile
+        of the image pyramid. Otherwise, the original image is returned.
         """
+        if not self._flask_endpoint:
+            raise RuntimeError("missing flask endpoint!")
+        url = f"{self._flask_endpoint}/image/{container_id}{node.name}"
+        if size is not None:
+            url += f"?size={size}"
+        elif tile is not None:
+            url += "?level={}&x={}&y={}".format(*tile)
+        return url
+
+    def preview_url_for(self, container_id: str, node: MetadorNode, size: int) -> str:
+        """Return URL for a preview image of a file at Metador Container node.
+
+        The preview fits into a square of (at least) the given size.
+        Use `previews.supports_preview` to check whether a file can have a preview.
+        """
+        if not self._flask_endpoint:
+            raise RuntimeError("missing flask endpoint!")
+        size = preview_size(size)
+        return f"{self._flask_endpoint}/preview/{container_id}{node.name}?size={size}"
+
+    # ----
+    # Functions making up the WidgetServer API
+
+    def _index_data(self) -> Dict[str, Any]:
+        """Return information about current Metador environment."""
         from metador_core.plugin.types import to_ep_name
         from metador_core.plugins import plugingroups
 
@@ -246,46 +431,278 @@ class WidgetServer:
             "plugins": groups,
         }
 
+    def _cached_response(
+        self,
+        body: Union[str, bytes],
+        mimetype: str,
+        etag: Optional[str],
+        weak: bool = False,
+        max_age: Optional[int] = None,
+    ):
+        """Return response that can be cached by clients (supports `If-None-Match`).
+
+        If no `max_age` is passed, uses the one configured for the server.
+        If no `etag` is passed, the response must not be cached.
+        """
+        res = Response(body, mimetype=mimetype)
+        if etag is None:
+            res.cache_control.no_store = True
+            return res
+        res.set_etag(etag, weak=weak)
+        res.cache_control.public = True
+        res.cache_control.max_age = self._max_age if max_age is None else max_age
+        return res.make_conditional(request.environ)
+
+    def index(self):
+        """Return information about current Metador environment.
+
+        Response includes an overview of metador-related Python packages,
+        Metador plugins, and the known widgets (nodes) and dashboards (containers).
+
+        The encoded response is cached until plugin groups are reset
+        or new widgets or dashboards are registered.
+        """
+        from metador_core.plugins import plugingroups
+
+        generation = plugingroups.generation
+        cached = self._index_cache
+        if cached is None or cached[0] != generation:
+            body = json.dumps(self._index_data()).encode("utf-8")
+            cached = (generation, body, hashlib.sha256(body).hexdigest())
+            self._index_cache = cached
+
+        _, body, etag = cached
+        return self._cached_response(body, "application/json", etag)
+
     def download(self, container_id: str, container_path: str):
-        """Return file download stream of a file embedded in the container."""
-        node = self._get_container_node(container_id, container_path)
-        # get data out of container
-        obj = node[()]
-        bs = obj.tolist() if isinstance(obj, np.void) else obj
-        if not isinstance(bs, bytes):
-            raise BadRequest(f"Path not a bytes object: /{container_path}")
-
-        # construct a default file name based on path in container
-        def_name = f"{container_id}_{container_path.replace('/', '__')}"
-        # if object has attached file metadata, use it to serve data:
-        filemeta = node.meta.get("core.file")
-        name = filemeta.id_ if filemeta else def_name
-        mime = filemeta.encodingFormat if filemeta else None
-
-        # requested as explicit file download?
-        dl = bool(request.args.get("download", False))
-        # return file download stream with download metadata
-        return send_file(
-            io.BytesIO(bs), download_name=name, mimetype=mime, as_attachment=dl
+        """Return file download stream of a file embedded in the container.
+
+        The file is streamed in chunks (without loading it into memory at once),
+        supports HTTP range requests and conditional requests (`If-None-Match`).
+        The container is used until the response is closed.
+        """
+        with ExitStack() as stack:
+            node = stack.enter_context(
+                self._container_node(container_id, container_path)
+            )
+            try:
+                file = EmbeddedFile(node, executor=self._get_io_pool())
+            except ValueError as e:
+                raise BadRequest(f"Path not a bytes object: /{container_path}") from e
+            stack.enter_context(file)
+
+            # construct a default file name based on path in container
+            def_name = f"{container_id}_{container_path.replace('/', '__')}"
+            # if object has attached file metadata, use it to serve data:
+            filemeta = self._run_io(node.meta.get, "core.file")
+            name = filemeta.id_ if filemeta else def_name
+            mime = filemeta.encodingFormat if filemeta else None
+
+            # requested as explicit file download?
+            dl = bool(request.args.get("download", False))
+            # return file download stream with download metadata
+            res = send_file(
+                file,
+                download_name=name,
+                mimetype=mime,
+                as_attachment=dl,
+                conditional=False,
+                etag=self._file_etag(node, file.size),
+            )
+            res.content_length = file.size
+            # handle range and conditional requests (raises 416 on invalid range)
+            res = res.make_conditional(
+                request.environ, accept_ranges=True, complete_length=file.size
+            )
+            # file and container are released when the response is closed
+            # (NOTE: on-close callbacks of file responses are not called)
+            res.response = ClosingIterator(res.response, stack.pop_all().close)
+            return res
+
+    @staticmethod
+    def _file_etag(node: MetadorNode, size: int) -> Optional[str]:
+        """Return ETag for a file, based on the container revision, node path and size.
+
+        Returns None for files in writable containers (the content can change).
+        """
+        revision = node.metador.revision
+        if revision is None:
+            return None
+        c_uuid = node.metador.container_uuid
+        key = f"{c_uuid}:{revision}:{node.name}:{size}".encode("utf-8")
+        return hashlib.sha256(key).hexdigest()
+
+    @staticmethod
+    def _derived_etag(etag: Optional[str], args: str) -> Optional[str]:
+        """Return ETag for a response derived from a file with given ETag."""
+        if etag is None:
+            return None
+        return hashlib.sha256(f"{etag}:{args}".encode()).hexdigest()
+
+    @staticmethod
+    def _int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
+        """Return non-negative integer query parameter (or raise BadRequest)."""
+        val = request.args.get(name)
+        if val is None:
+            return default
+        try:
+            ret = int(val)
+        except ValueError as e:
+            raise BadRequest(f"Parameter '{name}' must be an integer!") from e
+        if ret < 0:
+            raise BadRequest(f"Parameter '{name}' must be non-negative!")
+        return ret
+
+    @contextmanager
+    def _embedded_file_node(
+        self, container_id: str, container_path: str
+    ) -> Iterator[Tuple[MetadorNode, Optional[str]]]:
+        """Yield node of an embedded file and its ETag (or raise BadRequest)."""
+        with self._container_node(container_id, container_path) as node:
+            try:
+                with EmbeddedFile(node) as file:
+                    etag = self._file_etag(node, file.size)
+            except ValueError as e:
+                raise BadRequest(f"Path not a bytes object: /{container_path}") from e
+            yield node, etag
+
+    def table(self, container_id: str, container_path: str):
+        """Return a page of rows of a CSV/TSV file embedded in the container.
+
+        Query parameters:
+        * `start`: index of the first row (default: 0)
+        * `rows`: number of rows (default: 100, at most `MAX_TABLE_ROWS`)
+        * `columns`: comma-separated list of columns to return (default: all)
+
+        The response contains the column names, total number of rows, index of
+        the first returned row and a list of rows.
+        """
+        from .data import read_table_page, table_index
+
+        start = self._int_arg("start", 0)
+        rows = min(self._int_arg("rows", 100), self.MAX_TABLE_ROWS)
+        columns = request.args.get("columns")
+        cols = columns.split(",") if columns else None
+
+        with self._embedded_file_node(container_id, container_path) as (node, etag):
+            try:
+                idx = self._run_io(table_index, node)
+                read_page = partial(read_table_page, index=idx)
+                df = self._run_io(read_page, node, start, rows, cols)
+            except (ValueError, UnicodeDecodeError) as e:
+                raise BadRequest(f"Cannot read table: {e}") from e
+
+        page = json.loads(df.to_json(orient="split", date_format="iso"))
+        body = json.dumps(
+            {
+                "columns": page["columns"],
+                "num_rows": idx.num_rows,
+                "start": df.index.start if len(df) else start,
+                "data": page["data"],
+            }
         )
+        etag = self._derived_etag(etag, f"{start}:{rows}:{columns}")
+        return self._cached_response(body, "application/json", etag)
 
-    def get_script(
+    def image(self, container_id: str, container_path: str):
+        """Return a downscaled version of an image embedded in the container.
+
+        Query parameters:
+        * `size`: return thumbnail fitting into a square of given size (in pixels)
+        * `level`, `x`, `y`: return tile of the image pyramid (see `image_tile`)
+
+        Without parameters, the original file is returned.
+        """
+        from .data import image_thumbnail, image_tile
+
+        size = self._int_arg("size")
+        level = self._int_arg("level")
+        if size is None and level is None:
+            return self.download(container_id, container_path)
+
+        with self._embedded_file_node(container_id, container_path) as (node, etag):
+            try:
+                if size is not None:
+                    img, mime = self._run_io(image_thumbnail, node, max(1, size))
+                    etag_args = f"size={size}"
+                else:
+                    x, y = self._int_arg("x", 0), self._int_arg("y", 0)
+                    img, mime = self._run_io(image_tile, node, level, x, y)
+                    etag_args = f"tile={level},{x},{y}"
+            except (OSError, ValueError) as e:  # PIL raises OSError for unknown files
+                raise BadRequest(f"Cannot read image: {e}") from e
+
+        etag = self._derived_etag(etag, etag_args)
+        return self._cached_response(img, mime, etag)
+
+    def preview(self, container_id: str, container_path: str):
+        """Return preview image (thumbnail or poster frame) of a file in the container.
+
+        The preview fits into a square of the size given by the `size` query parameter
+        (rounded up, see `previews.preview_size`). Previews are identified by the
+        hashsum of the file, so they are served with long-lived cache headers.
+        """
+        size = preview_size(self._int_arg("size", 256))
+        with self._container_node(container_id, container_path) as node:
+            ret = self._run_io(self._get_previews().get, node, size)
+        if ret is None:
+            raise NotFound(f"No preview available: /{container_path}")
+        img, mime = ret
+
+        etag = hashlib.sha256(img).hexdigest()
+        res = self._cached_response(img, mime, etag, max_age=self.PREVIEW_MAX_AGE)
+        res.cache_control.immutable = True
+        return res
+
+    def _get_script_template(
         self,
         viewable_type: Literal["widget", "dashboard"],
         name: str,
         container_id: str,
         container_path: Optional[str] = None,
     ) -> str:
-        """Return a script tag that will auto-load the desired widget for selected container."""
+        """Return memoized script tag template (see `_script_template`)."""
         if not self._bokeh_endpoint:
             raise RuntimeError("missing bokeh endpoint!")
         if viewable_type == "dashboard" and container_path:
             raise BadRequest("Dashboards do not accept a container path!")
 
-        return server_document(
+        return _script_template(
             f"{self._bokeh_endpoint}/{self._get_bokeh_widget_name(viewable_type, name)}",
-            arguments=self._make_widget_args(container_id, container_path),
+            tuple(self._make_widget_args(container_id, container_path).items()),
+        )
+
+    def get_script(
+        self,
+        viewable_type: Literal["widget", "dashboard"],
+        name: str,
+        container_id: str,
+        container_path: Optional[str] = None,
+    ) -> str:
+        """Return a script tag that will auto-load the desired widget for selected container.
+
+        The script tags are memoized (only the unique element id is filled in).
+        """
+        template = self._get_script_template(
+            viewable_type, name, container_id, container_path
         )
+        return template.replace(_ELEMENT_ID, make_id())
+
+    def script(
+        self,
+        viewable_type: Literal["widget", "dashboard"],
+        name: str,
+        container_id: str,
+        container_path: Optional[str] = None,
+    ):
+        """Return response with script tag of `get_script` (supports HTTP caching)."""
+        template = self._get_script_template(
+            viewable_type, name, container_id, container_path
+        )
+        etag = hashlib.sha256(template.encode("utf-8")).hexdigest()
+        script = template.replace(_ELEMENT_ID, make_id())
+        # NOTE: weak ETag, as the element id differs (semantically equivalent)
+        return self._cached_response(script, "text/html", etag, weak=True)
 
     def get_flask_blueprint(self, *args):
         """Return a Flask blueprint with the Metador container and widget API."""
@@ -293,14 +710,26 @@ class WidgetServer:
 
         api.route("/")(self.index)
         api.route("/file/<container_id>/<path:container_path>")(self.download)
+        api.route("/table/<container_id>/<path:container_path>")(self.table)
+        api.route("/image/<container_id>/<path:container_path>")(self.image)
+        api.route("/preview/<container_id>/<path:container_path>")(self.preview)
         api.route("/<viewable_type>/<name>/<container_id>/")(
             api.route("/<viewable_type>/<name>/<container_id>/<path:container_path>")(
-                self.get_script
+                self.script
             )
         )
 
         return api
 
+    def make_flask_app(self, name: str = __name__) -> Flask:
+        """Return a Flask (WSGI) application with the API blueprint mounted at the root.
+
+        The returned app can be served by any (multi-worker) WSGI server.
+        """
+        app = Flask(name)
+        app.register_blueprint(self.get_flask_blueprint("widget-api", name))
+        return app
+
 
 # NOTE: snippet to make script tag not evaluate by default
 # it can be used to prevent the auto-loading during DOM injection, if needed for some reason
@@ -0,0 +1,340 @@
+"""Paged and downsampled views of large embedded files.
+
+Widgets showing tables or images should not load complete files that can be
+arbitrarily large. The functions here compute only what is actually displayed:
+
+* row pages (and column projections) of CSV/TSV tables
+* thumbnails and tiles of an image pyramid (each level halving the resolution)
+
+Results are cached in memory (see `data_cache`), keyed by the location and
+revision of the embedded file, so that changed containers are never served stale data.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import pandas as pd
+from PIL import Image
+
+from .files import EmbeddedFile
+
+T = TypeVar("T")
+
+TABLE_INDEX_STEP: int = 1024
+"""Number of table rows between two row offsets stored in a table index."""
+
+TILE_SIZE: int = 256
+"""Width and height of image pyramid tiles (in pixels)."""
+
+
+class LRUCache:
+    """Simple thread-safe LRU cache with a bounded number of entries."""
+
+    def __init__(self, max_entries: int = 256):
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = Lock()
+        self.max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_compute(self, key: Optional[Hashable], compute: Callable[[], T]) -> T:
+        """Return cached value for the key, computing and storing it if needed.
+
+        If the key is None, the value is computed, but not cached.
+        """
+        if key is None:
+            return compute()
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+
+data_cache = LRUCache()
+"""Cache for table indices, table pages and image thumbnails and tiles."""
+
+
+def file_key(node: Any) -> Optional[Tuple[Any, ...]]:
+    """Return key identifying the current state of an embedded file.
+
+    Returns None if the container is writable (i.e. the file could change).
+    """
+    toc = node.metador
+    if (rev := toc.revision) is None:
+        return None
+    return (toc.container_uuid, rev, node.name)
+
+
+def _cache_key(node: Any, *args) -> Optional[Tuple[Any, ...]]:
+    return None if (key := file_key(node)) is None else key + args
+
+
+# ---- tables ----
+
+
+@dataclass
+class TableIndex:
+    """Index of a CSV/TSV file to allow for reading arbitrary row pages."""
+
+    header: bytes
+    """Header line of the table."""
+
+    sep: str
+    """Detected column separator."""
+
+    columns: List[str]
+    """Column names."""
+
+    num_rows: int
+    """Number of data rows (excluding header)."""
+
+    offsets: List[int]
+    """Byte offset of every `TABLE_INDEX_STEP`-th data row (starting with first row)."""
+
+    multiline: bool = False
+    """Whether quoted values span multiple lines (then `offsets` is empty)."""
+
+
+def _sniff_sep(sample: bytes) -> str:
+    try:
+        text = sample.decode("utf-8", errors="ignore")
+        return csv.Sniffer().sniff(text, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+_READ_CSV_ARGS = dict(
+    # smart date processing
+    parse_dates=True,
+    dayfirst=True,
+    cache_dates=True,
+)
+
+
+def build_table_index(node: Any) -> TableIndex:
+    """Scan a CSV/TSV file once and return a row offset index.
+
+    Rows are assumed to be separated by newlines. If a line contains an odd
+    number of quotes (i.e. a quoted value spans multiple lines), the rows are
+    counted by parsing the file with pandas instead and pages are read by
+    parsing the file from the start (which is much slower for large files).
+    """
+    with EmbeddedFile(node) as f:
+        r = io.BufferedReader(f, buffer_size=2**20)
+        header = r.readline()
+        sep = _sniff_sep(header + r.peek(2**16)[: 2**16])
+        columns = next(csv.reader([header.decode("utf-8")], delimiter=sep), [])
+
+        offsets: List[int] = []
+        num_rows = 0
+        pos = len(header)
+        for line in r:
+            if line.count(b'"') % 2:
+                break  # multi-line quoted value
+            if num_rows % TABLE_INDEX_STEP == 0:
+                offsets.append(pos)
+            pos += len(line)
+            if line.strip():
+                num_rows += 1
+            elif num_rows % TABLE_INDEX_STEP == 0:
+                offsets.pop()  # skip empty lines (e.g. at the end)
+        else:
+            return TableIndex(header, sep, columns, num_rows, offsets)
+
+        r.seek(0)
+        chunks = pd.read_csv(r, sep=sep, usecols=[0], chunksize=2**16)
+        num_rows = sum(len(chunk) for chunk in chunks)
+    return TableIndex(header, sep, columns, num_rows, [], multiline=True)
+
+
+def table_index(node: Any) -> TableIndex:
+    """Return (cached) table index of a CSV/TSV file."""
+    return data_cache.get_or_compute(
+        _cache_key(node, "table_index"), lambda: build_table_index(node)
+    )
+
+
+def _read_table_page(
+    node: Any,
+    start: int,
+    rows: int,
+    columns: Optional[Sequence[str]],
+    idx: TableIndex,
+) -> pd.DataFrame:
+    start = max(0, min(start, idx.num_rows))
+    rows = max(0, min(rows, idx.num_rows - start))
+    usecols = list(columns) if columns else None
+
+    if idx.multiline:
+        with EmbeddedFile(node) as f:
+            df = pd.read_csv(
+                io.BufferedReader(f, buffer_size=2**20),
+                sep=idx.sep,
+                usecols=usecols,
+                skiprows=range(1, start + 1),
+                nrows=rows,
+                **_READ_CSV_ARGS,
+            )
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    lines: List[bytes] = [idx.header]
+    if rows:
+        block = start // TABLE_INDEX_STEP
+        with EmbeddedFile(node) as f:
+            f.seek(idx.offsets[block])
+            r = io.BufferedReader(f, buffer_size=2**16)
+            skip = start - block * TABLE_INDEX_STEP
+            for line in r:
+                if not line.strip():
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                lines.append(line)
+                if len(lines) > rows:
+                    break
+
+    df = pd.read_csv(
+        io.BytesIO(b"".join(lines)), sep=idx.sep, usecols=usecols, **_READ_CSV_ARGS
+    )
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def read_table_page(
+    node: Any,
+    start: int = 0,
+    rows: int = 100,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    index: Optional[TableIndex] = None,
+) -> pd.DataFrame:
+    """Return a page of rows of a CSV/TSV file (optionally only selected columns).
+
+    The index of the returned dataframe corresponds to the row numbers in the file.
+
+    If the `TableIndex` of the file was already retrieved, it should be passed,
+    so that it is not built again (e.g. for files in writable containers).
+    """
+    key = _cache_key(node, "table_page", start, rows, tuple(columns or ()))
+
+    def compute():
+        return _read_table_page(node, start, rows, columns, index or table_index(node))
+
+    return data_cache.get_or_compute(key, compute)
+
+
+# ---- images ----
+
+
+def _encode_image(img: Image.Image, fmt: str) -> Tuple[bytes, str]:
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        img.convert("RGB").save(buf, format="JPEG", quality=85)
+        return buf.getvalue(), "image/jpeg"
+    if img.mode not in {"1", "L", "LA", "P", "RGB", "RGBA"}:
+        img = img.convert("RGBA")
+    img.save(buf, format="PNG")
+    return buf.getvalue(), "image/png"
+
+
+def _open_image(f: EmbeddedFile):
+    return Image.open(io.BufferedReader(f, buffer_size=2**20))
+
+
+def image_levels(width: int, height: int) -> int:
+    """Return number of levels of an image pyramid (until it fits into a tile)."""
+    return max(0, math.ceil(math.log2(max(width, height, 1) / TILE_SIZE))) + 1
+
+
+def thumbnail(file: BinaryIO, max_size: int) -> Tuple[bytes, str]:
+    """Return downscaled image that fits into a square of given size.
+
+    Returns encoded image and its MIME type (JPEG for JPEG images, PNG otherwise).
+    """
+    img = Image.open(file)
+    img.draft("RGB", (max_size, max_size))  # fast downscaled decoding (JPEG only)
+    fmt = img.format
+    img.thumbnail((max_size, max_size))
+    return _encode_image(img, fmt)
+
+
+def _image_thumbnail(node: Any, max_size: int) -> Tuple[bytes, str]:
+    with EmbeddedFile(node) as f:
+        return thumbnail(io.BufferedReader(f, buffer_size=2**20), max_size)
+
+
+def image_thumbnail(node: Any, max_size: int = TILE_SIZE) -> Tuple[bytes, str]:
+    """Return (cached) thumbnail of an embedded image (see `thumbnail`)."""
+    key = _cache_key(node, "image_thumbnail", max_size)
+    return data_cache.get_or_compute(key, lambda: _image_thumbnail(node, max_size))
+
+
+def _image_tile(node: Any, level: int, x: int, y: int) -> Tuple[bytes, str]:
+    with EmbeddedFile(node) as f:
+        img = _open_image(f)
+        fmt = img.format
+        w, h = img.size
+        scale = 2**level
+        # region of the tile in the original image
+        box = (x * TILE_SIZE * scale, y * TILE_SIZE * scale)
+        if level >= image_levels(w, h) or box[0] >= w or box[1] >= h:
+            raise ValueError(f"Invalid tile: level={level}, x={x}, y={y}")
+        box_end = (
+            min(w, box[0] + TILE_SIZE * scale),
+            min(h, box[1] + TILE_SIZE * scale),
+        )
+        tile_size = (
+            math.ceil((box_end[0] - box[0]) / scale),
+            math.ceil((box_end[1] - box[1]) / scale),
+        )
+        if fmt == "JPEG" and level:
+            img.draft("RGB", (math.ceil(w / scale), math.ceil(h / scale)))
+            # draft may have reduced the size by a power of 2 -> rescale box
+            factor = img.size[0] / w
+            box = (int(box[0] * factor), int(box[1] * factor))
+            box_end = (int(box_end[0] * factor), int(box_end[1] * factor))
+
+        tile = img.crop(box + box_end).resize(tile_size)
+        return _encode_image(tile, fmt)
+
+
+def image_tile(node: Any, level: int, x: int, y: int) -> Tuple[bytes, str]:
+    """Return tile of an image pyramid.
+
+    Level 0 is the original resolution, each next level has half the resolution
+    of the previous level. Tiles have size `TILE_SIZE` (except at the borders).
+
+    Returns encoded image and its MIME type (JPEG for JPEG images, PNG otherwise).
+    Raises ValueError if the tile does not exist.
+    """
+    key = _cache_key(node, "image_tile", level, x, y)
+    return data_cache.get_or_compute(key, lambda: _image_tile(node, level, x, y))
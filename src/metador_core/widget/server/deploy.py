@@ -0,0 +1,113 @@
+"""Multi-process deployment of a `WidgetServer`.
+
+The widget API is a regular WSGI application (see `WidgetServer.make_flask_app`),
+so in production it can be served by any multi-worker WSGI server (e.g. gunicorn),
+while the bokeh server is started with `WidgetServer.run(num_procs=...)`.
+
+The `serve` function provided here is a dependency-free alternative that
+runs both servers in pre-forked worker processes. All processes share the same
+`WidgetServer` (and thus the same container provider), which must be created
+before calling `serve`. Containers should not be opened before that,
+as file handles cannot be shared between processes.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Any, Dict, List
+
+from werkzeug.serving import make_server
+
+from . import WidgetServer
+
+
+def _run_flask_worker(widget_server: WidgetServer, host: str, port: int, fd: int):
+    """Serve the widget API on an already bound socket (runs in a worker process)."""
+    app = widget_server.make_flask_app()
+    make_server(host, port, app, threaded=True, fd=fd).serve_forever()
+
+
+def _run_bokeh(widget_server: WidgetServer, num_procs: int, kwargs: Dict[str, Any]):
+    """Run the bokeh server (runs in a separate process, may fork further)."""
+    os.setpgrp()  # to be able to terminate all forked bokeh processes at once
+    widget_server.run(num_procs=num_procs, **kwargs)
+
+
+def serve(
+    widget_server: WidgetServer,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 5000,
+    bokeh_port: int = 5006,
+    workers: int = 1,
+    bokeh_procs: int = 1,
+    **bokeh_kwargs,
+) -> None:
+    """Run the widget API and bokeh server in multiple processes.
+
+    Blocks until interrupted, then terminates all worker processes.
+
+    If the endpoints of the widget server are not configured yet, they are
+    set to the local addresses of the started servers.
+
+    Args:
+        widget_server: Configured widget server to serve
+        host: Address to bind the servers to
+        port: Port of the widget API (Flask)
+        bokeh_port: Port of the bokeh server
+        workers: Number of worker processes for the widget API
+        bokeh_procs: Number of bokeh server processes
+        bokeh_kwargs: Additional arguments passed to the bokeh server
+    """
+    if workers < 1 or bokeh_procs < 1:
+        raise ValueError("Number of workers and bokeh processes must be positive!")
+
+    widget_server.flask_endpoint = widget_server.flask_endpoint or f"http://{host}:{port}"
+    widget_server.bokeh_endpoint = (
+        widget_server.bokeh_endpoint or f"http://{host}:{bokeh_port}"
+    )
+    bokeh_kwargs.setdefault("address", host)
+    bokeh_kwargs.setdefault("port", bokeh_port)
+    bokeh_kwargs.setdefault("allow_websocket_origin", [f"{host}:{port}"])
+
+    # bind the API socket once, so that all workers can accept connections from it
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+
+    ctx = multiprocessing.get_context("fork")
+    procs: List[multiprocessing.process.BaseProcess] = [
+        ctx.Process(
+            target=_run_bokeh,
+            args=(widget_server, bokeh_procs, bokeh_kwargs),
+            daemon=False,
+        )
+    ]
+    procs += [
+        ctx.Process(
+            target=_run_flask_worker,
+            args=(widget_server, host, port, sock.fileno()),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if procs[0].pid is not None:
+            try:
+                os.killpg(procs[0].pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for proc in procs[1:]:
+            if proc.is_alive():
+                proc.terminate()
+        sock.close()
@@ -0,0 +1,185 @@
+"""Efficient access to files embedded in Metador containers.
+
+Embedded files (see `metador_core.packer.utils.pack_file`) are stored either as
+opaque scalar datasets or (in streaming mode) as 1-dimensional `uint8` datasets,
+which are marked with the `METADOR_FILE_ATTR` attribute.
+Reading them with `node[()]` loads the whole file into memory,
+which is not acceptable for serving large files over HTTP.
+
+The `EmbeddedFile` class provides a seekable, read-only file-like view of such a
+dataset. Whenever possible, bytes are read directly from the underlying HDF5
+file at the offset of the (contiguous and unfiltered) dataset, without loading
+the complete dataset. Chunked 1-dimensional datasets are read slice by slice.
+Otherwise, it falls back to reading the dataset once.
+"""
+from __future__ import annotations
+
+import io
+from concurrent.futures import Executor
+from typing import Any, Iterator, Optional
+
+import h5py
+import numpy as np
+
+from ...container.drivers import get_raw_dataset
+from ...container.utils import METADOR_FILE_ATTR
+
+DEFAULT_CHUNK_SIZE: int = 2**20
+"""Default number of bytes returned per chunk by `EmbeddedFile.iter_chunks`."""
+
+
+def is_embedded_file(node: Any) -> bool:
+    """Return whether the node looks like a dataset containing an embedded file."""
+    ds = get_raw_dataset(node)
+    if ds is None:
+        return False
+    if ds.shape is None:  # h5py.Empty
+        return ds.dtype.kind in {"S", "i", "u"}
+    if len(ds.shape) == 1:  # streamed file (not just any array of bytes)
+        return ds.dtype == np.uint8 and METADOR_FILE_ATTR in ds.attrs
+    if ds.shape != ():
+        return False
+    if ds.dtype.kind == "O":  # variable-length bytes
+        str_info = h5py.check_string_dtype(ds.dtype)
+        return str_info is not None and str_info.encoding == "ascii"
+    return ds.dtype.kind in {"V", "S"}
+
+
+class EmbeddedFile(io.RawIOBase):
+    """Seekable read-only binary file view of an embedded file dataset."""
+
+    def __init__(self, node: Any, *, executor: Optional[Executor] = None):
+        """Open embedded file for reading.
+
+        Args:
+            node: Dataset node with an embedded file.
+            executor: If provided, all blocking reads are performed by it.
+        """
+        ds = get_raw_dataset(node)
+        if ds is None or not is_embedded_file(node):
+            raise ValueError(f"Node does not contain an embedded file: {node}")
+        self._ds: h5py.Dataset = ds
+        self._size: int = 0 if ds.shape is None else ds.dtype.itemsize
+        if ds.shape is not None and len(ds.shape) == 1:
+            self._size = ds.shape[0]
+        self._pos: int = 0
+        self._executor = executor
+
+        self._fobj: Optional[io.BufferedReader] = None
+        self._data: Optional[bytes] = None
+        if ds.dtype.kind in {"S", "O"}:
+            # plain bytes value (not packed as file), just read it
+            self._data = read_embedded_file(ds)
+            self._size = len(self._data)
+        elif self._size and (offset := self._direct_offset()) is not None:
+            # can read bytes directly from the HDF5 file
+            self._fobj = open(ds.file.filename, "rb")
+            self._offset = offset
+
+    def _direct_offset(self) -> Optional[int]:
+        """Return absolute offset of the dataset bytes in the file, if applicable."""
+        ds = self._ds
+        if ds.chunks is not None or ds.file.driver not in {"sec2", "stdio"}:
+            return None
+        if ds.file.mode != "r":
+            ds.file.flush()  # make sure the bytes are actually on disk
+        offset = ds.id.get_offset()
+        if offset is None:  # e.g. compact layout
+            return None
+        return offset  # NOTE: already includes the userblock size
+
+    # ----
+
+    @property
+    def size(self) -> int:
+        """Return size of the embedded file in bytes."""
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            new_pos = pos
+        elif whence == io.SEEK_CUR:
+            new_pos = self._pos + pos
+        elif whence == io.SEEK_END:
+            new_pos = self._size + pos
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if new_pos < 0:
+            raise ValueError(f"Negative seek position: {new_pos}")
+        self._pos = new_pos
+        return self._pos
+
+    def readinto(self, buf) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self._executor is not None:
+            return self._executor.submit(self._readinto, buf).result()
+        return self._readinto(buf)
+
+    def _readinto(self, buf) -> int:
+        n = max(0, min(len(buf), self._size - self._pos))
+        if not n:
+            return 0
+
+        if self._fobj is not None:
+            self._fobj.seek(self._offset + self._pos)
+            n = self._fobj.readinto(memoryview(buf)[:n])
+        elif self._ds.ndim == 1:
+            # only read (and decompress) the chunks containing the requested bytes
+            dest = np.frombuffer(memoryview(buf)[:n], dtype=np.uint8)
+            self._ds.read_direct(dest, np.s_[self._pos : self._pos + n])
+        else:
+            if self._data is None:
+                # fallback: need to read the complete dataset once
+                self._data = read_embedded_file(self._ds)
+            buf[:n] = self._data[self._pos : self._pos + n]
+
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        if self._fobj is not None:
+            self._fobj.close()
+            self._fobj = None
+        self._data = None
+        super().close()
+
+    # ----
+
+    def iter_chunks(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """Iterate over the bytes of the file in the given range in chunks."""
+        stop = self._size if stop is None else min(stop, self._size)
+        self.seek(start)
+        while self._pos < stop:
+            bs = self.read(min(chunk_size, stop - self._pos))
+            if not bs:
+                break
+            yield bs
+
+
+def read_embedded_file(node: Any) -> bytes:
+    """Return the complete contents of an embedded file."""
+    obj = node[()]
+    if isinstance(obj, np.ndarray) and obj.ndim == 1 and obj.dtype == np.uint8:
+        return obj.tobytes()
+    if isinstance(obj, np.void):
+        return obj.tobytes()
+    if isinstance(obj, h5py.Empty):
+        return b""
+    if isinstance(obj, bytes):
+        return obj
+    raise ValueError(f"Node does not contain an embedded file: {node}")
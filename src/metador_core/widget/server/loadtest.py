@@ -0,0 +1,175 @@
+"""Simple load test harness for the `WidgetServer` API.
+
+Measures the throughput (requests per second) of API endpoints, either
+in-process through the WSGI interface or against a running server via HTTP.
+
+Run `python -m metador_core.widget.server.loadtest --help` for usage.
+Without a server URL, a temporary container is created and the `index`,
+`download` and `script` endpoints of a local `WidgetServer` are measured.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from flask import Flask
+
+Getter = Callable[[str], int]
+"""Function performing a GET request for a path, returning the HTTP status code."""
+
+
+@dataclass
+class LoadTestResult:
+    """Measurement results for one endpoint."""
+
+    path: str
+    """Requested path."""
+
+    requests: int
+    """Number of performed requests."""
+
+    errors: int
+    """Number of requests that did not return a successful status code."""
+
+    seconds: float
+    """Total wall-clock time for all requests."""
+
+    latencies: List[float]
+    """Latencies of the individual requests (in seconds)."""
+
+    @property
+    def req_per_sec(self) -> float:
+        return self.requests / self.seconds if self.seconds else float("inf")
+
+    @property
+    def mean_latency(self) -> float:
+        return statistics.mean(self.latencies) if self.latencies else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.path}: {self.req_per_sec:.1f} req/s, "
+            f"{1000 * self.mean_latency:.2f} ms mean latency, "
+            f"{self.errors}/{self.requests} errors"
+        )
+
+
+def wsgi_getter(app: Flask) -> Getter:
+    """Return getter sending requests to a Flask app in-process."""
+    local = threading.local()
+
+    def get(path: str) -> int:
+        if (client := getattr(local, "client", None)) is None:
+            client = local.client = app.test_client()
+        res = client.get(path)
+        res.get_data()  # consume the complete response
+        return res.status_code
+
+    return get
+
+
+def http_getter(base_url: str) -> Getter:
+    """Return getter sending HTTP requests to a running server."""
+    base_url = base_url.rstrip("/")
+
+    def get(path: str) -> int:
+        try:
+            with urllib.request.urlopen(f"{base_url}{path}") as res:
+                while res.read(2**20):
+                    pass
+                return res.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    return get
+
+
+def run_loadtest(
+    get: Getter, paths: List[str], *, requests: int = 100, concurrency: int = 8
+) -> List[LoadTestResult]:
+    """Request each path the given number of times with concurrent clients."""
+
+    def timed_get(path: str):
+        start = time.perf_counter()
+        status = get(path)
+        return status, time.perf_counter() - start
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for path in paths:
+            start = time.perf_counter()
+            measured = list(pool.map(timed_get, [path] * requests))
+            seconds = time.perf_counter() - start
+            results.append(
+                LoadTestResult(
+                    path=path,
+                    requests=requests,
+                    errors=sum(1 for status, _ in measured if status >= 400),
+                    seconds=seconds,
+                    latencies=[lat for _, lat in measured],
+                )
+            )
+    return results
+
+
+def local_loadtest(
+    tmp_dir: Path, *, file_size: int = 2**20, **kwargs
+) -> List[LoadTestResult]:
+    """Measure `index`, `download` and `script` of a local WidgetServer.
+
+    Additional keyword arguments are passed to `run_loadtest`.
+    """
+    from ...container import MetadorContainer
+    from ...container.provider import PooledContainerProvider
+    from ...packer.utils import pack_file
+    from . import WidgetServer
+
+    file_path = tmp_dir / "file.bin"
+    file_path.write_bytes(os.urandom(file_size))
+    with MetadorContainer(tmp_dir / "container.h5", "w") as m:
+        pack_file(m, file_path)
+        provider = PooledContainerProvider[str]()
+        provider["test"] = m
+
+    widget_server = WidgetServer(provider, bokeh_endpoint="http://localhost:5006")
+    paths = [
+        "/",
+        "/file/test/file.bin",
+        "/widget/metador.widget.core.file.text.0.1.0/test/file.bin",
+    ]
+    try:
+        return run_loadtest(wsgi_getter(widget_server.make_flask_app()), paths, **kwargs)
+    finally:
+        provider.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="API paths to request")
+    parser.add_argument("--url", help="Base URL of a running widget server API")
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    opts: Dict[str, int] = dict(requests=args.requests, concurrency=args.concurrency)
+
+    if args.url:
+        results = run_loadtest(http_getter(args.url), args.paths or ["/"], **opts)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = local_loadtest(Path(tmp_dir), **opts)
+
+    for result in results:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
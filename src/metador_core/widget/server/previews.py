@@ -0,0 +1,217 @@
+"""Preview images (thumbnails and poster frames) of embedded files.
+
+Previews are identified by the `sha256` hashsum from the `core.file` metadata
+of a file and the preview size, so they never become stale and can be shared
+across containers, processes and server restarts. They are stored in a bounded
+on-disk cache (see `PreviewCache`).
+
+Previews of images are created with Pillow. Previews of PDF documents and videos
+need the `pdftoppm` (poppler) and `ffmpeg` command line tools, respectively.
+If a tool is not installed, no previews are available for the affected file types.
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import subprocess  # nosec
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import IO, Callable, Dict, Iterator, Optional, Tuple
+
+from ...container import MetadorNode
+from .files import EmbeddedFile
+
+MIN_PREVIEW_SIZE: int = 64
+"""Smallest size of generated previews (in pixels)."""
+
+MAX_PREVIEW_SIZE: int = 2048
+"""Largest size of generated previews (in pixels)."""
+
+PreviewFunc = Callable[[IO[bytes], int], Optional[bytes]]
+"""Function taking a file object and maximal size, returning an encoded preview."""
+
+
+def preview_size(size: int) -> int:
+    """Return size of the preview to use for the requested size.
+
+    Sizes are rounded up to the next power of two (and clamped to the limits),
+    so that only few previews are stored for each file.
+    """
+    size = min(max(size, MIN_PREVIEW_SIZE), MAX_PREVIEW_SIZE)
+    return 1 << (size - 1).bit_length()
+
+
+@lru_cache(maxsize=None)
+def _tool(name: str) -> Optional[str]:
+    """Return path of an external program (if installed)."""
+    return shutil.which(name)
+
+
+def _run_tool(args, **kwargs) -> Optional[bytes]:
+    try:
+        res = subprocess.run(args, capture_output=True, check=True, **kwargs)  # nosec
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return res.stdout or None
+
+
+def image_preview(file: IO[bytes], size: int) -> Optional[bytes]:
+    """Return thumbnail of an image."""
+    from .data import thumbnail  # NOTE: imported here to load PIL only if needed
+
+    return thumbnail(file, size)[0]
+
+
+@contextmanager
+def _temp_copy(file: IO[bytes], suffix: str) -> Iterator[str]:
+    """Copy file in blocks into a temporary file and yield its path."""
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        shutil.copyfileobj(file, tmp, 2**20)
+        tmp.flush()
+        yield tmp.name
+
+
+def pdf_preview(file: IO[bytes], size: int) -> Optional[bytes]:
+    """Return rendered first page of a PDF document (needs `pdftoppm`)."""
+    if (exe := _tool("pdftoppm")) is None:
+        return None
+    args = [exe, "-png", "-f", "1", "-l", "1", "-scale-to", str(size), "-singlefile"]
+    # NOTE: PDFs are not streamable (cross-reference table at the end)
+    with _temp_copy(file, ".pdf") as path:
+        return _run_tool(args + [path])
+
+
+def video_preview(file: IO[bytes], size: int) -> Optional[bytes]:
+    """Return representative frame from the beginning of a video (needs `ffmpeg`)."""
+    if (exe := _tool("ffmpeg")) is None:
+        return None
+    # NOTE: videos are not necessarily streamable (e.g. MP4 index at the end)
+    with _temp_copy(file, ".video") as path:
+        scale = f"scale={size}:{size}:force_original_aspect_ratio=decrease"
+        args = [exe, "-v", "error", "-i", path, "-frames:v", "1"]
+        args += ["-vf", f"thumbnail,{scale}", "-f", "image2pipe", "-vcodec", "mjpeg"]
+        return _run_tool(args + ["-"])
+
+
+PREVIEWS: Dict[str, Tuple[str, Optional[str], PreviewFunc]] = {
+    "image/jpeg": ("image/jpeg", None, image_preview),
+    "image/png": ("image/png", None, image_preview),
+    "image/gif": ("image/png", None, image_preview),
+    "application/pdf": ("image/png", "pdftoppm", pdf_preview),
+    "video/mp4": ("image/jpeg", "ffmpeg", video_preview),
+    "video/ogg": ("image/jpeg", "ffmpeg", video_preview),
+    "video/webm": ("image/jpeg", "ffmpeg", video_preview),
+}
+"""Supported MIME types with preview MIME type, needed tool and preview function."""
+
+_EXTS = {"image/jpeg": "jpg", "image/png": "png"}
+
+
+def supports_preview(mimetype: str) -> bool:
+    """Return whether previews can be created for files of given MIME type."""
+    if (entry := PREVIEWS.get(mimetype)) is None:
+        return False
+    return entry[1] is None or _tool(entry[1]) is not None
+
+
+class PreviewCache:
+    """Bounded on-disk cache of file previews.
+
+    Previews are stored as files named by the hashsum of the original file and
+    the preview size. If the total size of the cache exceeds the limit,
+    the least recently used previews are removed.
+
+    The same directory can be used by multiple processes.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, *, max_bytes: int = 2**28):
+        """Create a preview cache.
+
+        Args:
+            directory: Directory for the previews (if not set, a temporary one is used)
+            max_bytes: Maximal total size of stored previews
+        """
+        if directory is None:
+            directory = Path(tempfile.mkdtemp(prefix="metador-previews-"))
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    def _entries(self):
+        return (p for p in self.directory.iterdir() if not p.name.startswith("."))
+
+    def _path(self, sha256: str, size: int, mimetype: str) -> Path:
+        return self.directory / f"{sha256}-{size}.{_EXTS[mimetype]}"
+
+    def get(self, node: MetadorNode, size: int) -> Optional[Tuple[bytes, str]]:
+        """Return preview of an embedded file and its MIME type (if available).
+
+        The size is adjusted with `preview_size`. The preview is created,
+        if it is not in the cache yet.
+        """
+        filemeta = node.meta.get("core.file")
+        if not filemeta or not filemeta.sha256:
+            return None
+        if not supports_preview(mimetype := filemeta.encodingFormat):
+            return None
+        preview_mime, _, make_preview = PREVIEWS[mimetype]
+
+        path = self._path(filemeta.sha256, preview_size(size), preview_mime)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+            return data, preview_mime
+        except FileNotFoundError:
+            pass
+
+        try:
+            with EmbeddedFile(node) as f:
+                data = make_preview(io.BufferedReader(f, 2**20), preview_size(size))
+        except (OSError, ValueError):  # PIL raises OSError for broken files
+            data = None
+        if data is None:
+            return None
+        self._store(path, data)
+        return data, preview_mime
+
+    def _store(self, path: Path, data: bytes) -> None:
+        # write to a hidden temporary file first, to not expose incomplete files
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used previews until the cache is within its limit."""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:  # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        self._size = sum(e[1] for e in entries)
+        for _, size, p in entries:
+            if self._size <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            self._size -= size
+
+    def clear(self) -> None:
+        """Remove all stored previews."""
+        with self._lock:
+            for p in self._entries():
+                p.unlink(missing_ok=True)
+            self._size = 0
@@ -1,13 +1,20 @@
+import json
+
+import h5py
 import pytest
 
-from metador_core.container import MetadorContainer
-from metador_core.container.drivers import get_driver_type
+from metador_core.container import MetadorContainer, MetadorMeta
+from metador_core.container import utils as M
+from metador_core.container.drivers import get_driver_type, is_open
 from metador_core.container.utils import METADOR_VERSION_PATH
 from metador_core.container.wrappers import (
+    MetadorDataset,
     NodeAcl,
+    NodeHandle,
     UnsupportedOperationError,
     WrappedAttributeManager,
 )
+from metador_core.ih5.overlay import IH5Dataset, IH5Group
 
 
 @pytest.fixture
@@ -411,3 +418,325 @@ def test_group_operations_metadata_correct(tmp_mc_path, mc_driver, bibmeta_examp
         # no metadata node links in TOC or container should be left
         assert len(m.metador._links.find_missing(m["/"])) == 0
         assert len(m.metador._links.find_broken()) == 0
+
+
+def test_toc_links_relink_by_prefix(tmp_mc_path, mc_driver, bibmeta_example):
+    """Check that moved and copied metadata is relinked by prefix."""
+    meta = bibmeta_example
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        m["foo/bar"] = [1, 2, 3]
+        m["foo/bar"].meta["core.bib"] = meta
+        m["foo"].meta["core.bib"] = meta
+        m["foobar"] = [4, 5, 6]
+        m["foobar"].meta["core.bib"] = meta
+        links = m.metador._links
+
+        # prefix must match on full path segments
+        assert len(links.find_below("/foo")) == 2
+        assert len(links.find_below("/foo/metador_meta_bar")) == 1
+        assert len(links.find_below("/foobar")) == 0
+
+        m.move("foo", "qux")
+        below = links.find_below("/qux")
+        assert len(below) == 2
+        assert all(links.resolve(uuid) in m.__wrapped__ for uuid in below)
+        assert len(links.find_below("/foo")) == 0
+
+        m.copy("qux", "blub")
+        copied = links.find_below("/blub")
+        assert len(copied) == 2
+        assert not set(copied).intersection(below)  # fresh UUIDs
+        assert all(links.resolve(uuid) in m.__wrapped__ for uuid in copied)
+        assert m.fsck().ok
+
+        # objects not listed in the TOC are left for fsck
+        m.__wrapped__.copy("qux/metador_meta_bar", "qux/metador_meta_baz")
+        m["qux/baz"] = [1, 2, 3]
+        m.copy("qux", "copy")
+        assert len(links.find_below("/copy")) == 2
+        assert len(m.fsck().collisions) == 2
+        m.fsck(repair=True)
+        assert len(links.find_below("/copy")) == 3
+
+
+def test_toc_links_relink_large_subtree(
+    tmp_mc_path, mc_driver, bibmeta_example, monkeypatch
+):
+    """Check that move and copy do not visit nodes without metadata."""
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        for i in range(50):
+            m[f"foo/grp{i}/data"] = [i]
+        m["foo/grp0/data"].meta["core.bib"] = bibmeta_example
+        m["foo"].meta["core.bib"] = bibmeta_example
+
+        links, raw = m.metador._links, m.__wrapped__
+        links.find_below("/")  # resolve links in advance
+
+        visited = []
+        for cls in (h5py.Group, IH5Group):
+            for method in ("items", "values", "keys"):
+                orig = getattr(cls, method)
+
+                def recording(self, *args, orig=orig, **kwargs):
+                    visited.append(self.name)
+                    return orig(self, *args, **kwargs)
+
+                monkeypatch.setattr(cls, method, recording)
+
+            def recording_visititems(self, func, orig=cls.visititems):
+                def wrapped_func(name, node):
+                    visited.append(node.name)
+                    return func(name, node)
+
+                return orig(self, wrapped_func)
+
+            monkeypatch.setattr(cls, "visititems", recording_visititems)
+
+        # NOTE: the driver itself may visit nodes to move or copy them (e.g. IH5)
+        raw.move("foo", "bar")
+        visited.clear()
+        links.relink_moved("/foo", "/bar")
+        raw.copy("bar", "baz")
+        visited.clear()
+        links.relink_copied("/bar", "/baz")
+        monkeypatch.undo()
+        # groups without metadata objects below them are not accessed
+        data_groups = {f"/{p}/grp{i}" for p in ("bar", "baz") for i in range(1, 50)}
+        assert not data_groups.intersection(visited)
+
+        assert len(m.metador._links.find_below("/baz")) == 2
+        assert m.fsck().ok
+
+
+def test_toc_export(tmp_mc_path, mc_driver, bibmeta_example, monkeypatch):
+    """Check that selected fields can be exported based on the TOC."""
+    meta = bibmeta_example
+    meta2 = meta.copy(update=dict(name="Dataset2", abstract=None))
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        m["foo/bar"] = [1, 2, 3]
+        m["foo/bar"].meta["core.bib"] = meta
+        m["foo/qux"] = [4, 5, 6]
+        m["foo/qux"].meta["core.dir"] = meta2
+        m["foo/qux"].meta["core.bib"] = meta  # core.dir instance is preferred
+
+        assert len(m.metador.export("not_existing", fields=["name"])) == 0
+
+        # only metadata objects are read, neither data nor metadata wrappers
+        read = []
+        for cls in (h5py.Dataset, IH5Dataset):
+            getitem = cls.__getitem__
+
+            def recording_getitem(self, *args, getitem=getitem):
+                read.append(self.name)
+                return getitem(self, *args)
+
+            monkeypatch.setattr(cls, "__getitem__", recording_getitem)
+
+        def no_meta(*args, **kwargs):
+            raise AssertionError("metadata wrapper must not be used")
+
+        monkeypatch.setattr(MetadorMeta, "__init__", no_meta)
+
+        ret = m.metador.export("core.bib", fields=["name", "author.name"])
+        assert read and not {"/foo/bar", "/foo/qux"}.intersection(read)
+        monkeypatch.undo()
+
+        assert ret.paths == ["/foo/bar", "/foo/qux"]
+        assert ret.columns["name"] == ["Dataset1", "Dataset1"]
+        assert ret.columns["author.name"] == [None, None]  # author is a list
+
+        ret = m.metador.export("core.dir", fields=["name", "abstract", "id_"])
+        assert ret.paths == ["/foo/qux", "/foo/bar"]
+        assert ret.columns["name"] == ["Dataset2", "Dataset1"]
+        assert ret.columns["abstract"] == [None, meta.abstract]
+        assert ret.columns["id_"] == [None, None]
+
+        arr = ret.to_numpy()
+        assert arr.shape == (2,)
+        assert list(arr.dtype.names) == ["path", "name", "abstract", "id_"]
+        assert arr["name"][0] == "Dataset2"
+        assert arr["abstract"].dtype == object
+
+
+def test_group_walk(tmp_mc_path, mc_driver, bibmeta_example):
+    """Check that walk agrees with visititems."""
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        m["foo/bar"] = [1, 2, 3]
+        m["foo/bar"].meta["core.bib"] = bibmeta_example
+        m["foo/baz/qux"] = [4, 5, 6]
+        m["foo"].meta["core.bib"] = bibmeta_example
+        m["blub"] = [7, 8, 9]
+
+        visited = []
+        m.visititems(lambda name, node: visited.append((name, node.name)))
+        walked = [(name, node.name) for name, node in m.walk()]
+        assert walked == visited
+
+        # walk produces handles, not node wrappers
+        handles = dict(m.walk())
+        assert all(isinstance(h, NodeHandle) for h in handles.values())
+        assert handles["foo"].is_group and not handles["foo/bar"].is_group
+        assert isinstance(handles["foo/bar"].node(), MetadorDataset)
+        assert "core.bib" in handles["foo/bar"].meta
+        assert ("foo/baz/qux", "/foo/baz/qux") in walked
+        assert [name for name, _ in m["foo"].walk()] == ["bar", "baz", "baz/qux"]
+
+
+def test_container_frozen(tmp_mc_path, mc_driver, bibmeta_example):
+    """Check that a frozen container provides the usual interface for reading."""
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        m["foo/bar"] = [1, 2, 3]
+        m["foo/bar"].meta["core.bib"] = bibmeta_example
+        m["foo/qux"] = [4, 5, 6]
+        assert not m.frozen
+        c_src = m.metador.source
+
+        with pytest.raises(ValueError):
+            MetadorContainer(m.__wrapped__, frozen=True)  # not read-only
+        assert is_open(m.__wrapped__)  # passed object is not closed
+
+    opened = []
+
+    class RecordingDriver(drv_cls):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    with pytest.raises(ValueError):
+        MetadorContainer(c_src, "r+", driver=RecordingDriver, frozen=True)
+    assert len(opened) == 1 and not is_open(opened[0])  # opened one is closed
+
+    with MetadorContainer(c_src, "r", driver=drv_cls, frozen=True) as m:
+        assert m.frozen
+        assert m.acl[NodeAcl.read_only]
+        assert m["foo/bar"].acl[NodeAcl.read_only]
+
+        # reading works as usual
+        assert list(m["foo/bar"][()]) == [1, 2, 3]
+        assert m["foo/bar"].meta["core.bib"].name == bibmeta_example.name
+        assert len(m["foo/qux"].meta) == 0
+        assert [n.name for n in m.metador.query("core.dir")] == ["/foo/bar"]
+
+        # repeated access uses cached metadata infos
+        assert m["foo/bar"].meta.get("core.bib") == m["foo/bar"].meta.get("core.bib")
+        assert len(m._self_meta_cache) > 0
+
+        # writing is not possible
+        with pytest.raises(UnsupportedOperationError):
+            m["foo/baz"] = 123
+        with pytest.raises(UnsupportedOperationError):
+            m["foo/qux"].meta["core.bib"] = bibmeta_example
+
+
+def test_toc_schemas_register_many(
+    tmp_mc_path, mc_driver, schemas, plugingroups_test, monkeypatch
+):
+    """Check that batched schema registration stores the same infos in containers."""
+    from metador_core.container.interface import (
+        TOCPackages,
+        _schema_info,
+        _schema_info_for,
+    )
+
+    refs = [schemas["core.bib"].Plugin.ref(), schemas["core.dir"].Plugin.ref()]
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        registered = []
+        orig_register = TOCPackages._register
+
+        def register(self, pkg, info):
+            registered.append(pkg)
+            return orig_register(self, pkg, info)
+
+        monkeypatch.setattr(TOCPackages, "_register", register)
+        m.metador.schemas._register_many(refs + refs)
+        monkeypatch.undo()
+        # the package providing both schemas is stored once
+        assert len(registered) == 1
+        assert m.metador.schemas.keys() == set(refs)
+        assert len(m.metador.schemas.packages) == 1
+        for ref in refs:
+            info = _schema_info_for(ref)
+            assert m.metador.schemas[ref] == json.loads(info.jsonschema)
+            assert m.metador.schemas.parent_path(ref) == list(info.parents)
+        # repeated registration is a no-op
+        m.metador.schemas._register_many(refs)
+        assert len(m.metador.schemas) == 2
+
+    # cached infos are not used after the plugin groups were reset
+    info = _schema_info_for(refs[0])
+    assert _schema_info_for(refs[0]) is info
+    plugingroups_test.__reset__()
+    assert _schema_info_for(refs[0]) is not info
+    # stale infos are dropped and the cache is bounded
+    assert _schema_info.cache_info().currsize == 1
+    assert _schema_info.cache_info().maxsize is not None
+
+
+def test_container_fsck(tmp_mc_path, mc_driver, bibmeta_example):
+    """Check that inconsistencies between TOC and metadata objects are repaired."""
+    meta = bibmeta_example
+    drv_cls = mc_driver.value
+    with MetadorContainer(tmp_mc_path, "w", driver=drv_cls) as m:
+        m["foo/bar"] = [1, 2, 3]
+        m["foo/bar"].meta["core.bib"] = meta
+        m["foo/qux"] = [4, 5, 6]
+        m["foo/qux"].meta["core.dir"] = meta
+        m["foo"].meta["core.bib"] = meta
+        assert m.fsck().ok
+
+        raw = m.__wrapped__
+        links = m.metador._links
+        # move metadata object without updating TOC
+        raw.move("foo/metador_meta_bar", "foo/metador_meta_baz")
+        raw["foo/baz"] = [1, 2, 3]
+        # copy metadata object without updating TOC (-> uuid collision)
+        raw.create_group("foo/blub")
+        raw.copy("foo/metador_meta_", "foo/blub/metador_meta_")
+        # remove metadata object without updating TOC (-> broken, unused schema)
+        (dir_uuid,) = links.find_below("/foo/metador_meta_qux").keys()
+        del raw["foo/metador_meta_qux"]
+        # remove link from TOC (-> missing)
+        (grp_uuid,) = links.find_below("/foo/metador_meta_").keys()
+        del raw[links._toc_path[grp_uuid]]
+        del links._toc_path[grp_uuid]
+        links._drop_target(grp_uuid)
+
+        res = m.fsck()
+        assert not res.ok
+        assert res.broken == [dir_uuid]
+        assert len(res.moved) == 1
+        assert list(res.moved.values())[0].startswith("/foo/metador_meta_baz/")
+        assert len(res.missing) == 1 and len(res.collisions) == 1
+        # (sorted by path, so the copy is found first)
+        assert res.missing[0].startswith("/foo/blub/metador_meta_/")
+        assert res.collisions[0].startswith("/foo/metador_meta_/")
+        assert [ref.name for ref in res.orphan_schemas] == ["core.dir"]
+        assert res.orphan_packages == []
+
+        m.fsck(repair=True)
+        assert m.fsck().ok
+        assert len(links.find_missing(m["/"])) == 0
+        assert len(links.find_broken()) == 0
+        assert len(m.metador.schemas) == 1
+        expected = {"/foo", "/foo/baz", "/foo/blub"}
+        assert {n.name for n in m.metador.query("core.bib")} == expected
+        assert m["foo/baz"].meta["core.bib"].name == meta.name
+
+        # remove everything behind the back of the TOC
+        del raw["foo"]
+        m.fsck(repair=True)
+        assert m.fsck().ok
+        assert len(m.metador.schemas) == 0
+        assert len(m.metador.schemas.packages) == 0
+        assert M.METADOR_LINKS_PATH not in raw
+
+    with MetadorContainer(tmp_mc_path, "r", driver=drv_cls) as m:
+        assert m.fsck().ok
+        with pytest.raises(UnsupportedOperationError):
+            MetadorContainer(m.__wrapped__, frozen=True).fsck(repair=True)
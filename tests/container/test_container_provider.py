@@ -1,7 +1,15 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from metador_core.container import MetadorContainer
-from metador_core.container.provider import SimpleContainerProvider
+from metador_core.container.drivers import is_open
+from metador_core.container.provider import (
+    PooledContainerProvider,
+    SimpleContainerProvider,
+)
 
 
 def test_simple_container_provider(tmp_ds_path):
@@ -29,3 +37,204 @@ def test_simple_container_provider(tmp_ds_path):
     # remove
     del scp["test"]
     assert "test" not in scp
+
+
+def test_pooled_container_provider(tmp_mc_path, mc_driver):
+    drv_cls = mc_driver.value
+    pcp = PooledContainerProvider(max_open=2, ttl=None)
+    assert pcp.get("test") is None
+    with pcp.lease("test") as m:
+        assert m is None
+
+    tmp_mc_path.mkdir()
+    for i in range(3):
+        with MetadorContainer(tmp_mc_path / f"c{i}", "w", driver=drv_cls) as m:
+            m["hello"] = f"world{i}".encode("utf-8")
+            pcp[f"c{i}"] = m
+
+    # containers are opened on demand and reused
+    assert pcp.num_open == 0
+    assert pcp["c0"]["hello"][()] == b"world0"
+    assert pcp["c0"] is pcp["c0"]
+    assert pcp.stats.misses == 1 and pcp.stats.hits == 2
+    assert pcp.num_open == 1
+    assert pcp.num_files >= 1
+
+    # least recently used container is evicted, unless it is leased
+    with pcp.lease("c0") as m0:
+        pcp["c1"]
+        pcp["c2"]
+        assert pcp.num_open == 2
+        assert pcp.stats.evictions == 1
+        assert m0["hello"][()] == b"world0"  # c1 was evicted instead
+    assert ("c1", None) not in pcp._pool
+
+    # container closed from outside is reopened
+    pcp["c2"].close()
+    assert pcp["c2"]["hello"][()] == b"world2"
+
+    # limit on open files
+    pcp2 = PooledContainerProvider(max_files=1, ttl=None)
+    for i in range(3):
+        pcp2[f"c{i}"] = pcp._known[f"c{i}"]
+        assert pcp2[f"c{i}"]["hello"][()] == f"world{i}".encode("utf-8")
+    assert pcp2.num_open == 1
+    assert pcp2.stats.evictions == 2
+
+    # unused containers are closed after TTL
+    pcp3 = PooledContainerProvider(ttl=0)
+    pcp3["c0"] = pcp._known["c0"]
+    m = pcp3["c0"]
+    time.sleep(0.01)
+    pcp3.close_idle()
+    assert pcp3.num_open == 0
+    assert pcp3.stats.expirations == 1
+    assert not is_open(m.__wrapped__)
+
+    # containers opened by a parent process are not used after forking
+    m = pcp["c0"]
+    pcp._pid = -1  # pretend we are in a forked process
+    assert pcp["c0"] is not m
+    assert pcp.num_open == 1 and pcp.stats.misses == 1
+    m.close()
+
+    # leased container removed from the provider is closed when it is returned
+    with pcp.lease("c1") as m1:
+        del pcp["c1"]
+        assert m1["hello"][()] == b"world1"
+    assert not is_open(m1.__wrapped__)
+
+    for p in (pcp, pcp2, pcp3):
+        p.close_all()
+        assert p.num_open == 0
+    del pcp["c0"]
+    assert "c0" not in pcp
+
+
+def test_pooled_container_provider_per_thread(tmp_mc_path, mc_driver):
+    tmp_mc_path.mkdir()
+    pcp = PooledContainerProvider(per_thread=True, ttl=None)
+    with MetadorContainer(tmp_mc_path / "c", "w", driver=mc_driver.value) as m:
+        m["hello"] = b"world"
+        pcp["c"] = m
+
+    barrier = threading.Barrier(4)
+
+    def read(_):
+        m = pcp["c"]
+        assert pcp["c"] is m  # handle is reused within a thread
+        barrier.wait()  # all threads hold their handles at the same time
+        return id(m.__wrapped__), m["hello"][()]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(read, range(4)))
+    assert len({h for h, _ in results}) == 4  # one handle per thread
+    assert all(data == b"world" for _, data in results)
+    assert pcp.num_open == 4
+
+    # handles of terminated threads are closed
+    assert pcp["c"]["hello"][()] == b"world"
+    assert pcp.num_open == 1
+
+    # replacing the container closes all handles
+    pcp["c"] = pcp._known["c"]
+    assert pcp.num_open == 0
+
+
+def test_pooled_container_provider_thread_confined(tmp_mc_path, mc_driver):
+    tmp_mc_path.mkdir()
+    pcp = PooledContainerProvider(per_thread=True, max_open=1, ttl=None)
+    for name in ["a", "b"]:
+        with MetadorContainer(tmp_mc_path / name, "w", driver=mc_driver.value) as m:
+            m["hello"] = name.encode("utf-8")
+            pcp[name] = m
+
+    got, evicted = threading.Event(), threading.Event()
+
+    def read():
+        m = pcp["a"]
+        pcp.close_idle()  # returns the lease taken by get
+        got.set()
+        evicted.wait()
+        data = m["hello"][()]  # evicted by other thread, but still open
+        pcp.close_idle()  # next access of the pool by this thread closes it
+        return m, data
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        fut = pool.submit(read)
+        got.wait()
+        # evicts the handle of the other thread and waits until it is closed
+        fut_b = pool.submit(lambda: pcp["b"]["hello"][()])
+        while not pcp.stats.evictions:
+            time.sleep(0.01)
+        assert not fut_b.done()
+        evicted.set()
+        m, data = fut.result()
+        assert fut_b.result() == b"b"
+    assert data == b"a"
+    assert not is_open(m.__wrapped__)
+
+    pcp.close_all()
+    assert pcp.num_open == 0 and not pcp._closing
+
+
+def test_pooled_container_provider_get_lease(tmp_mc_path, mc_driver):
+    tmp_mc_path.mkdir()
+    pcp = PooledContainerProvider(max_open=2, ttl=None)
+    for name in ["a", "b", "c"]:
+        with MetadorContainer(tmp_mc_path / name, "w", driver=mc_driver.value) as m:
+            m["hello"] = name.encode("utf-8")
+            pcp[name] = m
+
+    # container returned by get is not evicted until the next access of the thread
+    m = pcp.get("a")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        fut = pool.submit(lambda: [pcp.get(k)["hello"][()] for k in ["b", "c"]])
+        assert fut.result() == [b"b", b"c"]
+    assert pcp.stats.evictions == 1  # b was evicted instead
+    assert m["hello"][()] == b"a"
+    pcp.get("b")
+    assert not is_open(m.__wrapped__) and pcp.stats.evictions == 2
+
+    # lease of a terminated thread is returned
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        m = pool.submit(pcp.get, "a").result()
+    assert is_open(m.__wrapped__)
+    pcp.close_all()
+    assert pcp.num_open == 0 and not is_open(m.__wrapped__)
+
+
+def test_pooled_container_provider_limits(tmp_mc_path, mc_driver):
+    tmp_mc_path.mkdir()
+    pcp = PooledContainerProvider(max_open=1, ttl=None, timeout=0.1)
+    for name in ["a", "b"]:
+        with MetadorContainer(tmp_mc_path / name, "w", driver=mc_driver.value) as m:
+            m["hello"] = name.encode("utf-8")
+            pcp[name] = m
+
+    known = dict(pcp._known)
+
+    # pool is full and the container is not returned in time
+    with pcp.lease("a"):
+        with pytest.raises(RuntimeError):
+            pcp.get("b")
+        # removed container that is still in use counts toward the limit
+        del pcp["a"]
+        assert pcp.num_open == 0 and len(pcp._closing) == 1
+        with pytest.raises(RuntimeError):
+            pcp.get("b")
+
+    # request waits until a container is returned
+    pcp2 = PooledContainerProvider(max_open=1, ttl=None, timeout=5)
+    pcp2["a"], pcp2["b"] = known["a"], known["b"]
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with pcp2.lease("a") as m:
+            fut = pool.submit(lambda: pcp2["b"]["hello"][()])
+            time.sleep(0.05)
+            assert not fut.done()
+        assert fut.result() == b"b"
+    assert not is_open(m.__wrapped__)
+
+    for p in (pcp, pcp2):
+        p.close_all()
+        assert p.num_open == 0 and not p._closing
@@ -2,6 +2,7 @@
 from pathlib import Path
 from uuid import uuid1
 
+import h5py
 import pytest
 
 from metador_core.ih5.manifest import IH5Manifest, IH5MFRecord, IH5UBExtManifest
@@ -146,6 +147,25 @@ def test_create_stub_from_mf_and_patch(tmp_ds_path_factory):
         assert ds["qux"][()] == b"patch"
 
 
+def test_create_stub_with_data(tmp_ds_path_factory):
+    ds1 = tmp_ds_path_factory()
+    with IH5MFRecord(ds1, "w") as ds:
+        ds["foo/bar"] = "hello"
+        ds["foo/baz"] = "world"
+        ds.commit_patch(manifest_exts={"test_ext": "yeah!"})
+        mf = latest_manifest_filepath(ds)
+
+    with pytest.raises(ValueError, match="no dataset"):
+        IH5MFRecord.create_stub(tmp_ds_path_factory(), mf, data={"/foo": "x"})
+
+    # selected datasets are filled, manifest extensions are inherited
+    data = {"/foo/bar": "hi"}
+    with IH5MFRecord.create_stub(tmp_ds_path_factory(), mf, data=data) as stub:
+        assert stub["foo/bar"][()] == b"hi"
+        assert stub["foo/baz"][()] == h5py.Empty(None)
+        assert stub.manifest.manifest_exts == {"test_ext": "yeah!"}
+
+
 def test_merge_stub_fail(tmp_ds_path_factory):
     # Merging with a stub container fails
     ds_path = tmp_ds_path_factory()
@@ -0,0 +1,85 @@
+"""Test embedding files with pack_file."""
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from metador_core.container import MetadorContainer
+from metador_core.container.drivers import MetadorDriverEnum, get_raw_dataset
+from metador_core.harvester import harvest
+from metador_core.packer import utils
+from metador_core.packer.utils import FileMeta, pack_file
+from metador_core.plugins import harvesters
+from metador_core.widget.server.files import EmbeddedFile, read_embedded_file
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("driver", list(iter(MetadorDriverEnum)))
+def test_pack_file_stream(tmp_ds_path, driver, monkeypatch, compression):
+    monkeypatch.setattr(utils, "STREAM_BLOCK_SIZE", 1000)
+    tmp_ds_path.mkdir()
+    data = b"hello world!\n" * 1000 + os.urandom(5000)
+    (tmp_ds_path / "file.txt").write_bytes(data)
+    (tmp_ds_path / "empty").write_bytes(b"")
+
+    with MetadorContainer(tmp_ds_path / "c", "w", driver=driver.value) as m:
+        plain = pack_file(m, tmp_ds_path / "file.txt", target="plain")
+
+        # the file is read only once
+        opened = []
+        builtin_open = open
+
+        def counting_open(file, *args, **kwargs):
+            opened.append(str(file))
+            return builtin_open(file, *args, **kwargs)
+
+        monkeypatch.setattr("builtins.open", counting_open)
+        ds = pack_file(
+            m, tmp_ds_path / "file.txt", stream=True, compression=compression
+        )
+        monkeypatch.setattr("builtins.open", builtin_open)
+        assert opened == [str(tmp_ds_path / "file.txt")]
+        empty = pack_file(m, tmp_ds_path / "empty", stream=True)
+
+        # metadata computed while copying is the same as the harvested one
+        hv_file = harvesters["core.file.generic"]
+        harvested = harvest(FileMeta, [hv_file(filepath=tmp_ds_path / "file.txt")])
+        meta = ds.meta["core.file"]
+        assert meta.dict(exclude={"id_"}) == harvested.dict(exclude={"id_"})
+        assert plain.meta["core.file"].dict(exclude={"id_"}) == harvested.dict(
+            exclude={"id_"}
+        )
+        hv_empty = harvesters["core.file.generic"](filepath=tmp_ds_path / "empty")
+        assert empty.meta["core.file"].encodingFormat == harvest(
+            FileMeta, [hv_empty]
+        ).encodingFormat
+        assert meta.id_ == "./file.txt"
+
+        raw = get_raw_dataset(ds)
+        assert raw.shape == (len(data),) and raw.dtype == np.uint8
+        assert raw.compression == compression
+        assert (raw.chunks is not None) == bool(compression)
+        assert isinstance(empty[()], h5py.Empty)
+
+    with MetadorContainer(tmp_ds_path / "c", "r", driver=driver.value) as m:
+        assert read_embedded_file(m["file.txt"]) == data
+        with EmbeddedFile(m["file.txt"]) as f:
+            assert f.size == len(data)
+            assert (f._fobj is None) == bool(compression)
+            f.seek(12_990)
+            assert f.read(20) == data[12_990:13_010]
+            f.seek(0)
+            assert f.read() == data
+
+
+def test_pack_file_stream_default(tmp_ds_path, monkeypatch):
+    monkeypatch.setattr(utils, "STREAM_MIN_SIZE", 10)
+    tmp_ds_path.mkdir()
+    (tmp_ds_path / "small").write_bytes(b"small")
+    (tmp_ds_path / "large").write_bytes(b"large file")
+    with MetadorContainer(tmp_ds_path / "c", "w") as m:
+        assert pack_file(m, tmp_ds_path / "small").shape == ()
+        assert pack_file(m, tmp_ds_path / "large").shape == (10,)
+        ds = pack_file(m, tmp_ds_path / "small", target="gz", compression="gzip")
+        assert ds.shape == (5,)
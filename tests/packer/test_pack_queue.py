@@ -0,0 +1,93 @@
+"""Test parallel preparation of packed data."""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import h5py
+import numpy as np
+import pytest
+
+from metador_core.container import MetadorContainer
+from metador_core.packer.parallel import PackQueue
+from metador_core.packer.utils import pack_file, prepare_file
+
+
+def _prepare(i: int):
+    return np.arange(i * 1000) % 7
+
+
+def _fail(i: int):
+    raise ValueError(f"failed {i}")
+
+
+def _untimed_file(path):
+    # HDF5 stores modification times of objects, which must be disabled
+    # for byte-identical files (h5py only supports this for datasets)
+    fcpl = h5py.h5p.create(h5py.h5p.FILE_CREATE)
+    fcpl.set_obj_track_times(False)
+    fcpl.set_link_creation_order(h5py.h5p.CRT_ORDER_TRACKED)
+    return h5py.File(h5py.h5f.create(bytes(path), h5py.h5f.ACC_TRUNC, fcpl=fcpl))
+
+
+def _create_untimed_dataset(f, name: str, data):
+    f.create_dataset(name, data=data, track_times=False)
+
+
+def _create_untimed_group(f, name: str):
+    gcpl = h5py.h5p.create(h5py.h5p.GROUP_CREATE)
+    gcpl.set_obj_track_times(False)
+    h5py.h5g.create(f.id, name.encode("utf-8"), gcpl=gcpl)
+
+
+def _pack(path, q: PackQueue):
+    with _untimed_file(path) as f:
+        for i in range(20):
+            q.submit(_prepare, i, write=partial(_create_untimed_dataset, f, f"d{i}"))
+            if i % 5 == 0:
+                q.write(_create_untimed_group, f, f"g{i}")
+        q.close()
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_pack_queue_deterministic(tmp_path, workers):
+    with PackQueue(0) as q:
+        _pack(tmp_path / "serial.h5", q)
+    with PackQueue(workers, max_pending=2) as q:
+        _pack(tmp_path / "parallel.h5", q)
+    with ThreadPoolExecutor(2) as pool, PackQueue(executor=pool) as q:
+        _pack(tmp_path / "threads.h5", q)
+
+    expected = (tmp_path / "serial.h5").read_bytes()
+    assert (tmp_path / "parallel.h5").read_bytes() == expected
+    assert (tmp_path / "threads.h5").read_bytes() == expected
+
+
+def test_pack_queue_error(tmp_path):
+    written = []
+    with pytest.raises(ValueError, match="failed 2"):
+        with PackQueue(2) as q:
+            for i in range(5):
+                prep = _fail if i == 2 else _prepare
+                q.submit(prep, i, write=partial(written.append))
+    assert len(written) == 2  # steps after the failed one are skipped
+
+    with pytest.raises(ValueError, match="in body"):
+        with PackQueue(2) as q:
+            q.write(written.append, None)
+            raise ValueError("in body")
+
+
+def test_pack_prepared_file(tmp_ds_path):
+    tmp_ds_path.mkdir()
+    file = tmp_ds_path / "file.txt"
+    file.write_text("hello world!")
+    prep = prepare_file(file)
+    assert prep is not None and prep.data == b"hello world!"
+
+    with MetadorContainer(tmp_ds_path / "c", "w") as m:
+        ds = pack_file(m, file, prepared=prep)
+        assert ds[()].tobytes() == prep.data
+        assert ds.meta["core.file"].sha256 == prep.scan.hashsum
+
+        file.write_text("changed")
+        with pytest.raises(ValueError):
+            pack_file(m, file, target="changed", prepared=prep)
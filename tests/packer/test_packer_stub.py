@@ -0,0 +1,86 @@
+"""Test updating containers based only on their manifest."""
+import shutil
+
+import pytest
+
+from metador_core.container import MetadorContainer
+from metador_core.container.utils import METADOR_LINKS_PATH
+from metador_core.ih5.manifest import IH5Manifest, IH5MFRecord
+from metador_core.ih5.overlay import IH5Dataset
+from metador_core.packer.example import GenericPacker
+from metador_core.packer.storage import StorageStats
+from metador_core.packer.stub import ManifestTOC, create_stub, toc_links
+from metador_core.packer.types import DirValidationErrors
+
+
+@pytest.fixture
+def generic_packer(monkeypatch):
+    """Generic packer without the (not yet available) bibliographic metadata."""
+    from metador_core.plugins import packers
+
+    check_dir = classmethod(lambda cls, data_dir: DirValidationErrors())
+    monkeypatch.setattr(GenericPacker, "check_dir", check_dir)
+    monkeypatch.setattr(GenericPacker, "WORKERS", 0)
+    return packers
+
+
+def test_update_from_manifest(tmp_ds_path, generic_packer):
+    tmp_ds_path.mkdir()
+    src, local, remote = [tmp_ds_path / x for x in ["src", "local", "remote"]]
+    for d in [src / "a", local, remote]:
+        d.mkdir(parents=True)
+    (src / "a" / "x.bin").write_bytes(bytes(10))
+    (src / "b.txt").write_text("hello")
+
+    generic_packer.pack("core.generic", src, remote / "rec", IH5MFRecord)
+    assert GenericPacker.STORAGE.stats == StorageStats()  # copied for each update
+    mf = IH5MFRecord._manifest_filepath(remote / "rec.ih5")
+    toc = ManifestTOC.get(IH5Manifest.parse_file(mf))
+    assert toc is not None
+    assert any(path.endswith("/compat") for path in toc.data)
+    assert not any(path.endswith("/jsonschema.json") for path in toc.data)
+
+    # links are not stored, but reconstructed from the paths of metadata objects
+    assert not any(path.startswith(METADOR_LINKS_PATH) for path in toc.data)
+    links = {}
+
+    def add_link(_, node):
+        if isinstance(node, IH5Dataset):
+            links[node.name] = node[()].decode("utf-8")
+
+    with IH5MFRecord(remote / "rec", "r") as rec:
+        rec[METADOR_LINKS_PATH].visititems(add_link)
+    skeleton = IH5Manifest.parse_file(mf).skeleton
+    assert links and toc_links(skeleton.__root__.keys()) == links
+
+    (src / "a" / "x.bin").unlink()
+    (src / "c.txt").write_text("new")
+    packer_args = ("core.generic", src, mf, local)
+    with pytest.raises(ValueError, match="write"):
+        generic_packer.update_from_manifest(*packer_args, max_bytes=1)
+    assert not list(local.iterdir())
+
+    # only the new patch and manifest are created (the record is not touched)
+    patch, patch_mf = generic_packer.update_from_manifest(*packer_args)
+    assert patch == local / "rec.p1.ih5"
+    assert patch_mf == local / "rec.p1.ih5mf.json"
+    assert sorted(local.iterdir()) == [patch, patch_mf]
+    assert sorted(remote.iterdir()) == [remote / "rec.ih5", mf]
+
+    # the patch applies to the record
+    shutil.copy(patch, remote)
+    shutil.copy(patch_mf, remote)
+    with MetadorContainer(IH5MFRecord(remote / "rec", "r")) as mc:
+        assert set(mc.keys()) == {"a", "b.txt", "c.txt"}
+        assert "x.bin" not in mc["a"]
+        assert mc["c.txt"][()].tobytes() == b"new"
+        assert mc["c.txt"].meta["core.file"].contentSize == 3
+        assert mc.meta["core.packerinfo"].source_dir.keys() == {"a", "b.txt", "c.txt"}
+        assert mc.fsck().ok
+
+    # a patch not created by a packer makes the TOC copy in the manifest outdated
+    with IH5MFRecord(remote / "rec", "r+") as rec:
+        rec["d"] = "manual"
+    mf = IH5MFRecord._manifest_filepath(remote / "rec.p2.ih5")
+    with pytest.raises(ValueError, match="TOC"):
+        create_stub(tmp_ds_path / "stub", mf)
@@ -0,0 +1,106 @@
+"""Test dry-run planning of packer updates."""
+from pathlib import Path
+
+import pytest
+from overrides import overrides
+
+from metador_core.ih5.manifest import IH5MFRecord
+from metador_core.packer import Packer, PGPacker
+from metador_core.packer.example import GenericPacker
+from metador_core.packer.plan import PlannedAction, PlannedChange, plan_update
+from metador_core.packer.types import DirValidationErrors
+from metador_core.util.diff import DirDiff
+from metador_core.util.hashsums import dir_hashsums
+
+
+class RepackPacker(Packer):
+    """Packer without declared path mapping."""
+
+    class Plugin:
+        name = "test.repack"
+        version = (0, 1, 0)
+
+    @classmethod
+    @overrides
+    def check_dir(cls, data_dir: Path) -> DirValidationErrors:
+        return DirValidationErrors()
+
+    @classmethod
+    @overrides
+    def pack(cls, mc, data_dir: Path):
+        ...
+
+
+class UpdatingPacker(RepackPacker):
+    """Packer with own update, but without declared path mapping."""
+
+    @classmethod
+    @overrides
+    def update(cls, mc, data_dir: Path, diff: DirDiff):
+        ...
+
+
+def test_plan_update(tmp_ds_path):
+    src = tmp_ds_path / "src"
+    (src / "a").mkdir(parents=True)
+    (src / "a" / "x.bin").write_bytes(bytes(10))
+    (src / "a" / "y.bin").write_bytes(bytes(20))
+    (src / "b.txt").write_text("hello")
+    (src / "_meta.yaml").write_text("title: test")
+    (src / "l").symlink_to("a/x.bin")
+    prev = dir_hashsums(src)
+
+    # skeleton of a record packed from the previous state
+    with IH5MFRecord(tmp_ds_path / "record", "w") as rec:
+        rec["a/x.bin"] = "x"
+        rec["a/y.bin"] = "y"
+        rec["b.txt"] = b"hello"
+        rec.create_group("metador_container")
+        rec.commit_patch()
+        skeleton = rec.manifest.skeleton.__root__.keys()
+
+    (src / "a" / "x.bin").write_bytes(bytes(100))
+    (src / "a" / "y.bin").unlink()
+    (src / "b.txt").unlink()
+    (src / "c").mkdir()
+    (src / "c" / "new.bin").write_bytes(bytes(7))
+    (src / "_meta.yaml").write_text("title: changed")
+    diff = DirDiff.compare(prev, dir_hashsums(src))
+
+    assert plan_update(GenericPacker, src, DirDiff.compare(prev, prev)).is_empty
+
+    plan = plan_update(GenericPacker, src, diff, skeleton)
+    assert not plan.full_repack
+    assert plan.changes == [
+        PlannedChange(PlannedAction.delete, "/b.txt", Path("b.txt"), 0),
+        PlannedChange(PlannedAction.delete, "/a/y.bin", Path("a/y.bin"), 0),
+        PlannedChange(PlannedAction.rewrite, "/a/x.bin", Path("a/x.bin"), 100),
+        PlannedChange(PlannedAction.create, "/c", Path("c"), 0),
+        PlannedChange(PlannedAction.create, "/c/new.bin", Path("c/new.bin"), 7),
+    ]
+    assert plan.bytes_written == 107
+    assert plan.paths == {"/b.txt", "/a/y.bin", "/a/x.bin", "/c", "/c/new.bin"}
+    assert [c.path for c in plan.deletes] == ["/b.txt", "/a/y.bin"]
+    assert [c.path for c in plan.rewrites] == ["/a/x.bin"]
+    assert [c.path for c in plan.creates] == ["/c", "/c/new.bin"]
+    assert plan_update(GenericPacker, src, diff).changes == plan.changes
+
+    # packer without path mapping -> everything is repacked
+    plan = plan_update(RepackPacker, src, diff, skeleton)
+    assert plan.full_repack
+    assert [c.path for c in plan.deletes] == ["/a", "/b.txt"]
+    assert [c.path for c in plan.creates] == [
+        "/_meta.yaml",
+        "/a",
+        "/a/x.bin",
+        "/c",
+        "/c/new.bin",
+        "/l",
+    ]
+    assert plan.bytes_written == 14 + 100 + 7
+
+    # the repack plan is only enforced for packers repacking by default
+    with pytest.raises(ValueError):
+        PGPacker._check_max_bytes(RepackPacker, plan, 1)
+    PGPacker._check_max_bytes(UpdatingPacker, plan, 1)
+    assert plan_update(UpdatingPacker, src, diff, skeleton).full_repack
@@ -0,0 +1,109 @@
+"""Test the storage policy for packed datasets."""
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import numpy as np
+import pandas
+import pytest
+
+from metador_core.container import MetadorContainer
+from metador_core.container.drivers import MetadorDriverEnum, get_raw_dataset
+from metador_core.packer.storage import StoragePolicy, StorageStats
+from metador_core.packer.utils import pack_file
+from metador_core.widget.server.files import read_embedded_file
+
+
+def test_dataset_kwargs():
+    policy = StoragePolicy(min_size=100, chunk_bytes=1000, fast_min_size=10**6)
+    assert policy.dataset_kwargs((10,), "f8") == {}  # too small
+    assert policy.dataset_kwargs((), "V1000") == {}  # scalar
+    assert policy.dataset_kwargs(None, "u1") == {}  # empty
+    assert policy.dataset_kwargs((1000,), h5py.string_dtype()) == {}
+    assert policy.dataset_kwargs((1000,), "u1", mimetype="image/png") == {}
+    assert policy.dataset_kwargs((1000,), "u1", sample=os.urandom(1000)) == {}
+
+    kwargs = policy.dataset_kwargs((1000,), "u1", sample=bytes(1000))
+    assert kwargs == dict(
+        chunks=(1000,), compression="gzip", compression_opts=4, shuffle=False
+    )
+    kwargs = policy.dataset_kwargs((500, 3), "i4")
+    assert kwargs["chunks"] == (83, 3) and kwargs["shuffle"]
+    assert policy.dataset_kwargs((10**6,), "i2")["compression"] == "lzf"
+
+
+def test_normalize_table():
+    policy = StoragePolicy()
+    df = pandas.DataFrame({"a": [1, 2, 3], "b": [-1, 0, 300]})
+    arr = policy.normalize_table(df)
+    assert arr.dtype == np.int16 and arr.tolist() == [[1, -1], [2, 0], [3, 300]]
+    df2 = pandas.DataFrame({"x": [0.5, 1.0, None], "y": [1.5, 2, 3]})
+    assert policy.normalize_table(df2).dtype == np.float64
+    df2 = pandas.DataFrame({"i": [1, 2], "u": [0, 2**64 - 1]}, dtype="object")
+    df2 = df2.astype({"i": np.int64, "u": np.uint64})
+    assert policy.normalize_table(df2).dtype.names == ("i", "u")
+
+    # large integers are not converted to float
+    df["c"] = [0.5, 1.0, None]
+    df["e"] = [2**53 + 1, 2**62, -(2**63)]
+    arr = policy.normalize_table(df)
+    assert arr.dtype.names == ("a", "b", "c", "e")
+    assert arr["e"].dtype == np.int64 and arr["e"].tolist() == df["e"].tolist()
+    assert np.isnan(arr["c"][2])
+    del df["e"]
+
+    df["d"] = ["x", None, "z"]
+    arr = policy.normalize_table(df)
+    assert arr.dtype.names == ("a", "b", "c", "d")
+    assert (arr.dtype["a"], arr.dtype["b"]) == (np.int8, np.int16)
+    assert arr["d"].tolist() == ["x", "", "z"]
+
+
+@pytest.mark.parametrize("driver", list(iter(MetadorDriverEnum)))
+def test_storage_policy(tmp_ds_path, driver):
+    tmp_ds_path.mkdir()
+    text = b"hello world! " * 10_000
+    (tmp_ds_path / "file.txt").write_bytes(text)
+    (tmp_ds_path / "file.bin").write_bytes(os.urandom(len(text)))
+    df = pandas.DataFrame({"n": list(range(100_000)), "s": ["x", "y"] * 50_000})
+
+    policy = StoragePolicy()
+    with MetadorContainer(tmp_ds_path / "c", "w", driver=driver.value) as m:
+        policy.create_dataset(m, "table", data=policy.normalize_table(df))
+        policy.create_dataset(m, "numbers", data=np.arange(100_000))
+        pack_file(m, tmp_ds_path / "file.txt", policy=policy)
+        pack_file(m, tmp_ds_path / "file.bin", policy=policy)
+        pack_file(m, tmp_ds_path / "file.txt", target="stream", stream=True)
+
+    with MetadorContainer(tmp_ds_path / "c", "r", driver=driver.value) as m:
+        assert m["table"]["n"].tolist() == df["n"].tolist()
+        assert get_raw_dataset(m["numbers"]).compression == "gzip"
+        assert get_raw_dataset(m["file.txt"]).compression == "gzip"
+        assert get_raw_dataset(m["file.bin"]).compression is None
+        assert get_raw_dataset(m["stream"]).compression == "gzip"
+        assert read_embedded_file(m["file.txt"]) == text
+        assert read_embedded_file(m["stream"]) == text
+
+    stats = policy.stats
+    assert (stats.datasets, stats.filtered) == (4, 2)
+    assert stats.raw_bytes > 3 * len(text) + 800_000
+    assert 0 < stats.stored_bytes < stats.raw_bytes - 800_000
+    assert stats.saved_bytes == stats.raw_bytes - stats.stored_bytes
+    assert stats.ratio > 1 and stats.seconds > 0
+    assert "4 datasets (2 compressed)" in str(stats)
+    stats.reset()
+    assert stats == StorageStats()
+
+
+def test_storage_stats_shared():
+    policy = StoragePolicy()
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: policy.stats.add(None, 1, 0.0, False), range(1000)))
+    assert policy.stats.datasets == policy.stats.raw_bytes == 1000
+
+    # policies can be sent to worker processes
+    copy = pickle.loads(pickle.dumps(policy))
+    assert copy == policy and copy.stats.datasets == 1000
+    copy.stats.add(None, 1, 0.0, False)
+    assert copy.stats.datasets == 1001
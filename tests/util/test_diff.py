@@ -0,0 +1,92 @@
+"""Test flat directory diff representation."""
+from pathlib import Path
+
+from metador_core.util.diff import DiffNode, DirDiff, dir_paths
+from metador_core.util.hashsums import dir_hashsums
+
+
+def test_dirdiff_compare(testinputs):
+    ds2 = testinputs("dirdiff2")
+    dhs2 = dir_hashsums(ds2)
+    dhs1 = {
+        "_meta.yaml": dhs2["_meta.yaml"],
+        "a": {"b": {"d": "symlink:a/b", "c.csv": "sha256:1", "c.csv_meta.yaml": "2"}},
+        "e": "sha256:3",
+        "d": "symlink:a/b",
+        "f": "sha256:4",
+        "z": dhs2["z"],
+    }
+
+    assert DirDiff.compare(dhs2, dhs2).is_empty
+    assert DirDiff.compare(dhs2, dhs2).annotate(ds2) == {}
+    diff = DirDiff.compare(dhs1, dhs2)
+    assert not diff.is_empty
+
+    assert diff.get(Path("a/x")) is None
+    assert diff.get("_meta.yaml") is None
+    assert diff.status(diff.get("_meta.yaml")) == DiffNode.Status.unchanged
+
+    root = diff.get(Path(""))
+    assert root.prev is dhs1 and root.curr is dhs2
+    assert set(map(str, root.removed)) == {"d"}
+    assert set(map(str, root.modified)) == {"a", "e", "f"}
+    assert set(map(str, root.added)) == {"h"}
+
+    ab = diff.get("a/b")
+    assert ab.status() == DiffNode.Status.modified
+    assert (ab.prev_type, ab.curr_type) == ("d", "f")
+    assert set(map(str, ab.removed)) == {"a/b/c.csv", "a/b/c.csv_meta.yaml", "a/b/d"}
+    assert diff.get("a/b/d").status() == DiffNode.Status.removed
+    assert diff.get("e/g").status() == DiffNode.Status.added
+    assert diff.get("f").status() == DiffNode.Status.modified
+
+    # order: rec(removed, modified, self, added), then unchanged
+    lst = ["d", "a/b/c.csv", "a/b/c.csv_meta.yaml", "a/b/d", "a/b", "a"]
+    lst += ["e", "e/g", "f", ".", "h", "_meta.yaml", "z"]
+    assert list(diff.annotate(ds2).keys()) == [ds2 / x for x in lst]
+    assert [str(n.path) for n in diff.get("a").nodes()] == lst[1:6]
+
+    # lazy variant
+    assert list(diff.iter_annotate(ds2)) == list(diff.annotate(ds2).items())
+    changed = [p for p, _ in diff.iter_annotate(ds2, skip_unchanged=True)]
+    assert changed == [ds2 / x for x in lst[:-2]]
+    assert list(DirDiff.compare(dhs2, dhs2).iter_annotate(ds2)) == []
+
+    # same result when comparing single entities
+    assert DiffNode.compare("x", "x", Path("p")) is None
+    node = DiffNode.compare(dhs1["a"], None, Path("a"))
+    assert [str(n.path) for n in node.nodes()] == lst[1:6]
+    assert all(n.status() == DiffNode.Status.removed for n in node.nodes())
+
+
+def test_diffnode_fields():
+    """Check that diff nodes can be constructed, copied and serialized as before."""
+    diff = DirDiff.compare({"a": {"b": "1", "c": "2"}, "d": "x"}, {"a": {"b": "3"}})
+    root = diff.get(Path("."))
+    a = root.modified[Path("a")]
+    assert root.dict()["modified"][Path("a")] == a.dict()
+    assert a.dict()["removed"][Path("a/c")]["prev"] == "2"
+    assert root == diff.get(Path("."))
+
+    # copies keep their (updated) children
+    copy = root.copy(update={"removed": {}})
+    assert not copy.removed and copy.modified == root.modified
+    assert [str(n.path) for n in copy.nodes()] == ["a/c", "a/b", "a", "."]
+
+    # explicitly constructed trees
+    child = DiffNode(path="x/k", prev=None, curr="v")
+    node = DiffNode(path="x", prev="f", curr={"k": "v"}, added={child.path: child})
+    assert node.added == {Path("x/k"): child}
+    assert list(node.children()) == [child]
+    assert node.nodes() == [node, child]
+
+
+def test_dir_paths(tmp_path):
+    for p in ["a/b/c", "a.b/c", "a b", "ab/c/d"]:
+        (tmp_path / p).mkdir(parents=True)
+    (tmp_path / "a" / "f").write_text("f")
+    (tmp_path / "l").symlink_to("a")
+
+    expected = [p.relative_to(tmp_path) for p in sorted(tmp_path.rglob("*"))]
+    assert list(dir_paths(tmp_path)) == expected
+    assert Path("l/b") not in expected  # symlinks to directories are not followed
@@ -17,3 +17,144 @@ def test_hashsum(tmp_path):
         hsum
         == "sha256:7509e5bda0c762d2bac7f90d758b5b2263fa01ccbc542ab5e3df163be08e6ca9"
     )
+
+
+def test_dir_hashsums(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from metador_core.util.hashsums import dir_hashsums
+
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "c.txt").write_text("hello world!")
+    (tmp_path / "a" / "big").write_bytes(bytes(range(256)) * 10_000)
+    (tmp_path / "empty").mkdir()
+    (tmp_path / "z").write_bytes(b"")
+    (tmp_path / "d").symlink_to("a/b")
+    (tmp_path / "l").symlink_to("a/b/c.txt")
+
+    hs_c = "sha256:7509e5bda0c762d2bac7f90d758b5b2263fa01ccbc542ab5e3df163be08e6ca9"
+    hs_z = "sha256:e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    expected = {
+        "a": {"b": {"c.txt": hs_c}, "big": file_hashsum(tmp_path / "a" / "big")},
+        "empty": {},
+        "z": hs_z,
+        "d": "symlink:a/b",
+        "l": hs_c,  # symlinks to files are hashed like files
+    }
+
+    progress = []
+    dhs = dir_hashsums(tmp_path, workers=1, progress=progress.append)
+    assert dhs == expected
+    assert progress[-1].files_done == progress[-1].files_total == 4
+    assert progress[-1].bytes_done == progress[-1].bytes_total == 2_560_024
+    assert progress[-1].throughput > 0
+    assert [p.files_done for p in progress] == [1, 2, 3, 4]
+
+    # parallel hashing gives the same result (also the same order of entries)
+    assert list(dhs) == list(dir_hashsums(tmp_path, workers=4))
+    assert dir_hashsums(tmp_path, workers=4) == expected
+    with ThreadPoolExecutor(2) as pool:
+        assert dir_hashsums(tmp_path, executor=pool) == expected
+
+
+def test_dir_hashsums_cache(tmp_path, monkeypatch):
+    import os
+
+    from metador_core.util import hashsums
+    from metador_core.util.hashsums import HashCache, dir_hashsums
+
+    data = tmp_path / "data"
+    (data / "sub").mkdir(parents=True)
+    for name in ["a", "b", "sub/c"]:
+        (data / name).write_text(name)
+        os.utime(data / name, ns=(0, 10**9))  # not modified recently
+
+    hashed = []
+
+    scan_file = hashsums.scan_file
+
+    def counting_scan_file(path, alg, **kwargs):
+        hashed.append(path.relative_to(data).as_posix())
+        return scan_file(path, alg, **kwargs)
+
+    monkeypatch.setattr(hashsums, "scan_file", counting_scan_file)
+    monkeypatch.setattr(hashsums, "file_scans", hashsums.ScanCache())
+    with HashCache(data / "cache.db") as cache:
+        with pytest.raises(ValueError):  # cache must be outside of directory
+            dir_hashsums(data, cache=cache)
+    (data / "cache.db").unlink()
+
+    with HashCache(tmp_path / "cache.db") as cache:
+        expected = dir_hashsums(data, cache=cache)
+        assert sorted(hashed) == ["a", "b", "sub/c"]
+        hashed.clear()
+        assert dir_hashsums(data, cache=cache) == expected
+        assert not hashed  # nothing changed
+
+        # only changed files are hashed, removed files are dropped from cache
+        (data / "b").write_text("changed")
+        os.utime(data / "b", ns=(0, 2 * 10**9))
+        (data / "sub" / "c").unlink()
+        expected = dir_hashsums(data, workers=1)
+        hashsums.file_scans.clear()
+        hashed.clear()
+        assert dir_hashsums(data, cache=cache) == expected
+        assert hashed == ["b"]
+        assert set(cache.lookup(data, "sha256")) == {"a", "b"}
+
+        # recently modified files are always hashed
+        (data / "a").write_text("new")
+        hashed.clear()
+        dir_hashsums(data, cache=cache)
+        dir_hashsums(data, cache=cache)
+        assert hashed == ["a", "a"]
+
+
+def test_scan_file(tmp_path, monkeypatch):
+    import os
+
+    from metador_core.harvester import harvest
+    from metador_core.plugins import harvesters, schemas
+    from metador_core.util import hashsums
+    from metador_core.util.hashsums import ScanCache, dir_hashsums, scan_file
+
+    monkeypatch.setattr(hashsums, "file_scans", ScanCache())
+    file = tmp_path / "data" / "test.txt"
+    file.parent.mkdir()
+    file.write_text("hello world!")
+
+    blocks = []
+    scan = scan_file(file, sink=lambda pos, bs: blocks.append((pos, bytes(bs))))
+    assert blocks == [(0, b"hello world!")]
+    assert scan.qualified_hashsum == file_hashsum(file)
+    assert scan.mimetype == "text/plain"
+    assert scan.stat.size == 12
+    assert not hashsums.file_scans.get(file)  # just modified -> not reusable
+
+    # scans of unchanged files are reused by dir_hashsums and the file harvester
+    os.utime(file, ns=(0, 10**9))
+    scan_file(file)
+    assert hashsums.file_scans.get(file)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file was read again")
+
+    monkeypatch.setattr(hashsums, "scan_file", fail)
+    assert dir_hashsums(tmp_path / "data") == {"test.txt": scan.qualified_hashsum}
+    hv_file = harvesters["core.file.generic"](filepath=file)
+    meta = harvest(schemas["core.file"], [hv_file])
+    assert meta.sha256 == scan.hashsum
+    assert meta.encodingFormat == "text/plain"
+    assert meta.contentSize == 12
+
+    # changed files are scanned again
+    monkeypatch.undo()
+    file.write_text("changed")
+    assert not hashsums.file_scans.get(file)
+
+    # dir_hashsums does not detect MIME types, they are added on demand
+    os.utime(file, ns=(0, 2 * 10**9))
+    assert dir_hashsums(tmp_path / "data") == {"test.txt": file_hashsum(file)}
+    assert hashsums.file_scans.get(file).mimetype is None
+    assert hashsums.cached_scan(file).mimetype == "text/plain"
+    assert hashsums.file_scans.get(file).mimetype == "text/plain"
@@ -0,0 +1,92 @@
+import pytest
+
+from metador_core.container import MetadorContainer
+from metador_core.container.drivers import MetadorDriverEnum
+from metador_core.container.provider import SimpleContainerProvider
+from metador_core.packer.utils import pack_file
+from metador_core.widget import dashboard as D
+from metador_core.widget.dashboard import Dashboard, DashboardConf
+from metador_core.widget.server import WidgetServer
+
+
+@pytest.fixture(params=list(iter(MetadorDriverEnum)))
+def dashboard_container_path(request, tmp_ds_path):
+    """Return driver and path of a container with some nodes marked for the dashboard."""
+    tmp_ds_path.mkdir()
+    drv = request.param.value
+    path = tmp_ds_path / "c"
+    with MetadorContainer(path, "w", driver=drv) as m:
+        for i in range(3):
+            (tmp_ds_path / f"file{i}.txt").write_text(f"hello {i}")
+            ds = pack_file(m, tmp_ds_path / f"file{i}.txt")
+            ds.meta["core.dashboard"] = DashboardConf.show(group=1 if i else None)
+    return drv, path
+
+
+def test_dashboard_layout_cache(dashboard_container_path, monkeypatch):
+    drv, path = dashboard_container_path
+    resolved = []
+    resolve_layout = Dashboard._resolve_layout
+
+    def counting_resolve_layout(container):
+        resolved.append(container)
+        return resolve_layout(container)
+
+    monkeypatch.setattr(Dashboard, "_resolve_layout", counting_resolve_layout)
+    D._layout_cache.clear()
+
+    def layout(db):
+        grps = {k: [(n.name, w.widget_name) for n, w in v] for k, v in db._groups.items()}
+        return grps, [(n.name, w.widget_name) for n, w in db._ungrouped]
+
+    with MetadorContainer(path, "r", driver=drv) as m:
+        db = Dashboard(m)
+        grps, ungrp = layout(db)
+        db._ungrouped[0][1].widget_name = "changed"  # does not affect cached layout
+        db._groups[1].clear()
+        assert layout(Dashboard(m)) == (grps, ungrp)
+    assert len(resolved) == 1  # second dashboard used cached layout
+    assert grps == {
+        1: [
+            ("/file1.txt", "core.file.text"),
+            ("/file2.txt", "core.file.text"),
+        ]
+    }
+    assert ungrp == [("/file0.txt", "core.file.text")]
+
+    # writable containers are not cached
+    with MetadorContainer(path, "r+", driver=drv) as m:
+        Dashboard(m)
+        Dashboard(m)
+    assert len(resolved) == 3
+
+
+def test_dashboard_lazy(dashboard_container_path, monkeypatch):
+    drv, path = dashboard_container_path
+    made = []
+    make_widget_tile = D.make_widget_tile
+
+    def counting_make_widget_tile(node, *args, **kwargs):
+        made.append(node.name)
+        return make_widget_tile(node, *args, **kwargs)
+
+    monkeypatch.setattr(D, "make_widget_tile", counting_make_widget_tile)
+
+    with MetadorContainer(path, "r", driver=drv) as m:
+        scp = SimpleContainerProvider()
+        scp["cid"] = m
+        ws = WidgetServer(scp, populate=False, flask_endpoint="http://localhost")
+
+        # eager dashboard instantiates all widgets
+        Dashboard(m, server=ws, container_id="cid").show()
+        assert sorted(made) == ["/file0.txt", "/file1.txt", "/file2.txt"]
+        made.clear()
+
+        # lazy dashboard only loads widgets of the opened tab
+        tabs = Dashboard(m, server=ws, container_id="cid", lazy=True).show()
+        assert len(tabs) == 2
+        assert made == ["/file1.txt", "/file2.txt"]
+        tabs.active = 1
+        assert made == ["/file1.txt", "/file2.txt", "/file0.txt"]
+        tabs.active = 0
+        assert len(made) == 3  # each tab is loaded once
@@ -0,0 +1,493 @@
+import os
+
+import bokeh.embed.server
+import numpy as np
+import pytest
+from bokeh.application import Application
+from flask import Flask
+
+from metador_core.container import MetadorContainer
+from metador_core.container.drivers import MetadorDriverEnum, is_open
+from metador_core.container.provider import (
+    PooledContainerProvider,
+    SimpleContainerProvider,
+)
+from metador_core.packer.utils import pack_file
+from metador_core.widget import server as S
+from metador_core.widget.server import WidgetServer
+from metador_core.widget.server.files import EmbeddedFile
+from metador_core.widget.server.loadtest import run_loadtest, wsgi_getter
+
+
+@pytest.fixture(params=list(iter(MetadorDriverEnum)))
+def file_container(request, tmp_ds_path):
+    """Return container with embedded files and the embedded data."""
+    tmp_ds_path.mkdir()
+    data = os.urandom(100_000)
+    (tmp_ds_path / "file.bin").write_bytes(data)
+    (tmp_ds_path / "empty.bin").write_bytes(b"")
+
+    drv = request.param.value
+    with MetadorContainer(tmp_ds_path / "c", "w", driver=drv) as m:
+        pack_file(m, tmp_ds_path / "file.bin")
+        pack_file(m, tmp_ds_path / "empty.bin")
+        pack_file(m, tmp_ds_path / "file.bin", target="gz.bin", compression="gzip")
+        m["compact"] = b"not a file"
+        m["number"] = 123
+        m["array"] = np.zeros(10, dtype=np.uint8)
+    with MetadorContainer(tmp_ds_path / "c", "r", driver=drv) as m:
+        yield m, data
+
+
+def test_embedded_file(file_container):
+    m, data = file_container
+    with EmbeddedFile(m["file.bin"]) as f:
+        assert f.size == len(data)
+        assert f._fobj is not None  # direct read from file offset
+        assert f.read() == data
+        f.seek(1234)
+        assert f.read(10) == data[1234:1244]
+        f.seek(-5, os.SEEK_END)
+        assert f.read() == data[-5:]
+        chunks = list(f.iter_chunks(10, 50_000, chunk_size=4096))
+        assert all(len(c) <= 4096 for c in chunks)
+        assert b"".join(chunks) == data[10:50_000]
+
+    with EmbeddedFile(m["empty.bin"]) as f:
+        assert f.size == 0
+        assert f.read() == b""
+    with EmbeddedFile(m["compact"]) as f:
+        assert f.read() == b"not a file"
+    with pytest.raises(ValueError):
+        EmbeddedFile(m["number"])
+    with pytest.raises(ValueError):
+        EmbeddedFile(m["array"])  # not packed as a file
+
+
+def test_server_download(file_container):
+    m, data = file_container
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    app = Flask(__name__)
+    app.register_blueprint(
+        WidgetServer(scp, populate=False).get_flask_blueprint("api", __name__)
+    )
+    client = app.test_client()
+
+    res = client.get("/file/cid/file.bin")
+    assert res.status_code == 200
+    assert res.headers["Accept-Ranges"] == "bytes"
+    assert res.content_length == len(data)
+    assert res.data == data
+    etag = res.headers["ETag"]
+
+    res = client.get("/file/cid/file.bin", headers={"Range": "bytes=100-199"})
+    assert res.status_code == 206
+    assert res.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+    assert res.data == data[100:200]
+
+    res = client.get("/file/cid/file.bin", headers={"Range": "bytes=1000000-"})
+    assert res.status_code == 416
+
+    res = client.get("/file/cid/file.bin", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    # streamed and compressed file
+    res = client.get("/file/cid/gz.bin", headers={"Range": "bytes=100-199"})
+    assert res.status_code == 206 and res.data == data[100:200]
+    assert client.get("/file/cid/gz.bin").data == data
+
+    res = client.get("/file/cid/empty.bin")
+    assert res.status_code == 200 and res.data == b""
+    assert client.get("/file/cid/number").status_code == 400
+    assert client.get("/file/cid/missing").status_code == 404
+
+
+@pytest.mark.parametrize("driver", list(iter(MetadorDriverEnum)))
+def test_server_file_etag_revision(tmp_ds_path, driver):
+    tmp_ds_path.mkdir()
+    src = tmp_ds_path / "file.bin"
+    src.write_bytes(b"a" * 1000)
+    drv = driver.value
+    with MetadorContainer(tmp_ds_path / "c", "w", driver=drv) as m:
+        pack_file(m, src)
+        # writable container: content can change, so there is no ETag
+        assert WidgetServer._file_etag(m["file.bin"], 1000) is None
+
+    def get_file():
+        pcp = PooledContainerProvider(ttl=None)
+        with MetadorContainer(tmp_ds_path / "c", driver=drv) as m:
+            pcp["cid"] = m
+        client = WidgetServer(pcp, populate=False).make_flask_app().test_client()
+        with client.get("/file/cid/file.bin") as res:
+            assert res.status_code == 200
+            ret = res.data, res.headers["ETag"]
+        pcp.close_all()
+        return ret
+
+    data1, etag1 = get_file()
+    assert data1 == b"a" * 1000
+    assert get_file()[1] == etag1
+
+    # patch the file with same-sized different content
+    src.write_bytes(b"b" * 1000)
+    with MetadorContainer(tmp_ds_path / "c", "r+", driver=drv) as m:
+        del m["file.bin"]
+        pack_file(m, src)
+
+    data2, etag2 = get_file()
+    assert data2 == b"b" * 1000
+    assert etag2 != etag1
+
+
+def test_server_io_pool_loadtest(file_container):
+    m, data = file_container
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    ws = WidgetServer(scp, populate=False, io_workers=2)
+    get = wsgi_getter(ws.make_flask_app())
+    assert get("/file/cid/file.bin") == 200
+
+    paths = ["/", "/file/cid/file.bin", "/file/cid/missing"]
+    res = run_loadtest(get, paths, requests=20, concurrency=4)
+    assert [r.path for r in res] == paths
+    assert all(r.requests == 20 and r.req_per_sec > 0 for r in res)
+    assert [r.errors for r in res] == [0, 0, 20]
+
+    # per-thread handles must not be used in the I/O threads
+    with pytest.raises(ValueError):
+        WidgetServer(PooledContainerProvider(per_thread=True), io_workers=2)
+
+
+def test_server_index_script_cache(plugingroups_test, monkeypatch):
+    scp = SimpleContainerProvider()
+    ws = WidgetServer(scp, populate=False, bokeh_endpoint="http://localhost:5006")
+    ws.register_widget("dummy", Application())
+    client = ws.make_flask_app().test_client()
+
+    # index is computed once and can be revalidated
+    res = client.get("/")
+    assert res.status_code == 200
+    assert res.json["widgets"] == ["dummy"]
+    assert "schema" in res.json["plugins"]
+    assert res.cache_control.max_age == 60
+    etag = res.headers["ETag"]
+    cached = ws._index_cache
+    assert client.get("/").headers["ETag"] == etag
+    assert ws._index_cache is cached
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    # invalidated by registering widgets and resetting plugin groups
+    ws.register_dashboard("dummy", Application())
+    assert client.get("/").json["dashboards"] == ["dummy"]
+    cached = ws._index_cache
+    plugingroups_test.__reset__()
+    client.get("/")
+    assert ws._index_cache is not cached
+
+    # scripts are memoized, but element ids are unique
+    res1 = client.get("/widget/dummy/cid/some/path")
+    res2 = client.get("/widget/dummy/cid/some/path")
+    assert res1.status_code == res2.status_code == 200
+    assert res1.headers["ETag"] == res2.headers["ETag"]
+    assert res1.data != res2.data
+    assert b"element=__" not in res1.data
+    assert b"w-dummy/autoload.js" in res1.data and b"path=some%2Fpath" in res1.data
+    res = client.get(
+        "/widget/dummy/cid/some/path", headers={"If-None-Match": res1.headers["ETag"]}
+    )
+    assert res.status_code == 304
+    assert client.get("/widget/missing/cid/").status_code == 404
+
+    # the template matches the tag produced by bokeh, get_script returns the tag
+    url, args = "http://localhost:5006/w-dummy", (("id", "cid"), ("path", "x"))
+    assert S._script_template(url, args).count(S._ELEMENT_ID) == 2
+    monkeypatch.setattr(bokeh.embed.server, "make_id", lambda: S._ELEMENT_ID)
+    expected = bokeh.embed.server.server_document(url, arguments=dict(args))
+    assert S._script_template(url, args) == expected
+    script = ws.get_script("widget", "dummy", "cid", "some/path")
+    assert isinstance(script, str) and S._ELEMENT_ID not in script
+
+
+def test_server_lazy_widgets(file_container, monkeypatch):
+    from bokeh.document import Document
+    from panel.pane import Markdown
+
+    from metador_core.plugins import widgets
+
+    m, _ = file_container
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    ws = WidgetServer(scp)
+    assert set(ws._reg_widgets) == {ref.plugin_string() for ref in widgets.keys()}
+    assert "generic" in ws._reg_dashboards
+
+    class DummyViewable:
+        def __init__(self, node, *, server, container_id):
+            self.node = node
+
+        def show(self):
+            return Markdown(self.node.name)
+
+    loaded = []
+
+    def load():
+        loaded.append(DummyViewable)
+        return DummyViewable
+
+    app = ws.make_lazy_bokeh_app(load)
+    assert not loaded  # nothing loaded before first request
+
+    args = dict(container_id="cid", container_path="file.bin")
+    monkeypatch.setattr(ws, "_get_widget_args", lambda _: args)
+    for _ in range(2):
+        doc = Document()
+        app.initialize_document(doc)
+        assert len(doc.roots) == 1
+    assert len(loaded) == 1  # loaded only once
+
+
+def test_server_leases_containers(file_container, monkeypatch):
+    from bokeh.document import Document
+    from panel.pane import Markdown
+
+    m, data = file_container
+    pcp = PooledContainerProvider(ttl=None)
+    pcp["cid"] = m
+    ws = WidgetServer(pcp, populate=False)
+    client = ws.make_flask_app().test_client()
+
+    def leases():
+        return sum(e.leases for e in pcp._pool.values())
+
+    # downloads hold the container until the response is closed
+    res = client.get("/file/cid/gz.bin", buffered=False)
+    assert leases() == 1
+    assert b"".join(res.response) == data
+    res.close()
+    assert leases() == 0
+    assert client.get("/file/cid/missing").status_code == 404
+    assert leases() == 0
+
+    # widget sessions hold the container until they are destroyed
+    class DummyViewable:
+        def __init__(self, node, *, server, container_id):
+            self.node = node
+
+        def show(self):
+            return Markdown(self.node.name)
+
+    args = dict(container_id="cid", container_path="file.bin")
+    monkeypatch.setattr(ws, "_get_widget_args", lambda _: args)
+    doc = Document()
+    ws.make_bokeh_app(DummyViewable).initialize_document(doc)
+    assert leases() == 1
+
+    # removed containers are closed after the last session using it is destroyed
+    with pcp.lease("cid") as handle:
+        del pcp["cid"]
+    assert is_open(handle.__wrapped__)
+    for callback in doc.session_destroyed_callbacks:
+        callback(None)
+    assert not is_open(handle.__wrapped__)
+
+
+@pytest.fixture
+def data_container(tmp_ds_path):
+    """Return container with an embedded table and images."""
+    from PIL import Image
+
+    tmp_ds_path.mkdir()
+    rows = ["a;b;c"] + [f"{i};{2 * i};x{i}" for i in range(3000)]
+    (tmp_ds_path / "table.csv").write_text("\n".join(rows) + "\n\n")
+    (tmp_ds_path / "quoted.csv").write_text('a,b\n0,"x\ny"\n1,z\n2,"p\nq"\n')
+    img = Image.new("RGB", (1000, 600), (255, 0, 0))
+    img.save(tmp_ds_path / "img.png")
+    img.save(tmp_ds_path / "img.jpg")
+
+    with MetadorContainer(tmp_ds_path / "c", "w") as m:
+        for name in ["table.csv", "quoted.csv", "img.png", "img.jpg"]:
+            pack_file(m, tmp_ds_path / name)
+        m["number"] = 123
+    with MetadorContainer(tmp_ds_path / "c", "r") as m:
+        yield m
+
+
+def test_table_pages(data_container):
+    from metador_core.widget.server import data
+
+    m = data_container
+    data.data_cache.clear()
+    idx = data.table_index(m["table.csv"])
+    assert idx.sep == ";" and idx.columns == ["a", "b", "c"]
+    assert idx.num_rows == 3000 and len(idx.offsets) == 3
+
+    df = data.read_table_page(m["table.csv"], 2040, 20, ["a", "c"])
+    assert list(df.columns) == ["a", "c"]
+    assert list(df.index) == list(df["a"]) == list(range(2040, 2060))
+    assert list(data.read_table_page(m["table.csv"], 2990, 100)["a"]) == list(
+        range(2990, 3000)
+    )
+    assert data.read_table_page(m["table.csv"], 5000, 10).empty
+    assert len(data.data_cache) == 4  # index + 3 pages
+
+    # quoted values spanning multiple lines are parsed with pandas
+    idx = data.table_index(m["quoted.csv"])
+    assert idx.multiline and idx.num_rows == 3
+    df = data.read_table_page(m["quoted.csv"], 1, 5, index=idx)
+    assert list(df.index) == [1, 2] and list(df["b"]) == ["z", "p\nq"]
+
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    client = WidgetServer(scp, populate=False).make_flask_app().test_client()
+    res = client.get("/table/cid/table.csv?start=1023&rows=3&columns=b")
+    assert res.status_code == 200
+    assert res.json == {
+        "columns": ["b"],
+        "num_rows": 3000,
+        "start": 1023,
+        "data": [[2046], [2048], [2050]],
+    }
+    etag = res.headers["ETag"]
+    res = client.get("/table/cid/table.csv?start=1023&rows=3&columns=b")
+    assert res.headers["ETag"] == etag
+    res = client.get(
+        "/table/cid/table.csv?start=1023&rows=3&columns=b",
+        headers={"If-None-Match": etag},
+    )
+    assert res.status_code == 304
+    assert client.get("/table/cid/table.csv?start=-1").status_code == 400
+    assert client.get("/table/cid/table.csv?columns=z").status_code == 400
+    assert client.get("/table/cid/number").status_code == 400
+    assert client.get("/table/cid/missing").status_code == 404
+
+
+def test_image_thumbnails_tiles(data_container):
+    from io import BytesIO
+
+    from PIL import Image
+
+    from metador_core.widget.server import data
+
+    m = data_container
+    assert data.image_levels(1000, 600) == 3
+    assert data.image_levels(100, 100) == 1
+
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    ws = WidgetServer(scp, populate=False, flask_endpoint="http://localhost")
+    client = ws.make_flask_app().test_client()
+
+    url = ws.image_url_for("cid", m["img.jpg"], size=100)
+    assert url == "http://localhost/image/cid/img.jpg?size=100"
+    res = client.get(url[len(ws.flask_endpoint) :])
+    assert res.status_code == 200 and res.mimetype == "image/jpeg"
+    assert Image.open(BytesIO(res.data)).size == (100, 60)
+
+    def tile(name, level, x, y):
+        res = client.get(f"/image/cid/{name}?level={level}&x={x}&y={y}")
+        if res.status_code != 200:
+            return res.status_code
+        assert res.mimetype == f"image/{'png' if name.endswith('png') else 'jpeg'}"
+        return Image.open(BytesIO(res.data)).size
+
+    for name in ["img.png", "img.jpg"]:
+        assert tile(name, 0, 0, 0) == (256, 256)
+        assert tile(name, 0, 3, 2) == (1000 - 3 * 256, 600 - 2 * 256)
+        assert tile(name, 1, 1, 1) == (500 - 256, 300 - 256)
+        assert tile(name, 2, 0, 0) == (250, 150)
+        assert tile(name, 2, 1, 0) == 400
+        assert tile(name, 3, 0, 0) == 400
+
+    res = client.get("/image/cid/img.png")
+    assert res.status_code == 200 and res.mimetype == "image/png"
+    assert client.get("/image/cid/table.csv?size=10").status_code == 400
+
+
+def test_widgets_load_displayed_data(data_container):
+    from metador_core.widget.common import CSVWidget, ImageWidget
+
+    m = data_container
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    ws = WidgetServer(scp, populate=False, flask_endpoint="http://localhost")
+
+    view = CSVWidget(m["table.csv"], server=ws, container_id="cid").show()
+    table, (page, _) = view
+    assert list(table.value.index) == list(range(100))
+    page.value = 30
+    assert list(table.value.index) == list(range(2900, 3000))
+
+    img = ImageWidget(m["img.png"], server=ws, container_id="cid", max_width=300)
+    assert img.show().object == "http://localhost/preview/cid/img.png?size=512"
+    img = ImageWidget(m["img.png"], server=ws, container_id="cid")
+    assert img.show().object == "http://localhost/file/cid/img.png"
+
+
+def test_previews(data_container, tmp_path, monkeypatch):
+    from io import BytesIO
+
+    from PIL import Image
+
+    from metador_core.widget.server import previews
+    from metador_core.widget.server.previews import (
+        PreviewCache,
+        preview_size,
+        supports_preview,
+    )
+
+    assert [preview_size(s) for s in (1, 64, 65, 300, 10_000)] == [
+        64,
+        64,
+        128,
+        512,
+        2048,
+    ]
+    assert supports_preview("image/png") and not supports_preview("text/csv")
+
+    m = data_container
+    cache = PreviewCache(tmp_path / "previews")
+    img, mime = cache.get(m["img.jpg"], 100)
+    assert mime == "image/jpeg"
+    assert Image.open(BytesIO(img)).size == (128, 77)
+    sha = m["img.jpg"].meta["core.file"].sha256
+    assert [p.name for p in cache.directory.iterdir()] == [f"{sha}-128.jpg"]
+    assert cache.get(m["img.jpg"], 128) == (img, mime)  # served from disk
+    assert cache.get(m["table.csv"], 100) is None
+    assert cache.get(m["number"], 100) is None
+
+    # least recently used previews are removed when the cache is full
+    cache.max_bytes = len(img) + 1
+    cache.get(m["img.png"], 100)
+    assert [p.name for p in cache.directory.iterdir()] == [
+        f"{m['img.png'].meta['core.file'].sha256}-128.png"
+    ]
+    cache.clear()
+    assert not list(cache.directory.iterdir())
+
+    scp = SimpleContainerProvider()
+    scp["cid"] = m
+    ws = WidgetServer(scp, populate=False, previews=PreviewCache(tmp_path / "p2"))
+    client = ws.make_flask_app().test_client()
+    res = client.get("/preview/cid/img.png?size=200")
+    assert res.status_code == 200 and res.mimetype == "image/png"
+    assert Image.open(BytesIO(res.data)).size == (256, 154)
+    assert res.cache_control.max_age == ws.PREVIEW_MAX_AGE
+    assert res.cache_control.immutable
+    res = client.get(
+        "/preview/cid/img.png?size=256", headers={"If-None-Match": res.headers["ETag"]}
+    )
+    assert res.status_code == 304
+    assert client.get("/preview/cid/table.csv").status_code == 404
+    assert client.get("/preview/cid/missing").status_code == 404
+
+    # PDFs are passed to the tool as a file (fake tool returning its contents)
+    tool = tmp_path / "pdftoppm"
+    tool.write_text(
+        "#!/usr/bin/env python3\nimport sys\n"
+        "sys.stdout.buffer.write(open(sys.argv[-1], 'rb').read())\n"
+    )
+    tool.chmod(0o755)
+    monkeypatch.setattr(previews, "_tool", lambda name: str(tool))
+    data = os.urandom(3 * 2**20)
+    assert previews.pdf_preview(BytesIO(data), 64) == data